@@ -0,0 +1,586 @@
+-- ============================================
+-- SISTEMA DE LOCAÇÃO DE IMÓVEIS - CAMADA ANALÍTICA
+-- ============================================
+-- Tabelas de resumo usadas pelas consultas 6, 8, 10, 12, 13 e 17 do app.
+-- Executar DEPOIS de v2-ldi.sql (que recria as tabelas base).
+--
+-- Gatilhos nas tabelas base registram em resumo_pendente apenas as chaves
+-- afetadas (imóvel, anfitrião, mês); SELECT atualizar_resumos() recalcula
+-- somente essas linhas. SELECT reconstruir_resumos() recalcula tudo.
+
+-- @migracao: reset
+-- LIMPEZA DA CAMADA ANALÍTICA
+DROP TABLE IF EXISTS resumo_pendente CASCADE;
+DROP TABLE IF EXISTS resumo_imovel CASCADE;
+DROP TABLE IF EXISTS resumo_anfitriao CASCADE;
+DROP TABLE IF EXISTS resumo_anfitriao_mes CASCADE;
+DROP TABLE IF EXISTS resumo_mes CASCADE;
+
+-- @migracao: 003_resumos
+
+-- Fila de chaves alteradas desde a última atualização
+CREATE TABLE resumo_pendente (
+    tipo VARCHAR(20) NOT NULL,   -- 'imovel', 'anfitriao' ou 'mes'
+    chave VARCHAR(20) NOT NULL,
+    PRIMARY KEY (tipo, chave)
+);
+
+-- Resumo por imóvel (consultas 6, 13 e 17)
+CREATE TABLE resumo_imovel (
+    id_imovel INT PRIMARY KEY,
+    id_anfitriao INT NOT NULL,
+    id_politica INT NOT NULL,
+    titulo VARCHAR(255),
+    capacidade_max INT NOT NULL,
+    -- Ocupação (consulta 13)
+    total_reservas INT NOT NULL,
+    confirmadas INT NOT NULL,
+    canceladas INT NOT NULL,
+    pendentes INT NOT NULL,
+    soma_hospedes BIGINT NOT NULL,
+    dias_ocupados BIGINT NOT NULL,
+    -- Receita das reservas confirmadas (consulta 6)
+    reservas_receita INT NOT NULL,
+    receita_total NUMERIC(15,2) NOT NULL,
+    -- Cancelamentos e estornos (consulta 17)
+    reservas_politica INT NOT NULL,
+    canceladas_politica INT NOT NULL,
+    total_estornos NUMERIC(15,2) NOT NULL,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_resumo_imovel_receita ON resumo_imovel (receita_total DESC);
+CREATE INDEX idx_resumo_imovel_ocupacao ON resumo_imovel (confirmadas DESC, dias_ocupados DESC);
+CREATE INDEX idx_resumo_imovel_politica ON resumo_imovel (id_politica);
+
+-- Resumo por anfitrião (consulta 10)
+CREATE TABLE resumo_anfitriao (
+    id_usuario INT PRIMARY KEY,
+    total_imoveis INT NOT NULL,
+    total_reservas INT NOT NULL,
+    confirmadas INT NOT NULL,
+    canceladas INT NOT NULL,
+    taxa_sucesso_percent DECIMAL(5,1),
+    receita_total NUMERIC(15,2) NOT NULL,
+    ticket_medio DECIMAL(10,2) NOT NULL,
+    media_nota NUMERIC,
+    total_avaliacoes INT NOT NULL,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_resumo_anfitriao_receita ON resumo_anfitriao (receita_total DESC);
+
+-- Receita mensal por anfitrião (consulta 8)
+CREATE TABLE resumo_anfitriao_mes (
+    id_usuario INT NOT NULL,
+    mes_ano VARCHAR(7),
+    reservas INT NOT NULL,
+    receita_mensal NUMERIC(15,2) NOT NULL,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_resumo_anfitriao_mes_usuario ON resumo_anfitriao_mes (id_usuario);
+CREATE INDEX idx_resumo_anfitriao_mes_ordem ON resumo_anfitriao_mes (mes_ano DESC, receita_mensal DESC);
+
+-- Ocupação por mês de início da reserva (consulta 12)
+CREATE TABLE resumo_mes (
+    mes_ano VARCHAR(7) PRIMARY KEY,
+    total_reservas INT NOT NULL,
+    confirmadas INT NOT NULL,
+    canceladas INT NOT NULL,
+    pendentes INT NOT NULL,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+
+-- ============================================================================
+-- RECÁLCULO DOS RESUMOS (NULL = todas as chaves)
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION atualizar_resumo_imovel(p_imoveis INT[]) RETURNS VOID AS $$
+BEGIN
+    DELETE FROM resumo_imovel
+    WHERE p_imoveis IS NULL OR id_imovel = ANY(p_imoveis);
+
+    INSERT INTO resumo_imovel (
+        id_imovel, id_anfitriao, id_politica, titulo, capacidade_max,
+        total_reservas, confirmadas, canceladas, pendentes, soma_hospedes, dias_ocupados,
+        reservas_receita, receita_total,
+        reservas_politica, canceladas_politica, total_estornos
+    )
+    SELECT
+        i.id_imovel, i.id_usuario, i.id_politica, i.titulo, i.capacidade_max,
+        ocupacao.total_reservas, ocupacao.confirmadas, ocupacao.canceladas, ocupacao.pendentes,
+        ocupacao.soma_hospedes, ocupacao.dias_ocupados,
+        receita.reservas_receita, receita.receita_total,
+        politica.reservas_politica, politica.canceladas_politica, politica.total_estornos
+    FROM imovel i
+    CROSS JOIN LATERAL (
+        SELECT
+            COUNT(r.id_reserva) AS total_reservas,
+            COUNT(CASE WHEN r.status = 'confirmada' THEN 1 END) AS confirmadas,
+            COUNT(CASE WHEN r.status = 'cancelada' THEN 1 END) AS canceladas,
+            COUNT(CASE WHEN r.status = 'pendente' THEN 1 END) AS pendentes,
+            COALESCE(SUM(r.num_hospedes), 0) AS soma_hospedes,
+            COALESCE(SUM(CASE WHEN r.status = 'confirmada' THEN (r.data_fim - r.data_inicio) ELSE 0 END), 0) AS dias_ocupados
+        FROM reserva r
+        WHERE r.id_imovel = i.id_imovel
+    ) ocupacao
+    CROSS JOIN LATERAL (
+        SELECT
+            COUNT(r.id_reserva) AS reservas_receita,
+            COALESCE(SUM(p.valor_total), 0) AS receita_total
+        FROM reserva r
+        LEFT JOIN gera g ON r.id_reserva = g.id_reserva
+        LEFT JOIN pagamento p ON g.id_pagamento = p.id_pagamento
+        WHERE r.id_imovel = i.id_imovel AND r.status = 'confirmada'
+    ) receita
+    CROSS JOIN LATERAL (
+        SELECT
+            COUNT(r.id_reserva) AS reservas_politica,
+            COUNT(CASE WHEN r.status = 'cancelada' THEN 1 END) AS canceladas_politica,
+            COALESCE(SUM(e.valor_estorno), 0) AS total_estornos
+        FROM reserva r
+        LEFT JOIN (
+            reserva_cancelada rc
+            JOIN gera gc ON gc.id_pagamento = rc.id_pagamento
+        ) ON gc.id_reserva = r.id_reserva
+        LEFT JOIN gera_estorno ge ON rc.id_cancelamento = ge.id_cancelamento
+        LEFT JOIN estorno e ON ge.id_estorno = e.id_estorno
+        WHERE r.id_imovel = i.id_imovel
+    ) politica
+    WHERE p_imoveis IS NULL OR i.id_imovel = ANY(p_imoveis);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION atualizar_resumo_anfitriao(p_anfitrioes INT[]) RETURNS VOID AS $$
+BEGIN
+    DELETE FROM resumo_anfitriao
+    WHERE p_anfitrioes IS NULL OR id_usuario = ANY(p_anfitrioes);
+
+    INSERT INTO resumo_anfitriao (
+        id_usuario, total_imoveis, total_reservas, confirmadas, canceladas,
+        taxa_sucesso_percent, receita_total, ticket_medio, media_nota, total_avaliacoes
+    )
+    SELECT
+        u.id_usuario,
+        COUNT(DISTINCT i.id_imovel),
+        COUNT(r.id_reserva),
+        COUNT(CASE WHEN r.status = 'confirmada' THEN 1 END),
+        COUNT(CASE WHEN r.status = 'cancelada' THEN 1 END),
+        CAST(
+            (COUNT(CASE WHEN r.status = 'confirmada' THEN 1 END)::float /
+             NULLIF(COUNT(r.id_reserva), 0) * 100) AS DECIMAL(5,1)
+        ),
+        COALESCE(SUM(p.valor_total), 0),
+        CAST(COALESCE(AVG(p.valor_total), 0) AS DECIMAL(10,2)),
+        AVG(a.nota),
+        COUNT(DISTINCT ea.id_avaliacao)
+    FROM usuario u
+    JOIN anfitriao af ON u.id_usuario = af.id_usuario
+    JOIN imovel i ON u.id_usuario = i.id_usuario
+    LEFT JOIN reserva r ON i.id_imovel = r.id_imovel
+    LEFT JOIN gera g ON r.id_reserva = g.id_reserva
+    LEFT JOIN pagamento p ON g.id_pagamento = p.id_pagamento
+    LEFT JOIN experiencia_avaliada ea ON r.id_reserva = ea.id_reserva
+    LEFT JOIN avaliacao a ON ea.id_avaliacao = a.id_avaliacao
+    WHERE p_anfitrioes IS NULL OR u.id_usuario = ANY(p_anfitrioes)
+    GROUP BY u.id_usuario;
+
+    DELETE FROM resumo_anfitriao_mes
+    WHERE p_anfitrioes IS NULL OR id_usuario = ANY(p_anfitrioes);
+
+    INSERT INTO resumo_anfitriao_mes (id_usuario, mes_ano, reservas, receita_mensal)
+    SELECT
+        u.id_usuario,
+        TO_CHAR(p.data_pagamento, 'YYYY-MM'),
+        COUNT(r.id_reserva),
+        SUM(p.valor_total)
+    FROM usuario u
+    JOIN anfitriao a ON u.id_usuario = a.id_usuario
+    JOIN imovel i ON a.id_usuario = i.id_usuario
+    JOIN reserva r ON i.id_imovel = r.id_imovel
+    JOIN gera g ON r.id_reserva = g.id_reserva
+    JOIN pagamento p ON g.id_pagamento = p.id_pagamento
+    WHERE r.status = 'confirmada'
+      AND (p_anfitrioes IS NULL OR u.id_usuario = ANY(p_anfitrioes))
+    GROUP BY u.id_usuario, TO_CHAR(p.data_pagamento, 'YYYY-MM');
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION atualizar_resumo_mes(p_meses TEXT[]) RETURNS VOID AS $$
+BEGIN
+    DELETE FROM resumo_mes
+    WHERE p_meses IS NULL OR mes_ano = ANY(p_meses);
+
+    INSERT INTO resumo_mes (mes_ano, total_reservas, confirmadas, canceladas, pendentes)
+    SELECT
+        TO_CHAR(r.data_inicio, 'YYYY-MM'),
+        COUNT(r.id_reserva),
+        COUNT(CASE WHEN r.status = 'confirmada' THEN 1 END),
+        COUNT(CASE WHEN r.status = 'cancelada' THEN 1 END),
+        COUNT(CASE WHEN r.status = 'pendente' THEN 1 END)
+    FROM reserva r
+    WHERE p_meses IS NULL OR TO_CHAR(r.data_inicio, 'YYYY-MM') = ANY(p_meses)
+    GROUP BY TO_CHAR(r.data_inicio, 'YYYY-MM');
+END;
+$$ LANGUAGE plpgsql;
+
+-- Processa a fila de pendências e retorna quantas chaves foram recalculadas
+CREATE OR REPLACE FUNCTION atualizar_resumos() RETURNS INT AS $$
+DECLARE
+    v_imoveis INT[];
+    v_anfitrioes INT[];
+    v_meses TEXT[];
+BEGIN
+    WITH removidos AS (
+        DELETE FROM resumo_pendente RETURNING tipo, chave
+    )
+    SELECT
+        ARRAY_AGG(CASE WHEN tipo = 'imovel' THEN chave::int END) FILTER (WHERE tipo = 'imovel'),
+        ARRAY_AGG(CASE WHEN tipo = 'anfitriao' THEN chave::int END) FILTER (WHERE tipo = 'anfitriao'),
+        ARRAY_AGG(chave) FILTER (WHERE tipo = 'mes')
+    INTO v_imoveis, v_anfitrioes, v_meses
+    FROM removidos;
+
+    IF v_imoveis IS NOT NULL THEN
+        PERFORM atualizar_resumo_imovel(v_imoveis);
+    END IF;
+    IF v_anfitrioes IS NOT NULL THEN
+        PERFORM atualizar_resumo_anfitriao(v_anfitrioes);
+    END IF;
+    IF v_meses IS NOT NULL THEN
+        PERFORM atualizar_resumo_mes(v_meses);
+    END IF;
+
+    RETURN COALESCE(CARDINALITY(v_imoveis), 0)
+         + COALESCE(CARDINALITY(v_anfitrioes), 0)
+         + COALESCE(CARDINALITY(v_meses), 0);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recalcula todos os resumos do zero
+CREATE OR REPLACE FUNCTION reconstruir_resumos() RETURNS INT AS $$
+BEGIN
+    DELETE FROM resumo_pendente;
+    PERFORM atualizar_resumo_imovel(NULL);
+    PERFORM atualizar_resumo_anfitriao(NULL);
+    PERFORM atualizar_resumo_mes(NULL);
+    RETURN (SELECT COUNT(*) FROM resumo_imovel)
+         + (SELECT COUNT(*) FROM resumo_anfitriao)
+         + (SELECT COUNT(*) FROM resumo_mes);
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- ============================================================================
+-- MARCAÇÃO DE PENDÊNCIAS
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION marcar_resumo_imoveis(p_imoveis INT[]) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO resumo_pendente (tipo, chave)
+    SELECT 'imovel'::text, id::text FROM unnest(p_imoveis) AS id WHERE id IS NOT NULL
+    UNION
+    SELECT 'anfitriao'::text, i.id_usuario::text FROM imovel i WHERE i.id_imovel = ANY(p_imoveis)
+    ON CONFLICT DO NOTHING;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION marcar_resumo_anfitrioes(p_anfitrioes INT[]) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO resumo_pendente (tipo, chave)
+    SELECT DISTINCT 'anfitriao'::text, id::text FROM unnest(p_anfitrioes) AS id WHERE id IS NOT NULL
+    ON CONFLICT DO NOTHING;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION marcar_resumo_meses(p_meses TEXT[]) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO resumo_pendente (tipo, chave)
+    SELECT DISTINCT 'mes'::text, mes FROM unnest(p_meses) AS mes WHERE mes IS NOT NULL
+    ON CONFLICT DO NOTHING;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION marcar_resumo_reservas(p_reservas INT[]) RETURNS VOID AS $$
+BEGIN
+    PERFORM marcar_resumo_imoveis(ARRAY(
+        SELECT DISTINCT r.id_imovel FROM reserva r WHERE r.id_reserva = ANY(p_reservas)
+    ));
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION marcar_resumo_pagamentos(p_pagamentos INT[]) RETURNS VOID AS $$
+BEGIN
+    PERFORM marcar_resumo_reservas(ARRAY(
+        SELECT g.id_reserva FROM gera g WHERE g.id_pagamento = ANY(p_pagamentos)
+    ));
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION marcar_resumo_cancelamentos(p_cancelamentos INT[]) RETURNS VOID AS $$
+BEGIN
+    PERFORM marcar_resumo_pagamentos(ARRAY(
+        SELECT rc.id_pagamento FROM reserva_cancelada rc WHERE rc.id_cancelamento = ANY(p_cancelamentos)
+    ));
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- ============================================================================
+-- GATILHOS (por comando, com tabelas de transição)
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION trg_resumo_reserva() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM marcar_resumo_imoveis(ARRAY(SELECT DISTINCT id_imovel FROM novos));
+        PERFORM marcar_resumo_meses(ARRAY(SELECT DISTINCT TO_CHAR(data_inicio, 'YYYY-MM') FROM novos));
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM marcar_resumo_imoveis(ARRAY(SELECT DISTINCT id_imovel FROM antigos));
+        PERFORM marcar_resumo_meses(ARRAY(SELECT DISTINCT TO_CHAR(data_inicio, 'YYYY-MM') FROM antigos));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trg_resumo_imovel() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM marcar_resumo_imoveis(ARRAY(SELECT id_imovel FROM novos));
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        -- O imóvel pode ter sido removido ou trocado de dono: marca pelo registro antigo
+        PERFORM marcar_resumo_imoveis(ARRAY(SELECT id_imovel FROM antigos));
+        PERFORM marcar_resumo_anfitrioes(ARRAY(SELECT id_usuario FROM antigos));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trg_resumo_anfitriao() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM marcar_resumo_anfitrioes(ARRAY(SELECT id_usuario FROM novos));
+    ELSE
+        PERFORM marcar_resumo_anfitrioes(ARRAY(SELECT id_usuario FROM antigos));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Tabelas ligadas a uma reserva (gera, experiencia_avaliada)
+CREATE OR REPLACE FUNCTION trg_resumo_por_reserva() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM marcar_resumo_reservas(ARRAY(SELECT id_reserva FROM novos));
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM marcar_resumo_reservas(ARRAY(SELECT id_reserva FROM antigos));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Tabelas ligadas a um pagamento (pagamento, reserva_cancelada)
+CREATE OR REPLACE FUNCTION trg_resumo_por_pagamento() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM marcar_resumo_pagamentos(ARRAY(SELECT id_pagamento FROM novos));
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM marcar_resumo_pagamentos(ARRAY(SELECT id_pagamento FROM antigos));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Avaliações alteradas depois de vinculadas a uma reserva
+CREATE OR REPLACE FUNCTION trg_resumo_avaliacao() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM marcar_resumo_reservas(ARRAY(
+        SELECT ea.id_reserva FROM experiencia_avaliada ea
+        WHERE ea.id_avaliacao IN (SELECT id_avaliacao FROM novos)
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trg_resumo_gera_estorno() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM marcar_resumo_cancelamentos(ARRAY(SELECT id_cancelamento FROM novos));
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM marcar_resumo_cancelamentos(ARRAY(SELECT id_cancelamento FROM antigos));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Estornos alterados depois de vinculados a um cancelamento
+CREATE OR REPLACE FUNCTION trg_resumo_estorno() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM marcar_resumo_cancelamentos(ARRAY(
+        SELECT ge.id_cancelamento FROM gera_estorno ge
+        WHERE ge.id_estorno IN (SELECT id_estorno FROM novos)
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Reserva
+CREATE TRIGGER resumo_reserva_ins AFTER INSERT ON reserva
+    REFERENCING NEW TABLE AS novos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_reserva();
+CREATE TRIGGER resumo_reserva_upd AFTER UPDATE ON reserva
+    REFERENCING OLD TABLE AS antigos NEW TABLE AS novos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_reserva();
+CREATE TRIGGER resumo_reserva_del AFTER DELETE ON reserva
+    REFERENCING OLD TABLE AS antigos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_reserva();
+
+-- Imóvel
+CREATE TRIGGER resumo_imovel_ins AFTER INSERT ON imovel
+    REFERENCING NEW TABLE AS novos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_imovel();
+CREATE TRIGGER resumo_imovel_upd AFTER UPDATE ON imovel
+    REFERENCING OLD TABLE AS antigos NEW TABLE AS novos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_imovel();
+CREATE TRIGGER resumo_imovel_del AFTER DELETE ON imovel
+    REFERENCING OLD TABLE AS antigos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_imovel();
+
+-- Anfitrião
+CREATE TRIGGER resumo_anfitriao_ins AFTER INSERT ON anfitriao
+    REFERENCING NEW TABLE AS novos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_anfitriao();
+CREATE TRIGGER resumo_anfitriao_del AFTER DELETE ON anfitriao
+    REFERENCING OLD TABLE AS antigos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_anfitriao();
+
+-- Gera (pagamento -> reserva)
+CREATE TRIGGER resumo_gera_ins AFTER INSERT ON gera
+    REFERENCING NEW TABLE AS novos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_por_reserva();
+CREATE TRIGGER resumo_gera_upd AFTER UPDATE ON gera
+    REFERENCING OLD TABLE AS antigos NEW TABLE AS novos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_por_reserva();
+CREATE TRIGGER resumo_gera_del AFTER DELETE ON gera
+    REFERENCING OLD TABLE AS antigos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_por_reserva();
+
+-- Experiência avaliada (avaliação -> reserva)
+CREATE TRIGGER resumo_expav_ins AFTER INSERT ON experiencia_avaliada
+    REFERENCING NEW TABLE AS novos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_por_reserva();
+CREATE TRIGGER resumo_expav_upd AFTER UPDATE ON experiencia_avaliada
+    REFERENCING OLD TABLE AS antigos NEW TABLE AS novos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_por_reserva();
+CREATE TRIGGER resumo_expav_del AFTER DELETE ON experiencia_avaliada
+    REFERENCING OLD TABLE AS antigos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_por_reserva();
+
+-- Pagamento (inclusões só contam depois do vínculo em gera)
+CREATE TRIGGER resumo_pagamento_upd AFTER UPDATE ON pagamento
+    REFERENCING OLD TABLE AS antigos NEW TABLE AS novos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_por_pagamento();
+
+-- Reserva cancelada (cancelamento -> pagamento)
+CREATE TRIGGER resumo_rc_ins AFTER INSERT ON reserva_cancelada
+    REFERENCING NEW TABLE AS novos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_por_pagamento();
+CREATE TRIGGER resumo_rc_upd AFTER UPDATE ON reserva_cancelada
+    REFERENCING OLD TABLE AS antigos NEW TABLE AS novos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_por_pagamento();
+CREATE TRIGGER resumo_rc_del AFTER DELETE ON reserva_cancelada
+    REFERENCING OLD TABLE AS antigos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_por_pagamento();
+
+-- Gera estorno (estorno -> cancelamento)
+CREATE TRIGGER resumo_ge_ins AFTER INSERT ON gera_estorno
+    REFERENCING NEW TABLE AS novos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_gera_estorno();
+CREATE TRIGGER resumo_ge_upd AFTER UPDATE ON gera_estorno
+    REFERENCING OLD TABLE AS antigos NEW TABLE AS novos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_gera_estorno();
+CREATE TRIGGER resumo_ge_del AFTER DELETE ON gera_estorno
+    REFERENCING OLD TABLE AS antigos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_gera_estorno();
+
+-- Alterações de valores já vinculados
+CREATE TRIGGER resumo_avaliacao_upd AFTER UPDATE ON avaliacao
+    REFERENCING OLD TABLE AS antigos NEW TABLE AS novos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_avaliacao();
+CREATE TRIGGER resumo_estorno_upd AFTER UPDATE ON estorno
+    REFERENCING OLD TABLE AS antigos NEW TABLE AS novos FOR EACH STATEMENT EXECUTE FUNCTION trg_resumo_estorno();
+
+-- Carga inicial dos resumos
+SELECT reconstruir_resumos();
+
+-- @migracao: consultas
+-- =============================================================================
+-- CONSULTAS SOBRE OS RESUMOS
+-- =============================================================================
+-- Mesmas colunas das consultas de v2-ldi.sql, lidas das tabelas acima; o
+-- Streamlit as usa no lugar das originais (registro em src/consultas.py)
+
+-- Consulta 6: RECEITA TOTAL POR IMÓVEL
+SELECT 
+    ri.titulo, 
+    ri.reservas_receita as total_reservas,
+    ri.receita_total
+FROM resumo_imovel ri
+ORDER BY ri.receita_total DESC;
+
+-- Consulta 8: RECEITA MENSAL POR ANFITRIÃO
+SELECT 
+    u.nome as anfitriao,
+    ram.mes_ano,
+    ram.reservas,
+    ram.receita_mensal
+FROM resumo_anfitriao_mes ram
+JOIN usuario u ON ram.id_usuario = u.id_usuario
+WHERE u.nome = COALESCE(/*:anfitriao*/NULL, u.nome)
+ORDER BY ram.mes_ano DESC, ram.receita_mensal DESC;
+
+-- Consulta 10: RANKING DE ANFITRIÕES - PERFORMANCE COMPLETA
+SELECT 
+    u.nome as anfitriao,
+    ra.total_imoveis,
+    ra.total_reservas,
+    ra.confirmadas,
+    ra.canceladas,
+    ra.taxa_sucesso_percent,
+    ra.receita_total,
+    ra.ticket_medio,
+    CAST(COALESCE(ra.media_nota, 0) AS DECIMAL(3,1)) as nota_media,
+    ra.total_avaliacoes,
+    CASE 
+        WHEN ra.media_nota >= 4.5 THEN 'Excelente'
+        WHEN ra.media_nota >= 4.0 THEN 'Muito Bom'
+        WHEN ra.media_nota >= 3.0 THEN 'Bom'
+        WHEN ra.media_nota >= 2.0 THEN 'Regular'
+        ELSE 'Precisa Melhorar'
+    END as classificacao
+FROM resumo_anfitriao ra
+JOIN usuario u ON ra.id_usuario = u.id_usuario
+ORDER BY ra.receita_total DESC, nota_media DESC;
+
+-- Consulta 12: OCUPAÇÃO POR PERÍODO - ANÁLISE TEMPORAL
+SELECT 
+    rm.mes_ano,
+    rm.total_reservas,
+    rm.confirmadas,
+    rm.canceladas,
+    rm.pendentes,
+    ROUND(rm.confirmadas::numeric / 
+          NULLIF(rm.total_reservas, 0) * 100, 1) as taxa_sucesso
+FROM resumo_mes rm
+ORDER BY rm.mes_ano DESC;
+
+-- Consulta 13: RELATÓRIO DE OCUPAÇÃO COMPLETO
+SELECT 
+    ri.titulo,
+    ri.capacidade_max as capacidade,
+    ri.confirmadas,
+    ri.canceladas,
+    ri.pendentes,
+    ROUND(ri.soma_hospedes::numeric / NULLIF(ri.total_reservas, 0), 1) as media_hospedes,
+    ri.dias_ocupados
+FROM resumo_imovel ri
+ORDER BY ri.confirmadas DESC, ri.dias_ocupados DESC;
+
+-- Consulta 17: EFETIVIDADE DAS POLÍTICAS DE CANCELAMENTO
+SELECT 
+    pc.tipo_politica,
+    COUNT(ri.id_imovel) as imoveis_com_politica,
+    SUM(ri.reservas_politica) as total_reservas,
+    SUM(ri.canceladas_politica) as cancelamentos,
+    ROUND(SUM(ri.canceladas_politica)::numeric / 
+          NULLIF(SUM(ri.reservas_politica), 0) * 100, 1) as taxa_cancelamento,
+    SUM(ri.total_estornos) as total_estornos
+FROM politica_cancelamento pc
+JOIN resumo_imovel ri ON pc.id_politica = ri.id_politica
+GROUP BY pc.id_politica, pc.tipo_politica
+ORDER BY taxa_cancelamento ASC;
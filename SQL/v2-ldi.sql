@@ -1,7 +1,13 @@
 -- ============================================
 -- SISTEMA DE LOCAÇÃO DE IMÓVEIS - DATABASE
 -- ============================================
+-- Executado direto (psql), recria o banco inteiro. O app aplica só os passos
+-- marcados com '-- @migracao: nome' que ainda não constam em schema_migracao
+-- (DatabaseManager.migrate): 'reset' só roda ao recriar o banco e o que vem
+-- depois de 'consultas' nunca é aplicado. Passo já aplicado não deve mudar;
+-- alterações de schema entram como um passo novo no fim do bloco de passos.
 
+-- @migracao: reset
 -- LIMPEZA DO BANCO (Remove tudo se já existir)
 DROP TABLE IF EXISTS gera_pag_multa CASCADE;
 DROP TABLE IF EXISTS gera_multa CASCADE;
@@ -28,6 +34,10 @@ DROP TABLE IF EXISTS telefone_usuario CASCADE;
 DROP TABLE IF EXISTS usuario CASCADE;
 DROP TYPE IF EXISTS enum_forma_pagamento CASCADE;
 
+-- @migracao: 001_schema
+-- Igualdade de inteiros dentro de índices GiST (restrição de exclusão das reservas)
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
 -- Tipo ENUM para forma de pagamento
 CREATE TYPE enum_forma_pagamento AS ENUM (
     'Cartão de crédito',
@@ -125,8 +135,14 @@ CREATE TABLE reserva (
     data_inicio DATE NOT NULL,
     data_fim DATE NOT NULL,
     status VARCHAR(50) NOT NULL,
+    -- Noites ocupadas: o dia do check-out fica livre para a próxima entrada
+    periodo DATERANGE GENERATED ALWAYS AS (daterange(data_inicio, data_fim, '[)')) STORED,
     CONSTRAINT fk_reserva_usuario FOREIGN KEY (id_usuario) REFERENCES usuario(id_usuario),
-    CONSTRAINT fk_reserva_imovel FOREIGN KEY (id_imovel) REFERENCES imovel(id_imovel)
+    CONSTRAINT fk_reserva_imovel FOREIGN KEY (id_imovel) REFERENCES imovel(id_imovel),
+    -- Sem reservas ativas sobrepostas no mesmo imóvel; o índice GiST da restrição
+    -- também atende às buscas de disponibilidade (src/disponibilidade.py)
+    CONSTRAINT ex_reserva_periodo EXCLUDE USING gist (id_imovel WITH =, periodo WITH &&)
+        WHERE (status IN ('confirmada', 'pendente'))
 );
 
 -- Avaliações feitas após a estadia
@@ -231,6 +247,48 @@ CREATE TABLE gera_pag_multa (
     CONSTRAINT fk_gpm_pag FOREIGN KEY (id_pagamento) REFERENCES pagamento(id_pagamento)
 );
 
+-- ÍNDICES PARA OS CAMINHOS DE JUNÇÃO E FILTRO DAS CONSULTAS --
+-- (o PostgreSQL só indexa automaticamente as chaves primárias e UNIQUE)
+
+-- Chaves estrangeiras usadas nas junções
+CREATE INDEX idx_telefone_usuario_usuario ON telefone_usuario (id_usuario);
+CREATE INDEX idx_imovel_usuario ON imovel (id_usuario);
+CREATE INDEX idx_imovel_politica ON imovel (id_politica);
+CREATE INDEX idx_oferece_imovel ON oferece (id_imovel);
+CREATE INDEX idx_reserva_imovel ON reserva (id_imovel);
+CREATE INDEX idx_reserva_usuario ON reserva (id_usuario);
+CREATE INDEX idx_experiencia_avaliada_avaliacao ON experiencia_avaliada (id_avaliacao);
+CREATE INDEX idx_servicos_vinculados_reserva ON servicos_vinculados (id_reserva);
+CREATE INDEX idx_gera_reserva ON gera (id_reserva);
+CREATE INDEX idx_reserva_cancelada_pagamento ON reserva_cancelada (id_pagamento);
+CREATE INDEX idx_gera_estorno_cancelamento ON gera_estorno (id_cancelamento);
+CREATE INDEX idx_gera_multa_cancelamento ON gera_multa (id_cancelamento);
+CREATE INDEX idx_gera_pag_multa_pagamento ON gera_pag_multa (id_pagamento);
+
+-- Reservas confirmadas por imóvel (consultas 4, 6, 16 e resumos), índice parcial
+CREATE INDEX idx_reserva_imovel_confirmada ON reserva (id_imovel, data_inicio)
+    WHERE status = 'confirmada';
+
+-- Filtros por status/período (consultas 3, 4, 12)
+CREATE INDEX idx_reserva_status_inicio ON reserva (status, data_inicio);
+
+-- Paginação por keyset (consultas 3, 5, 7 e 18): as mesmas expressões da ordenação,
+-- com a chave primária como desempate, para que cada página seja uma busca no
+-- índice a partir da última linha, sem ordenar o resultado inteiro
+CREATE INDEX idx_reserva_inicio_id ON reserva (data_inicio DESC, id_reserva DESC);
+CREATE INDEX idx_pagamento_data_id
+    ON pagamento ((COALESCE(data_pagamento, TIMESTAMP '0001-01-01')) DESC, id_pagamento DESC);
+CREATE INDEX idx_cancelamento_data_id
+    ON cancelamento ((COALESCE(data_cancelamento, TIMESTAMP '0001-01-01')) DESC, id_cancelamento DESC);
+
+-- Parcelas por vencimento, cobrindo as colunas lidas (consulta 7: index-only scan)
+CREATE INDEX idx_parcela_vencimento_id ON parcela (data_vencimento, id_pagamento, num_parcelas)
+    INCLUDE (valor_parcela);
+
+-- Busca por título (consulta 20)
+CREATE INDEX idx_imovel_titulo ON imovel (titulo);
+
+-- @migracao: 002_dados
 -- POPULANDO A BASE E CONSULTANDO DADOS DO SISTEMA DE LOCAÇÃO --
 
 -- Inserção de políticas de cancelamento
@@ -441,19 +499,36 @@ INSERT INTO avaliacao (nota, comentario, data_avaliacao) VALUES
 INSERT INTO experiencia_avaliada (id_reserva, id_avaliacao) VALUES
 (1, 1), (2, 2), (3, 3), (4, 4), (5, 5);
 
+-- Atualiza as estatísticas do planejador após a carga
+ANALYZE;
+
 
+-- @migracao: consultas
 -- ============================================================================
 -- CONSULTAS SQL PARA DEMONSTRAÇÃO
 -- ============================================================================
 -- Total: 21 consultas organizadas por categoria
+-- Anotações lidas por src/consultas.py:
+--   @categoria  grupo das consultas seguintes     @nome  título exibido
+--   @ttl        segundos do resultado em cache (consultas com CURRENT_DATE mudam mais)
+--   @chave      ordenação da paginação: expressão + ASC/DESC, sobre as tabelas da consulta
+--               (com UNION, sobre as colunas do resultado); a última chave desempata
+--               (chave primária) e o ORDER BY repete as chaves, servidas por um índice
+--   @parametro  nome tipo: o valor entra no SQL como /*:nome*/padrão; sem argumento
+--               (ou executando este arquivo direto) vale o padrão escrito ali
+--   @moeda      colunas em reais: o SQL devolve NUMERIC e o Streamlit formata na exibição
+--   @perfil     perfil de execução (PERFIS_EXECUCAO em src/database.py): tempo limite,
+--               work_mem, JIT e paralelismo; sem anotação, 'operacional'
 -- =============================================================================
 
 
 -- =============================================================================
 -- CONSULTAS OPERACIONAIS BÁSICAS (4 consultas)
+-- @categoria: 🏢 CONSULTAS OPERACIONAIS
 -- =============================================================================
 
 -- Consulta 1: USUÁRIOS E SEUS PERFIS
+-- @nome: Usuários e Perfis
 SELECT 
     u.nome,
     u.email,
@@ -471,11 +546,13 @@ GROUP BY u.id_usuario, u.nome, u.email, a.id_usuario, h.id_usuario
 ORDER BY u.nome;
 
 -- Consulta 2: IMÓVEIS DISPONÍVEIS E SUAS CARACTERÍSTICAS
+-- @nome: Imóveis Disponíveis e suas Características
+-- @moeda: diaria
 SELECT 
     i.titulo,
     CONCAT(i.cidade, ', ', i.estado) as localizacao,
     i.capacidade_max as capacidade,
-    CONCAT('R$ ', i.valor_diaria) as diaria,
+    i.valor_diaria as diaria,
     pc.tipo_politica as politica,
     COUNT(DISTINCT c.comodidade) as total_comodidades
 FROM imovel i
@@ -485,6 +562,11 @@ GROUP BY i.id_imovel, i.titulo, i.cidade, i.estado, i.capacidade_max, i.valor_di
 ORDER BY i.valor_diaria DESC;
 
 -- Consulta 3: RESERVAS E STATUS ATUAL
+-- @nome: Reservas e Status Atual
+-- @ttl: 60
+-- @chave: r.data_inicio DESC
+-- @chave: r.id_reserva DESC
+-- @parametro: status text
 SELECT 
     u.nome as hospede,
     i.titulo as imovel,
@@ -500,28 +582,33 @@ SELECT
 FROM reserva r
 JOIN usuario u ON r.id_usuario = u.id_usuario
 JOIN imovel i ON r.id_imovel = i.id_imovel
-ORDER BY r.data_inicio DESC;
+WHERE r.status = COALESCE(/*:status*/NULL, r.status)
+ORDER BY r.data_inicio DESC, r.id_reserva DESC;
 
 -- Consulta 4: DISPONIBILIDADE DE IMÓVEIS - CONSULTA PRÁTICA
+-- @nome: Disponibilidade de Imóveis - Consulta Prática
+-- @ttl: 60
+-- @parametro: inicio date
+-- @parametro: fim date
+-- @moeda: diaria_base
 SELECT 
     i.titulo,
     CONCAT(i.cidade, ', ', i.estado) as localizacao,
     i.capacidade_max as capacidade,
-    CONCAT('R$ ', i.valor_diaria) as diaria_base,
+    i.valor_diaria as diaria_base,
     pc.tipo_politica as politica,
     CASE 
         WHEN EXISTS (
             SELECT 1 FROM reserva r 
             WHERE r.id_imovel = i.id_imovel 
             AND r.status IN ('confirmada', 'pendente')
-            AND r.data_inicio <= CURRENT_DATE + INTERVAL '90 days'
-            AND r.data_fim >= CURRENT_DATE
+            AND r.periodo && daterange(/*:inicio*/CURRENT_DATE, /*:fim*/(CURRENT_DATE + 90), '[]')
         ) THEN 'Reservado próximos 90 dias'
         WHEN EXISTS (
             SELECT 1 FROM reserva r 
             WHERE r.id_imovel = i.id_imovel 
             AND r.status = 'confirmada'
-            AND r.data_inicio > CURRENT_DATE
+            AND r.data_inicio > /*:inicio*/CURRENT_DATE
         ) THEN 'Reservas futuras confirmadas'
         ELSE 'Disponível para reserva'
     END as disponibilidade_30d,
@@ -539,12 +626,17 @@ ORDER BY avaliacao_media DESC, i.valor_diaria ASC;
 
 -- =============================================================================
 -- ANÁLISES FINANCEIRAS (4 consultas)
+-- @categoria: 💰 ANÁLISES FINANCEIRAS
 -- =============================================================================
 
 -- Consulta 5: ANÁLISE FINANCEIRA - PAGAMENTOS
+-- @nome: Análise de Pagamentos
+-- @chave: COALESCE(p.data_pagamento, TIMESTAMP '0001-01-01') DESC
+-- @chave: p.id_pagamento DESC
+-- @moeda: valor
 SELECT 
     p.id_pagamento as pagamento_id,
-    CONCAT('R$ ', p.valor_total) as valor,
+    p.valor_total as valor,
     p.forma_pagamento,
     TO_CHAR(p.data_pagamento, 'DD/MM/YYYY') as data_pag,
     COALESCE(COUNT(pa.num_parcelas), 0) as total_parcelas,
@@ -556,28 +648,39 @@ SELECT
 FROM pagamento p
 LEFT JOIN parcela pa ON p.id_pagamento = pa.id_pagamento
 GROUP BY p.id_pagamento, p.valor_total, p.forma_pagamento, p.data_pagamento
-ORDER BY p.data_pagamento DESC;
+ORDER BY COALESCE(p.data_pagamento, TIMESTAMP '0001-01-01') DESC, p.id_pagamento DESC;
 
 -- Consulta 6: RECEITA TOTAL POR IMÓVEL
+-- @nome: Receita por Imóvel
+-- @perfil: analitico
+-- @moeda: receita_total
 SELECT 
     i.titulo, 
     COUNT(r.id_reserva) as total_reservas,
-    CONCAT('R$ ', COALESCE(SUM(p.valor_total), 0)) AS receita_total
+    COALESCE(SUM(p.valor_total), 0) AS receita_total
 FROM imovel i
 LEFT JOIN reserva r ON i.id_imovel = r.id_imovel AND r.status = 'confirmada'
 LEFT JOIN gera g ON r.id_reserva = g.id_reserva
 LEFT JOIN pagamento p ON g.id_pagamento = p.id_pagamento
 GROUP BY i.titulo, i.id_imovel
-ORDER BY COALESCE(SUM(p.valor_total), 0) DESC;
+ORDER BY receita_total DESC;
 
 -- Consulta 7: PARCELAS EM ABERTO - GESTÃO FINANCEIRA
+-- @nome: Parcelas em Aberto - Gestão Financeira
+-- @ttl: 60
+-- @chave: p.data_vencimento ASC
+-- @chave: p.id_pagamento ASC
+-- @chave: p.num_parcelas ASC
+-- @parametro: inicio date
+-- @parametro: fim date
+-- @moeda: valor_total, valor_parcela
 SELECT 
     u.nome as hospede,
     i.titulo as imovel,
-    CONCAT('R$ ', pg.valor_total) as valor_total,
+    pg.valor_total,
     pg.forma_pagamento,
     CONCAT('Parcela ', p.num_parcelas) as parcela,
-    CONCAT('R$ ', p.valor_parcela) as valor_parcela,
+    p.valor_parcela,
     TO_CHAR(p.data_vencimento, 'DD/MM/YYYY') as vencimento,
     CASE 
         WHEN p.data_vencimento < CURRENT_DATE THEN 'EM ATRASO'
@@ -592,15 +695,20 @@ JOIN gera g ON pg.id_pagamento = g.id_pagamento
 JOIN reserva r ON g.id_reserva = r.id_reserva
 JOIN usuario u ON r.id_usuario = u.id_usuario
 JOIN imovel i ON r.id_imovel = i.id_imovel
-WHERE p.data_vencimento >= CURRENT_DATE
-ORDER BY p.data_vencimento, u.nome;
+WHERE p.data_vencimento >= /*:inicio*/CURRENT_DATE
+  AND p.data_vencimento <= /*:fim*/DATE 'infinity'
+ORDER BY p.data_vencimento, p.id_pagamento, p.num_parcelas;
 
 -- Consulta 8: RECEITA MENSAL POR ANFITRIÃO
+-- @nome: Receita Mensal por Anfitrião
+-- @perfil: analitico
+-- @parametro: anfitriao text
+-- @moeda: receita_mensal
 SELECT 
     u.nome as anfitriao,
     TO_CHAR(p.data_pagamento, 'YYYY-MM') as mes_ano,
     COUNT(r.id_reserva) as reservas,
-    CONCAT('R$ ', SUM(p.valor_total)) as receita_mensal
+    SUM(p.valor_total) as receita_mensal
 FROM usuario u
 JOIN anfitriao a ON u.id_usuario = a.id_usuario
 JOIN imovel i ON a.id_usuario = i.id_usuario
@@ -608,30 +716,41 @@ JOIN reserva r ON i.id_imovel = r.id_imovel
 JOIN gera g ON r.id_reserva = g.id_reserva
 JOIN pagamento p ON g.id_pagamento = p.id_pagamento
 WHERE r.status = 'confirmada'
+  AND u.nome = COALESCE(/*:anfitriao*/NULL, u.nome)
 GROUP BY u.nome, u.id_usuario, TO_CHAR(p.data_pagamento, 'YYYY-MM')
-ORDER BY mes_ano DESC, SUM(p.valor_total) DESC;
+ORDER BY mes_ano DESC, receita_mensal DESC;
 
 -- Consulta 9: FLUXO FINANCEIRO COMPLETO POR RESERVA
-SELECT r.id_reserva, 'Principal' as tipo, p.valor_total, p.forma_pagamento, p.data_pagamento
+-- @nome: Fluxo Financeiro Completo
+-- @perfil: analitico
+-- @chave: id_reserva ASC
+-- @chave: tipo ASC
+-- @chave: pagamento_id ASC
+-- @moeda: valor_total
+SELECT r.id_reserva, 'Principal' as tipo, p.id_pagamento as pagamento_id, p.valor_total, p.forma_pagamento, p.data_pagamento
 FROM reserva r
 JOIN gera g ON r.id_reserva = g.id_reserva
 JOIN pagamento p ON g.id_pagamento = p.id_pagamento
 UNION ALL
-SELECT r.id_reserva, 'Multa' as tipo, p.valor_total, p.forma_pagamento, p.data_pagamento
-FROM reserva r
-JOIN reserva_cancelada rc ON EXISTS (
-    SELECT 1 FROM gera g2 WHERE g2.id_reserva = r.id_reserva AND g2.id_pagamento = rc.id_pagamento
-)
+SELECT r.id_reserva, 'Multa' as tipo, p.id_pagamento, p.valor_total, p.forma_pagamento, p.data_pagamento
+FROM reserva_cancelada rc
+JOIN gera g2 ON rc.id_pagamento = g2.id_pagamento
+JOIN reserva r ON g2.id_reserva = r.id_reserva
 JOIN gera_multa gm ON rc.id_cancelamento = gm.id_cancelamento
 JOIN gera_pag_multa gpm ON gm.id_multa = gpm.id_multa
 JOIN pagamento p ON gpm.id_pagamento = p.id_pagamento
-ORDER BY id_reserva, tipo;
+ORDER BY id_reserva, tipo, pagamento_id;
 
 -- =============================================================================
 -- BUSINESS INTELLIGENCE (4 consultas)
+-- @categoria: 📊 BUSINESS INTELLIGENCE
 -- =============================================================================
 
 -- Consulta 10: RANKING DE ANFITRIÕES - PERFORMANCE COMPLETA
+-- @nome: Ranking de Anfitriões
+-- @perfil: analitico
+-- @ttl: 900
+-- @moeda: receita_total, ticket_medio
 SELECT 
     u.nome as anfitriao,
     COUNT(DISTINCT i.id_imovel) as total_imoveis,
@@ -642,8 +761,8 @@ SELECT
         (COUNT(CASE WHEN r.status = 'confirmada' THEN 1 END)::float / 
          NULLIF(COUNT(r.id_reserva), 0) * 100) AS DECIMAL(5,1)
     ) as taxa_sucesso_percent,
-    CONCAT('R$ ', COALESCE(SUM(p.valor_total), 0)) as receita_total,
-    CONCAT('R$ ', CAST(COALESCE(AVG(p.valor_total), 0) AS DECIMAL(10,2))) as ticket_medio,
+    COALESCE(SUM(p.valor_total), 0) as receita_total,
+    CAST(COALESCE(AVG(p.valor_total), 0) AS DECIMAL(10,2)) as ticket_medio,
     CAST(COALESCE(AVG(a.nota), 0) AS DECIMAL(3,1)) as nota_media,
     COUNT(DISTINCT ea.id_avaliacao) as total_avaliacoes,
     CASE 
@@ -665,6 +784,8 @@ GROUP BY u.id_usuario, u.nome
 ORDER BY receita_total DESC, nota_media DESC;
 
 -- Consulta 11: HÓSPEDES MAIS ATIVOS - RANKING
+-- @nome: Hóspedes Mais Ativos
+-- @perfil: analitico
 SELECT 
     u.nome, 
     COUNT(*) AS total_reservas,
@@ -676,6 +797,9 @@ GROUP BY u.nome, u.id_usuario
 ORDER BY total_reservas DESC;
 
 -- Consulta 12: OCUPAÇÃO POR PERÍODO - ANÁLISE TEMPORAL
+-- @nome: Ocupação por Período
+-- @perfil: analitico
+-- @ttl: 900
 SELECT 
     TO_CHAR(r.data_inicio, 'YYYY-MM') as mes_ano,
     COUNT(r.id_reserva) as total_reservas,
@@ -689,6 +813,9 @@ GROUP BY TO_CHAR(r.data_inicio, 'YYYY-MM')
 ORDER BY mes_ano DESC;
 
 -- Consulta 13: RELATÓRIO DE OCUPAÇÃO COMPLETO
+-- @nome: Relatório de Ocupação Completo
+-- @perfil: analitico
+-- @ttl: 900
 SELECT 
     i.titulo,
     i.capacidade_max as capacidade,
@@ -704,24 +831,29 @@ ORDER BY confirmadas DESC, dias_ocupados DESC;
 
 -- =============================================================================
 -- SERVIÇOS E AVALIAÇÕES (4 consultas)
+-- @categoria: ⭐ SERVIÇOS E AVALIAÇÕES
 -- =============================================================================
 
 -- Consulta 14: SERVIÇOS EXTRAS MAIS CONTRATADOS
+-- @nome: Serviços Extras Mais Contratados
+-- @moeda: valor, receita_total
 SELECT 
     se.nome as servico,
-    CONCAT('R$ ', se.valor_servico) as valor,
+    se.valor_servico as valor,
     COUNT(sv.id_reserva) as vezes_contratado,
-    CONCAT('R$ ', (se.valor_servico * COUNT(sv.id_reserva))) as receita_total
+    se.valor_servico * COUNT(sv.id_reserva) as receita_total
 FROM servico_extra se
 LEFT JOIN servicos_vinculados sv ON se.id_servico = sv.id_servico
 GROUP BY se.id_servico, se.nome, se.valor_servico
 ORDER BY COUNT(sv.id_reserva) DESC;
 
 -- Consulta 15: SERVIÇOS EXTRAS - CONTRATAÇÕES POR HÓSPEDE
+-- @nome: Serviços Extras - Contratações por Hóspede
+-- @moeda: valor
 SELECT 
     u.nome AS hospede, 
     se.nome AS servico,
-    CONCAT('R$ ', se.valor_servico) as valor,
+    se.valor_servico as valor,
     COUNT(*) as vezes_contratado
 FROM reserva r
 JOIN servicos_vinculados sv ON r.id_reserva = sv.id_reserva
@@ -731,6 +863,7 @@ GROUP BY u.nome, se.nome, se.valor_servico
 ORDER BY u.nome, vezes_contratado DESC;
 
 -- Consulta 16: AVALIAÇÕES E QUALIDADE DOS IMÓVEIS
+-- @nome: Avaliações e Qualidade dos Imóveis
 SELECT 
     i.titulo as imovel,
     ROUND(AVG(a.nota), 1) as nota_media,
@@ -752,6 +885,9 @@ HAVING COUNT(a.nota) > 0
 ORDER BY AVG(a.nota) DESC NULLS LAST;
 
 -- Consulta 17: EFETIVIDADE DAS POLÍTICAS DE CANCELAMENTO
+-- @nome: Efetividade das Políticas de Cancelamento
+-- @perfil: analitico
+-- @ttl: 900
 SELECT 
     pc.tipo_politica,
     COUNT(DISTINCT i.id_imovel) as imoveis_com_politica,
@@ -763,11 +899,10 @@ SELECT
 FROM politica_cancelamento pc
 JOIN imovel i ON pc.id_politica = i.id_politica
 LEFT JOIN reserva r ON i.id_imovel = r.id_imovel
-LEFT JOIN reserva_cancelada rc ON r.id_reserva = (
-    SELECT g.id_reserva FROM gera g 
-    JOIN reserva_cancelada rc2 ON g.id_pagamento = rc2.id_pagamento 
-    WHERE rc2.id_cancelamento = rc.id_cancelamento
-)
+LEFT JOIN (
+    reserva_cancelada rc
+    JOIN gera gc ON rc.id_pagamento = gc.id_pagamento
+) ON r.id_reserva = gc.id_reserva
 LEFT JOIN gera_estorno ge ON rc.id_cancelamento = ge.id_cancelamento
 LEFT JOIN estorno e ON ge.id_estorno = e.id_estorno
 GROUP BY pc.id_politica, pc.tipo_politica
@@ -775,31 +910,40 @@ ORDER BY taxa_cancelamento ASC;
 
 -- =============================================================================
 -- CANCELAMENTOS E POLÍTICAS (2 consultas)
+-- @categoria: 🚫 CANCELAMENTOS E POLÍTICAS
 -- =============================================================================
 
 -- Consulta 18: CANCELAMENTOS E IMPACTO FINANCEIRO
+-- @nome: Cancelamentos e Impacto Financeiro
+-- @chave: COALESCE(c.data_cancelamento, TIMESTAMP '0001-01-01') DESC
+-- @chave: c.id_cancelamento DESC
+-- @chave: p.id_pagamento DESC
+-- @chave: COALESCE(e.id_estorno, 0) DESC
+-- @moeda: valor_reserva, valor_estorno, receita_liquida
 SELECT 
     c.data_cancelamento as data_cancel,
     c.tipo_cancelamento,
-    CONCAT('R$ ', p.valor_total) as valor_reserva,
-    COALESCE(CONCAT('R$ ', e.valor_estorno), 'Sem estorno') as valor_estorno,
-    CASE 
-        WHEN e.valor_estorno IS NULL THEN CONCAT('R$ ', p.valor_total)
-        ELSE CONCAT('R$ ', (p.valor_total - e.valor_estorno))
-    END as receita_liquida
+    p.valor_total as valor_reserva,
+    e.valor_estorno,  -- NULL quando não houve estorno
+    p.valor_total - COALESCE(e.valor_estorno, 0) as receita_liquida
 FROM cancelamento c
 JOIN reserva_cancelada rc ON c.id_cancelamento = rc.id_cancelamento
 JOIN pagamento p ON rc.id_pagamento = p.id_pagamento
 LEFT JOIN gera_estorno ge ON c.id_cancelamento = ge.id_cancelamento
 LEFT JOIN estorno e ON ge.id_estorno = e.id_estorno
-ORDER BY c.data_cancelamento DESC;
+ORDER BY COALESCE(c.data_cancelamento, TIMESTAMP '0001-01-01') DESC, c.id_cancelamento DESC,
+         p.id_pagamento DESC, COALESCE(e.id_estorno, 0) DESC;
 
 -- Consulta 19: ANÁLISE DE ESTORNOS POR POLÍTICA
+-- @nome: Análise de Estornos por Política
+-- @perfil: analitico
+-- @ttl: 900
+-- @moeda: valor_medio_estorno, valor_total_estornos
 SELECT 
     pc.tipo_politica,
     COUNT(*) as total_estornos,
-    CONCAT('R$ ', ROUND(AVG(e.valor_estorno), 2)) as valor_medio_estorno,
-    CONCAT('R$ ', SUM(e.valor_estorno)) as valor_total_estornos
+    ROUND(AVG(e.valor_estorno), 2) as valor_medio_estorno,
+    SUM(e.valor_estorno) as valor_total_estornos
 FROM politica_cancelamento pc
 JOIN imovel i ON pc.id_politica = i.id_politica
 JOIN reserva r ON i.id_imovel = r.id_imovel
@@ -811,9 +955,12 @@ GROUP BY pc.tipo_politica;
 
 -- =============================================================================
 -- RELATÓRIOS ESPECIAIS (2 consultas)
+-- @categoria: 📋 RELATÓRIOS ESPECIAIS
 -- =============================================================================
 
 -- Consulta 20: HISTÓRICO COMPLETO - CASA DA PRAIA
+-- @nome: Histórico Completo - Casa da Praia
+-- @parametro: imovel text
 SELECT 
     u.nome as hospede,
     TO_CHAR(r.data_inicio, 'DD/MM/YYYY') as check_in,
@@ -832,49 +979,44 @@ LEFT JOIN avaliacao a ON ea.id_avaliacao = a.id_avaliacao
 LEFT JOIN gera g ON r.id_reserva = g.id_reserva
 LEFT JOIN reserva_cancelada rc ON g.id_pagamento = rc.id_pagamento
 LEFT JOIN cancelamento c ON rc.id_cancelamento = c.id_cancelamento
-WHERE i.titulo = 'Casa da Praia'
+WHERE i.titulo = /*:imovel*/'Casa da Praia'
 ORDER BY r.data_inicio DESC;
 
 -- Consulta 21: DASHBOARD EXECUTIVO - KPIs DO NEGÓCIO
-SELECT 
-    'Total de Usuários' as metrica,
-    (SELECT COUNT(*) FROM usuario)::text as valor
-UNION ALL
-SELECT 
-    'Anfitriões Ativos',
-    (SELECT COUNT(*) FROM anfitriao)::text
-UNION ALL
-SELECT 
-    'Hóspedes Ativos', 
-    (SELECT COUNT(*) FROM hospede)::text
-UNION ALL
-SELECT 
-    'Total de Imóveis',
-    (SELECT COUNT(*) FROM imovel)::text
-UNION ALL
-SELECT 
-    'Total de Reservas',
-    (SELECT COUNT(*) FROM reserva)::text
-UNION ALL
-SELECT 
-    'Reservas Confirmadas',
-    (SELECT COUNT(*) FROM reserva WHERE status = 'confirmada')::text
-UNION ALL
-SELECT 
-    'Reservas Canceladas',
-    (SELECT COUNT(*) FROM reserva WHERE status = 'cancelada')::text
-UNION ALL
-SELECT 
-    'Reservas Pendentes',
-    (SELECT COUNT(*) FROM reserva WHERE status = 'pendente')::text
-UNION ALL
-SELECT 
-    'Receita Total',
-    CONCAT('R$ ', (SELECT COALESCE(SUM(valor_total), 0) FROM pagamento)::text)
-UNION ALL
-SELECT 
-    'Nota Média Geral',
-    CONCAT((SELECT COALESCE(ROUND(AVG(nota), 1), 0) FROM avaliacao)::text, '/5');
+-- @nome: KPIs do Negócio
+-- @perfil: analitico
+-- @ttl: 300
+-- Uma varredura por tabela (contagens por status com FILTER); valores numéricos,
+-- com o formato de exibição na coluna 'formato' (numero, moeda ou nota)
+WITH reservas AS (
+    SELECT
+        COUNT(*) AS total,
+        COUNT(*) FILTER (WHERE status = 'confirmada') AS confirmadas,
+        COUNT(*) FILTER (WHERE status = 'cancelada') AS canceladas,
+        COUNT(*) FILTER (WHERE status = 'pendente') AS pendentes
+    FROM reserva
+)
+SELECT k.metrica, k.valor, k.formato
+FROM reservas r
+CROSS JOIN (SELECT COUNT(*) FROM usuario) AS u(total)
+CROSS JOIN (SELECT COUNT(*) FROM anfitriao) AS a(total)
+CROSS JOIN (SELECT COUNT(*) FROM hospede) AS h(total)
+CROSS JOIN (SELECT COUNT(*) FROM imovel) AS i(total)
+CROSS JOIN (SELECT COALESCE(SUM(valor_total), 0) FROM pagamento) AS p(receita)
+CROSS JOIN (SELECT COALESCE(ROUND(AVG(nota), 1), 0) FROM avaliacao) AS av(nota)
+CROSS JOIN LATERAL (VALUES
+    (1, 'Total de Usuários', u.total::numeric, 'numero'),
+    (2, 'Anfitriões Ativos', a.total, 'numero'),
+    (3, 'Hóspedes Ativos', h.total, 'numero'),
+    (4, 'Total de Imóveis', i.total, 'numero'),
+    (5, 'Total de Reservas', r.total, 'numero'),
+    (6, 'Reservas Confirmadas', r.confirmadas, 'numero'),
+    (7, 'Reservas Canceladas', r.canceladas, 'numero'),
+    (8, 'Reservas Pendentes', r.pendentes, 'numero'),
+    (9, 'Receita Total', p.receita, 'moeda'),
+    (10, 'Nota Média Geral', av.nota, 'nota')
+) AS k(ordem, metrica, valor, formato)
+ORDER BY k.ordem;
 
 -- ============================================================================
 -- FIM DAS CONSULTAS
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Script para atualizar as tabelas de resumo da camada analítica
+Recalcula só os imóveis, anfitriões e meses alterados desde a última execução
+(use --completo para reconstruir tudo, --intervalo para rodar como job periódico)
+"""
+
+import argparse
+import sys
+import os
+import time
+
+# Adicionar src ao path para importar database
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from database import db_manager
+
+def atualizar(completo=False):
+    """Uma rodada de atualização; retorna as chaves recalculadas"""
+    inicio = time.perf_counter()
+    atualizadas = db_manager.refresh_analytics(full=completo)
+    print(f"✅ {atualizadas} chaves recalculadas em {time.perf_counter() - inicio:.2f}s")
+    return atualizadas
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Atualiza os resumos analíticos")
+    parser.add_argument('--completo', action='store_true',
+                        help="reconstrói todos os resumos em vez de só os pendentes")
+    parser.add_argument('--intervalo', type=float, default=0,
+                        help="repete a atualização a cada N segundos (0 = uma vez só)")
+    args = parser.parse_args()
+    
+    print("📊 Atualizando resumos analíticos...")
+    try:
+        atualizar(args.completo)
+    except Exception as e:
+        print(f"❌ Erro ao atualizar resumos: {e}")
+        sys.exit(1)
+    
+    # Job periódico: só as pendências; uma falha não encerra o job
+    while args.intervalo > 0:
+        time.sleep(args.intervalo)
+        try:
+            atualizar()
+        except Exception as e:
+            print(f"⚠️ Erro ao atualizar resumos: {e}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n⏹️ Atualização periódica encerrada.")
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Benchmark das 21 consultas do Sistema de Locação de Imóveis
+Executa cada consulta N vezes (após aquecimento) em bases de tamanhos
+crescentes e grava latências p50/p95/p99, linhas retornadas e buffers do
+EXPLAIN (ANALYZE, BUFFERS) em JSON e CSV, comparáveis entre execuções.
+Cada consulta roda no seu perfil (@perfil), e as que têm versão sobre os
+resumos (SQL/resumos.sql) são medidas nas duas versões: 'resumo' é a que o
+app executa, 'base' a consulta original
+
+Uso:
+    python scripts/benchmark_consultas.py                       # base atual
+    python scripts/benchmark_consultas.py --escalas 1k,100k,1M --execucoes 20
+    python scripts/benchmark_consultas.py --comparar bench/anterior.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Adicionar src e scripts ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+from database import db_manager
+from apresentacao_ldi import extrair_consultas
+import gerar_dados
+
+CAMPOS = ['escala', 'consulta', 'titulo', 'versao', 'execucoes', 'linhas', 'p50_ms', 'p95_ms',
+          'p99_ms', 'media_ms', 'buffers_hit', 'buffers_read', 'planejamento_ms', 'execucao_ms']
+
+
+def percentil(valores, p):
+    """Percentil com interpolação linear (p entre 0 e 100)"""
+    ordenados = sorted(valores)
+    if len(ordenados) == 1:
+        return ordenados[0]
+    posicao = (len(ordenados) - 1) * p / 100
+    base = int(posicao)
+    fracao = posicao - base
+    if base + 1 < len(ordenados):
+        return ordenados[base] + (ordenados[base + 1] - ordenados[base]) * fracao
+    return ordenados[base]
+
+
+def versoes(consulta):
+    """[(versão, sql)] a medir: a original e, se houver, a versão sobre os resumos"""
+    medidas = [('base', consulta['sql'])]
+    if consulta.get('sql_resumo'):
+        medidas.append(('resumo', consulta['sql_resumo']))
+    return medidas
+
+
+def medir_consulta(sql, execucoes, aquecimento, perfil=None):
+    """Executa a consulta no perfil dado e retorna (tempos em ms, linhas, plano do EXPLAIN)"""
+    tempos = []
+    linhas = 0
+    with db_manager.connection(profile=perfil) as conn:
+        with conn.cursor() as cursor:
+            for i in range(aquecimento + execucoes):
+                inicio = time.perf_counter()
+                cursor.execute(sql)
+                linhas = len(cursor.fetchall())
+                if i >= aquecimento:
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+            
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql.strip().rstrip(';'))
+            plano = cursor.fetchone()[0]
+            if isinstance(plano, str):
+                plano = json.loads(plano)
+    return tempos, linhas, plano[0]
+
+
+def executar_benchmark(escala, consultas, execucoes, aquecimento):
+    """Mede todas as consultas na base atual"""
+    resultados = []
+    for numero, consulta in enumerate(consultas, 1):
+        for versao, sql in versoes(consulta):
+            resultado = _medir(escala, numero, consulta, versao, sql, execucoes, aquecimento)
+            if resultado:
+                resultados.append(resultado)
+    return resultados
+
+
+def _medir(escala, numero, consulta, versao, sql, execucoes, aquecimento):
+    """Mede uma versão da consulta; retorna a linha do relatório ou None em caso de erro"""
+    try:
+        tempos, linhas, plano = medir_consulta(sql, execucoes, aquecimento, consulta.get('perfil'))
+    except Exception as e:
+        print(f"   [{numero:>2}] ❌ {consulta['titulo']} ({versao}): {e}")
+        return None
+    raiz = plano['Plan']
+    resultado = {
+        'escala': escala,
+        'consulta': numero,
+        'titulo': consulta['titulo'],
+        'versao': versao,
+        'execucoes': execucoes,
+        'linhas': linhas,
+        'p50_ms': round(percentil(tempos, 50), 3),
+        'p95_ms': round(percentil(tempos, 95), 3),
+        'p99_ms': round(percentil(tempos, 99), 3),
+        'media_ms': round(sum(tempos) / len(tempos), 3),
+        'buffers_hit': raiz.get('Shared Hit Blocks', 0),
+        'buffers_read': raiz.get('Shared Read Blocks', 0),
+        'planejamento_ms': plano.get('Planning Time'),
+        'execucao_ms': plano.get('Execution Time')
+    }
+    print(f"   [{numero:>2}] p50 {resultado['p50_ms']:>9.2f}ms  p95 {resultado['p95_ms']:>9.2f}ms  "
+          f"{linhas:>9,} linhas  {consulta['titulo'][:38]} ({versao})")
+    return resultado
+
+
+def gravar_relatorio(resultados, diretorio, parametros):
+    """Grava o relatório em JSON e CSV e retorna o caminho do JSON"""
+    os.makedirs(diretorio, exist_ok=True)
+    carimbo = datetime.now().strftime('%Y%m%d_%H%M%S')
+    caminho_json = os.path.join(diretorio, f"benchmark_{carimbo}.json")
+    caminho_csv = os.path.join(diretorio, f"benchmark_{carimbo}.csv")
+    
+    with open(caminho_json, 'w', encoding='utf-8') as arquivo:
+        json.dump({'gerado_em': datetime.now().isoformat(timespec='seconds'),
+                   'parametros': parametros,
+                   'resultados': resultados}, arquivo, ensure_ascii=False, indent=2)
+    with open(caminho_csv, 'w', encoding='utf-8', newline='') as arquivo:
+        escritor = csv.DictWriter(arquivo, fieldnames=CAMPOS)
+        escritor.writeheader()
+        escritor.writerows(resultados)
+    return caminho_json
+
+
+def comparar(resultados, caminho_anterior, limiar):
+    """Lista consultas cujo p95 piorou mais que `limiar` (fração) e retorna quantas"""
+    with open(caminho_anterior, 'r', encoding='utf-8') as arquivo:
+        # Relatórios anteriores à coluna 'versao' só têm a consulta original
+        anteriores = {(r['escala'], r['titulo'], r.get('versao', 'base')): r
+                      for r in json.load(arquivo)['resultados']}
+    
+    regressoes = 0
+    for atual in resultados:
+        anterior = anteriores.get((atual['escala'], atual['titulo'], atual['versao']))
+        if not anterior or not anterior['p95_ms']:
+            continue
+        variacao = atual['p95_ms'] / anterior['p95_ms'] - 1
+        if variacao > limiar:
+            regressoes += 1
+            print(f"   ⚠️  [{atual['escala']}] {atual['titulo'][:38]} ({atual['versao']}): p95 "
+                  f"{anterior['p95_ms']:.2f}ms → {atual['p95_ms']:.2f}ms (+{variacao:.0%})")
+    return regressoes
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Benchmark das consultas do LDI")
+    parser.add_argument('--escalas', help="reservas por base a gerar, ex.: 1k,100k,1M (padrão: base atual)")
+    parser.add_argument('--execucoes', type=int, default=10, help="execuções medidas por consulta")
+    parser.add_argument('--aquecimento', type=int, default=2, help="execuções descartadas antes da medição")
+    parser.add_argument('--semente', type=int, default=42, help="semente do gerador de dados")
+    parser.add_argument('--saida', default='bench', help="diretório dos relatórios")
+    parser.add_argument('--comparar', help="relatório JSON anterior para detectar regressões")
+    parser.add_argument('--limiar', type=float, default=0.2, help="piora de p95 tolerada (0.2 = 20%%)")
+    args = parser.parse_args()
+    
+    consultas = extrair_consultas()
+    if not consultas:
+        print("❌ Nenhuma consulta encontrada")
+        sys.exit(1)
+    
+    resultados = []
+    try:
+        if args.escalas:
+            for escala in args.escalas.split(','):
+                reservas = gerar_dados.interpretar_escala(escala)
+                print(f"\n🏭 Preparando base com {reservas:,} reservas...")
+                with tempfile.TemporaryDirectory(prefix='ldi_bench_') as diretorio:
+                    gerar_dados.Gerador(reservas, args.semente).gerar(diretorio)
+                    gerar_dados.carregar(diretorio)
+                print(f"⏱️  Medindo {len(consultas)} consultas ({args.execucoes} execuções cada)")
+                resultados += executar_benchmark(escala, consultas, args.execucoes, args.aquecimento)
+        else:
+            print(f"⏱️  Medindo {len(consultas)} consultas na base atual ({args.execucoes} execuções cada)")
+            resultados += executar_benchmark('atual', consultas, args.execucoes, args.aquecimento)
+    except Exception as e:
+        print(f"❌ Erro: {e}")
+        sys.exit(1)
+    
+    caminho = gravar_relatorio(resultados, args.saida, vars(args))
+    print(f"\n📄 Relatório: {caminho} (e .csv)")
+    
+    if args.comparar:
+        print(f"\n🔍 Comparando com {args.comparar}...")
+        regressoes = comparar(resultados, args.comparar, args.limiar)
+        if regressoes:
+            print(f"❌ {regressoes} regressões acima de {args.limiar:.0%}")
+            sys.exit(1)
+        print("✅ Nenhuma regressão")
+
+
+if __name__ == "__main__":
+    main()
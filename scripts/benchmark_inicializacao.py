@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmark de inicialização do Streamlit (partida a frio)
+Importa o app em interpretadores novos, N vezes, e mede o tempo até a
+primeira tela (set_page_config, registro de consultas, cache), descontando
+o próprio `import streamlit`. Também lista as importações mais lentas
+(python -X importtime) e quais dependências opcionais o app carregou na
+partida: plotly, pyarrow e openpyxl só devem ser importados quando um
+gráfico ou uma exportação é aberto.
+
+Não precisa do banco: importar o app não abre conexões.
+
+Uso:
+    python scripts/benchmark_inicializacao.py                     # 5 partidas, orçamento de 400ms
+    python scripts/benchmark_inicializacao.py --execucoes 10 --orcamento-ms 250
+    python scripts/benchmark_inicializacao.py --renderizar        # também executa a 1ª página (requer banco)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+APP = os.path.join(SRC, 'app_streamlit.py')
+
+# Dependências que a primeira tela não pode importar (além das que o próprio streamlit importa)
+OPCIONAIS = ('plotly', 'pyarrow', 'openpyxl')
+# Só informativas: o app as importa quando a primeira consulta é exibida
+PESADAS = ('pandas', 'numpy', 'psycopg2')
+
+MEDIR = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+inicio = time.perf_counter()
+import {modulo}
+ms = (time.perf_counter() - inicio) * 1000
+print(json.dumps({{'ms': ms, 'modulos': sorted(m for m in {modulos!r} if m in sys.modules)}}))
+"""
+
+
+def medir_importacao(modulo, importtime=False):
+    """Importa `modulo` num interpretador novo; retorna (ms, módulos carregados, stderr)"""
+    comando = [sys.executable]
+    if importtime:
+        comando += ['-X', 'importtime']
+    codigo = MEDIR.format(src=SRC, modulo=modulo, modulos=OPCIONAIS + PESADAS)
+    processo = subprocess.run(comando + ['-c', codigo], cwd=SRC, capture_output=True, text=True)
+    if processo.returncode != 0:
+        raise RuntimeError(f"falha ao importar {modulo}:\n{processo.stderr[-2000:]}")
+    resultado = json.loads(processo.stdout.strip().splitlines()[-1])
+    return resultado['ms'], resultado['modulos'], processo.stderr
+
+
+def ler_importtime(saida):
+    """Linhas do -X importtime -> {módulo: (próprio_ms, acumulado_ms)}"""
+    tempos = {}
+    for linha in saida.splitlines():
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+        proprio, acumulado, nome = linha.split(':', 1)[1].split('|')
+        tempos[nome.strip()] = (int(proprio) / 1000, int(acumulado) / 1000)
+    return tempos
+
+
+def mais_lentas(tempos, base, quantidade=10):
+    """Importações de maior tempo acumulado que o `import streamlit` sozinho não faz"""
+    proprias = [
+        {'modulo': nome, 'proprio_ms': proprio, 'acumulado_ms': acumulado}
+        for nome, (proprio, acumulado) in tempos.items() if nome not in base
+    ]
+    return sorted(proprias, key=lambda item: item['acumulado_ms'], reverse=True)[:quantidade]
+
+
+def medir_renderizacao(timeout):
+    """Executa o script do app uma vez (primeira página, com a consulta inicial); retorna ms"""
+    from streamlit.testing.v1 import AppTest
+    inicio = time.perf_counter()
+    teste = AppTest.from_file(APP, default_timeout=timeout).run()
+    ms = (time.perf_counter() - inicio) * 1000
+    if teste.exception:
+        raise RuntimeError(f"erro ao renderizar o app: {teste.exception[0].message}")
+    return ms
+
+
+def gravar_relatorio(relatorio, diretorio):
+    """Grava o relatório em JSON e retorna o caminho"""
+    os.makedirs(diretorio, exist_ok=True)
+    carimbo = datetime.now().strftime('%Y%m%d_%H%M%S')
+    caminho = os.path.join(diretorio, f"inicializacao_{carimbo}.json")
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    return caminho
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização do Streamlit do LDI")
+    parser.add_argument('--execucoes', type=int, default=5, help="partidas a frio medidas")
+    parser.add_argument('--orcamento-ms', type=float, default=400,
+                        help="tempo máximo (mediana) do app além do import streamlit")
+    parser.add_argument('--renderizar', action='store_true',
+                        help="também executa a primeira página com AppTest (requer banco)")
+    parser.add_argument('--timeout', type=float, default=30, help="tempo limite da renderização (s)")
+    parser.add_argument('--saida', default='bench', help="diretório dos relatórios")
+    args = parser.parse_args()
+    
+    try:
+        print(f"⏱️  {args.execucoes} partidas a frio de streamlit e app_streamlit...")
+        base_ms, app_ms = [], []
+        carregados = set()
+        for _ in range(args.execucoes):
+            base_ms.append(medir_importacao('streamlit')[0])
+            ms, modulos, _ = medir_importacao('app_streamlit')
+            app_ms.append(ms)
+            carregados.update(modulos)
+        
+        _, modulos_base, saida_base = medir_importacao('streamlit', importtime=True)
+        _, _, saida_app = medir_importacao('app_streamlit', importtime=True)
+        lentas = mais_lentas(ler_importtime(saida_app), ler_importtime(saida_base))
+        
+        renderizacao_ms = medir_renderizacao(args.timeout) if args.renderizar else None
+    except Exception as e:
+        print(f"❌ Erro: {e}")
+        sys.exit(1)
+    
+    mediana_base = statistics.median(base_ms)
+    mediana_app = statistics.median(app_ms)
+    custo_app = mediana_app - mediana_base
+    opcionais = sorted(m for m in carregados if m in OPCIONAIS and m not in modulos_base)
+    
+    print(f"\n   import streamlit:      {mediana_base:8.1f}ms (mediana)")
+    print(f"   import app_streamlit:  {mediana_app:8.1f}ms (mediana, inclui o streamlit)")
+    print(f"   custo do app:          {custo_app:8.1f}ms (orçamento: {args.orcamento_ms:.0f}ms)")
+    if renderizacao_ms is not None:
+        print(f"   primeira página:       {renderizacao_ms:8.1f}ms (script completo, com a consulta)")
+    print(f"   já carregados na partida: {', '.join(sorted(carregados)) or 'nenhum'}")
+    print("\n   Importações mais lentas do app:")
+    for item in lentas:
+        print(f"      {item['acumulado_ms']:8.1f}ms  {item['modulo']}")
+    
+    caminho = gravar_relatorio({
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'parametros': vars(args),
+        'streamlit_ms': base_ms,
+        'app_ms': app_ms,
+        'custo_app_ms': round(custo_app, 1),
+        'renderizacao_ms': renderizacao_ms,
+        'modulos_carregados': sorted(carregados),
+        'opcionais_na_partida': opcionais,
+        'mais_lentas': lentas,
+    }, args.saida)
+    print(f"\n📄 Relatório: {caminho}")
+    
+    falhas = 0
+    if opcionais:
+        falhas += 1
+        print(f"❌ Dependências opcionais importadas na partida: {', '.join(opcionais)}")
+    if custo_app > args.orcamento_ms:
+        falhas += 1
+        print(f"❌ Inicialização acima do orçamento ({custo_app:.0f}ms > {args.orcamento_ms:.0f}ms)")
+    if falhas:
+        sys.exit(1)
+    print("✅ Inicialização dentro do orçamento")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,10 @@
 """
 Script para executar o sistema de locação com Streamlit
 Inicializa o banco de dados e executa a aplicação web
+
+    python scripts/executar_streamlit.py            # aplica só os passos de schema novos
+    python scripts/executar_streamlit.py --recriar  # apaga e recria o banco de demonstração
+    python scripts/executar_streamlit.py --adotar   # banco anterior às migrações: registra sem apagar
 """
 
 import subprocess
@@ -12,13 +16,16 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 from database import db_manager
 
-def inicializar_banco():
-    """Inicializa o banco de dados"""
-    print("🔧 Inicializando banco de dados...")
+def inicializar_banco(recriar=False, adotar=False):
+    """Aplica as migrações pendentes (ou recria o banco, se `recriar`; `adotar` mantém um banco antigo)"""
+    print("🔧 Recriando banco de dados..." if recriar else "🔧 Verificando banco de dados...")
     
     try:
-        db_manager.execute_script('SQL/v2-ldi.sql')
-        print("✅ Banco de dados inicializado com sucesso!")
+        aplicados = db_manager.migrate(reset=recriar, adopt=adotar)
+        if aplicados:
+            print(f"✅ Passos aplicados: {', '.join(aplicados)}")
+        else:
+            print("✅ Banco de dados já atualizado")
         return True
         
     except Exception as e:
@@ -62,7 +69,7 @@ def main():
     print("=" * 50)
     
     # Verificar se o banco está acessível
-    if inicializar_banco():
+    if inicializar_banco(recriar='--recriar' in sys.argv[1:], adotar='--adotar' in sys.argv[1:]):
         print("\n" + "=" * 50)
         executar_streamlit()
     else:
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Gerador de dados sintéticos para o Sistema de Locação de Imóveis
+Gera dados referencialmente consistentes para todas as tabelas em escala
+configurável (de 1k a 10M reservas), com semente fixa, e carrega via COPY
+
+Uso:
+    python scripts/gerar_dados.py --reservas 100k
+    python scripts/gerar_dados.py --reservas 10M --saida dados/ --sem-carga
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Adicionar src ao path para importar database
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# Ordem de carga respeitando as chaves estrangeiras
+TABELAS = [
+    ('politica_cancelamento', ['id_politica', 'tipo_politica', 'descricao']),
+    ('servico_extra', ['id_servico', 'nome', 'descricao', 'valor_servico']),
+    ('usuario', ['id_usuario', 'nome', 'email', 'senha']),
+    ('telefone_usuario', ['telefone', 'id_usuario']),
+    ('anfitriao', ['id_usuario']),
+    ('hospede', ['id_usuario']),
+    ('imovel', ['id_imovel', 'id_usuario', 'id_politica', 'capacidade_max', 'valor_diaria',
+                'rua', 'numero', 'bairro', 'cidade', 'estado', 'cep', 'titulo', 'descricao']),
+    ('comodidades', ['id_imovel', 'comodidade']),
+    ('oferece', ['id_servico', 'id_imovel']),
+    ('reserva', ['id_reserva', 'id_usuario', 'id_imovel', 'num_hospedes',
+                 'data_inicio', 'data_fim', 'status']),
+    ('avaliacao', ['id_avaliacao', 'nota', 'comentario', 'data_avaliacao']),
+    ('experiencia_avaliada', ['id_reserva', 'id_avaliacao']),
+    ('servicos_vinculados', ['id_servico', 'id_reserva']),
+    ('pagamento', ['id_pagamento', 'valor_total', 'forma_pagamento', 'data_pagamento']),
+    ('gera', ['id_pagamento', 'id_reserva']),
+    ('parcela', ['id_pagamento', 'num_parcelas', 'valor_parcela', 'data_vencimento']),
+    ('cancelamento', ['id_cancelamento', 'tipo_cancelamento', 'data_cancelamento']),
+    ('reserva_cancelada', ['id_cancelamento', 'id_pagamento']),
+    ('estorno', ['id_estorno', 'valor_estorno', 'data_estorno']),
+    ('gera_estorno', ['id_estorno', 'id_cancelamento']),
+    ('multa', ['id_multa', 'valor_multa']),
+    ('gera_multa', ['id_multa', 'id_cancelamento']),
+    ('gera_pag_multa', ['id_multa', 'id_pagamento']),
+]
+
+# Colunas IDENTITY cuja sequência precisa continuar após a carga
+IDENTIDADES = [
+    ('usuario', 'id_usuario'), ('politica_cancelamento', 'id_politica'),
+    ('imovel', 'id_imovel'), ('servico_extra', 'id_servico'),
+    ('reserva', 'id_reserva'), ('avaliacao', 'id_avaliacao'),
+    ('pagamento', 'id_pagamento'), ('cancelamento', 'id_cancelamento'),
+    ('estorno', 'id_estorno'), ('multa', 'id_multa'),
+]
+
+POLITICAS = [
+    (1, 'Flexível', 'Cancelamento gratuito até 7 dias antes da reserva'),
+    (2, 'Moderada', 'Cancelamento gratuito até 5 dias antes, depois multa de 50%'),
+    (3, 'Rígida', 'Sem cancelamento gratuito, multa de 100%'),
+]
+
+SERVICOS = [
+    (1, 'Café da manhã', 'Serviço diário de café da manhã', 50.00),
+    (2, 'Limpeza', 'Limpeza durante a estadia', 80.00),
+    (3, 'Transfer aeroporto', 'Transporte do aeroporto até o imóvel', 100.00),
+    (4, 'Wi-Fi premium', 'Internet de alta velocidade', 30.00),
+    (5, 'Estacionamento coberto', 'Vaga protegida para veículo', 25.00),
+]
+
+NOMES = ['Ana', 'Carlos', 'João', 'Maria', 'Pedro', 'Julia', 'Lucas', 'Beatriz',
+         'Rafael', 'Fernanda', 'Gabriel', 'Camila', 'Mateus', 'Larissa', 'Bruno', 'Patrícia']
+SOBRENOMES = ['Silva', 'Souza', 'Lima', 'Santos', 'Costa', 'Oliveira', 'Pereira',
+              'Almeida', 'Ferreira', 'Rodrigues', 'Gomes', 'Martins', 'Araújo', 'Barbosa']
+CIDADES = [('Rio de Janeiro', 'RJ'), ('São Paulo', 'SP'), ('Campos do Jordão', 'SP'),
+           ('Salvador', 'BA'), ('Florianópolis', 'SC'), ('Gramado', 'RS'),
+           ('Fortaleza', 'CE'), ('Recife', 'PE'), ('Belo Horizonte', 'MG'), ('Atibaia', 'SP')]
+TIPOS_IMOVEL = ['Casa', 'Apartamento', 'Chalé', 'Loft', 'Cabana', 'Studio', 'Sítio']
+COMODIDADES = ['Wi-Fi', 'Piscina', 'Ar-condicionado', 'Estacionamento', 'Lareira',
+               'Academia', 'Churrasqueira', 'Vista para o mar', 'Jacuzzi', 'Cozinha equipada']
+FORMAS_PAGAMENTO = ['Cartão de crédito', 'Pix', 'Boleto', 'Transferência Bancária', 'Dinheiro']
+COMENTARIOS = ['Excelente estadia!', 'Muito bom, recomendo.', 'Ok, mas poderia ser melhor.',
+               'Lugar incrível.', 'Barulhento à noite.', 'Anfitrião atencioso.', None]
+
+DATA_BASE = date(2023, 1, 1)
+# Data de referência fixa (não o relógio): mesma semente, mesmos dados em qualquer dia
+HOJE = date(2025, 1, 1)
+
+
+def interpretar_escala(texto):
+    """Converte '1k', '250K', '10M' ou '5000' em número inteiro"""
+    texto = texto.strip().lower()
+    multiplicador = {'k': 1_000, 'm': 1_000_000}.get(texto[-1:], 1)
+    if multiplicador > 1:
+        texto = texto[:-1]
+    return int(float(texto) * multiplicador)
+
+
+class Gerador:
+    """Gera os arquivos CSV de todas as tabelas numa única passada"""
+    
+    def __init__(self, reservas, semente=42, hoje=HOJE):
+        self.total_reservas = reservas
+        self.rng = random.Random(semente)
+        self.hoje = hoje
+        self.total_usuarios = max(10, reservas // 4)
+        self.total_anfitrioes = max(2, self.total_usuarios * 15 // 100)
+        self.total_imoveis = max(5, reservas // 20)
+        # Parte dos anfitriões também é hóspede (como João no seed original)
+        self.primeiro_hospede = max(1, self.total_anfitrioes * 8 // 10)
+        self.contadores = {}
+    
+    def _proximo(self, nome):
+        self.contadores[nome] = self.contadores.get(nome, 0) + 1
+        return self.contadores[nome]
+    
+    def gerar(self, diretorio):
+        """Escreve um CSV por tabela em `diretorio` e retorna {tabela: linhas}"""
+        os.makedirs(diretorio, exist_ok=True)
+        arquivos = {}
+        escritores = {}
+        self.linhas = {}
+        for tabela, _ in TABELAS:
+            arquivos[tabela] = open(os.path.join(diretorio, f"{tabela}.csv"), 'w',
+                                    encoding='utf-8', newline='')
+            escritores[tabela] = csv.writer(arquivos[tabela], lineterminator='\n')
+            self.linhas[tabela] = 0
+        
+        def escrever(tabela, *valores):
+            escritores[tabela].writerow(valores)
+            self.linhas[tabela] += 1
+        
+        try:
+            self._gerar_cadastros(escrever)
+            self._gerar_reservas(escrever)
+        finally:
+            for arquivo in arquivos.values():
+                arquivo.close()
+        return self.linhas
+    
+    def _gerar_cadastros(self, escrever):
+        rng = self.rng
+        for politica in POLITICAS:
+            escrever('politica_cancelamento', *politica)
+        for servico in SERVICOS:
+            escrever('servico_extra', *servico)
+        
+        for id_usuario in range(1, self.total_usuarios + 1):
+            nome = f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}"
+            escrever('usuario', id_usuario, nome, f"usuario{id_usuario}@exemplo.com", f"senha{id_usuario}")
+            for n in range(rng.randint(1, 2)):
+                escrever('telefone_usuario', f"({rng.randint(11, 99)})9{id_usuario:08d}-{n}", id_usuario)
+            if id_usuario <= self.total_anfitrioes:
+                escrever('anfitriao', id_usuario)
+            if id_usuario >= self.primeiro_hospede:
+                escrever('hospede', id_usuario)
+        
+        # Dados do imóvel guardados para precificar as reservas
+        self.imoveis = []
+        for id_imovel in range(1, self.total_imoveis + 1):
+            cidade, estado = rng.choice(CIDADES)
+            capacidade = rng.randint(1, 10)
+            diaria = round(rng.uniform(80, 900), 2)
+            id_politica = rng.randint(1, len(POLITICAS))
+            tipo = rng.choice(TIPOS_IMOVEL)
+            escrever('imovel', id_imovel, rng.randint(1, self.total_anfitrioes), id_politica,
+                     capacidade, f"{diaria:.2f}", f"Rua {rng.randint(1, 500)}",
+                     str(rng.randint(1, 9999)), 'Centro', cidade, estado,
+                     f"{rng.randint(10000, 99999)}-000", f"{tipo} {cidade} {id_imovel}",
+                     f"{tipo} para até {capacidade} hóspedes")
+            for comodidade in rng.sample(COMODIDADES, rng.randint(2, 6)):
+                escrever('comodidades', id_imovel, comodidade)
+            servicos = sorted(rng.sample([s[0] for s in SERVICOS], rng.randint(1, 4)))
+            for id_servico in servicos:
+                escrever('oferece', id_servico, id_imovel)
+            self.imoveis.append((capacidade, diaria, id_politica, servicos))
+    
+    def _gerar_reservas(self, escrever):
+        rng = self.rng
+        por_imovel, resto = divmod(self.total_reservas, self.total_imoveis)
+        id_reserva = 0
+        
+        for indice, (capacidade, diaria, id_politica, servicos) in enumerate(self.imoveis):
+            id_imovel = indice + 1
+            quantidade = por_imovel + (1 if indice < resto else 0)
+            # Linha do tempo do imóvel: reservas ativas não se sobrepõem,
+            # canceladas podem cair em cima de qualquer período
+            cursor = DATA_BASE + timedelta(days=rng.randint(0, 60))
+            for _ in range(quantidade):
+                id_reserva += 1
+                sorteio = rng.random()
+                status = 'cancelada' if sorteio < 0.2 else ('pendente' if sorteio < 0.3 else 'confirmada')
+                dias = rng.randint(1, 14)
+                if status == 'cancelada' and rng.random() < 0.5:
+                    inicio = cursor - timedelta(days=rng.randint(0, 10))
+                else:
+                    cursor += timedelta(days=rng.randint(0, 20))
+                    inicio = cursor
+                    cursor += timedelta(days=dias)
+                fim = inicio + timedelta(days=dias)
+                if status == 'pendente' and fim < self.hoje:
+                    status = 'confirmada'
+                
+                escrever('reserva', id_reserva, rng.randint(self.primeiro_hospede, self.total_usuarios),
+                         id_imovel, rng.randint(1, capacidade), inicio.isoformat(), fim.isoformat(), status)
+                
+                contratados = []
+                if servicos and rng.random() < 0.3:
+                    contratados = rng.sample(servicos, rng.randint(1, min(2, len(servicos))))
+                    for id_servico in contratados:
+                        escrever('servicos_vinculados', id_servico, id_reserva)
+                
+                valor = round(dias * diaria + sum(SERVICOS[s - 1][3] for s in contratados), 2)
+                self._gerar_pagamento(escrever, id_reserva, valor, inicio)
+                
+                if status == 'cancelada':
+                    self._gerar_cancelamento(escrever, id_reserva, valor, inicio, id_politica)
+                elif status == 'confirmada' and fim < self.hoje and rng.random() < 0.6:
+                    id_avaliacao = self._proximo('avaliacao')
+                    escrever('avaliacao', id_avaliacao, rng.choices([1, 2, 3, 4, 5], [1, 2, 5, 10, 12])[0],
+                             rng.choice(COMENTARIOS), (fim + timedelta(days=rng.randint(0, 10))).isoformat())
+                    escrever('experiencia_avaliada', id_reserva, id_avaliacao)
+    
+    def _gerar_pagamento(self, escrever, id_reserva, valor, inicio):
+        rng = self.rng
+        # O pagamento principal usa o mesmo id da reserva
+        forma = rng.choice(FORMAS_PAGAMENTO)
+        data_pagamento = inicio - timedelta(days=rng.randint(1, 30))
+        escrever('pagamento', id_reserva, f"{valor:.2f}", forma, data_pagamento.isoformat())
+        escrever('gera', id_reserva, id_reserva)
+        
+        parcelas = rng.randint(1, 6) if forma == 'Cartão de crédito' else 1
+        valor_parcela = round(valor / parcelas, 2)
+        for n in range(1, parcelas + 1):
+            # A última parcela absorve a diferença de arredondamento
+            atual = valor_parcela if n < parcelas else round(valor - valor_parcela * (parcelas - 1), 2)
+            vencimento = data_pagamento + timedelta(days=30 * (n - 1))
+            escrever('parcela', id_reserva, n, f"{atual:.2f}", vencimento.isoformat())
+    
+    def _gerar_cancelamento(self, escrever, id_reserva, valor, inicio, id_politica):
+        rng = self.rng
+        id_cancelamento = self._proximo('cancelamento')
+        data_cancelamento = inicio - timedelta(days=rng.randint(0, 15))
+        tipo = rng.choice(['Voluntário pelo hóspede', 'Voluntário pelo hóspede', 'Pelo anfitrião'])
+        escrever('cancelamento', id_cancelamento, tipo, data_cancelamento.isoformat())
+        escrever('reserva_cancelada', id_cancelamento, id_reserva)
+        
+        # Flexível: estorno total; Moderada: metade estorno, metade multa; Rígida: multa total
+        percentual_multa = {1: 0.0, 2: 0.5, 3: 1.0}[id_politica]
+        valor_multa = round(valor * percentual_multa, 2)
+        valor_estorno = round(valor - valor_multa, 2)
+        
+        if valor_estorno > 0:
+            id_estorno = self._proximo('estorno')
+            escrever('estorno', id_estorno, f"{valor_estorno:.2f}",
+                     (data_cancelamento + timedelta(days=2)).isoformat())
+            escrever('gera_estorno', id_estorno, id_cancelamento)
+        
+        if valor_multa > 0:
+            id_multa = self._proximo('multa')
+            escrever('multa', id_multa, f"{valor_multa:.2f}")
+            escrever('gera_multa', id_multa, id_cancelamento)
+            # Pagamentos de multa vêm depois dos ids dos pagamentos principais
+            id_pagamento = self.total_reservas + self._proximo('pagamento_multa')
+            escrever('pagamento', id_pagamento, f"{valor_multa:.2f}", rng.choice(FORMAS_PAGAMENTO),
+                     (data_cancelamento + timedelta(days=1)).isoformat())
+            escrever('gera_pag_multa', id_multa, id_pagamento)
+
+
+def carregar(diretorio):
+    """Substitui o conteúdo das tabelas pelos CSVs de `diretorio` usando COPY"""
+    from database import db_manager
+    
+    # Gatilhos da camada analítica ficam desligados durante a carga e os
+    # índices/FKs são recriados no final; os resumos são reconstruídos de uma vez
+    estatisticas = db_manager.bulk_load_many(
+        [(tabela, os.path.join(diretorio, f"{tabela}.csv"), colunas) for tabela, colunas in TABELAS],
+        truncate=True,
+        disable_triggers=True
+    )
+    for item in estatisticas:
+        print(f"   {item['tabela']:<24} {item['linhas']:>12,} linhas  {item['segundos']:7.2f}s"
+              f"  {item['linhas_por_segundo']:>12,.0f} linhas/s")
+    
+    with db_manager.connection() as conn:
+        with conn.cursor() as cursor:
+            for tabela, coluna in IDENTIDADES:
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, %s), COALESCE(MAX({coluna}), 0) + 1, false) FROM {tabela}",
+                    (tabela, coluna)
+                )
+            cursor.execute("SELECT to_regproc('reconstruir_resumos') IS NOT NULL")
+            if cursor.fetchone()[0]:
+                cursor.execute("SELECT reconstruir_resumos()")
+    
+    # ANALYZE fora da transação da carga, já com os dados visíveis
+    with db_manager.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("ANALYZE")
+    db_manager.notify_data_change()
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Gera e carrega dados sintéticos do LDI")
+    parser.add_argument('--reservas', default='10k',
+                        help="quantidade de reservas (ex.: 1k, 250k, 10M); padrão 10k")
+    parser.add_argument('--semente', type=int, default=42, help="semente do gerador aleatório")
+    parser.add_argument('--hoje', type=date.fromisoformat, default=HOJE,
+                        help=f"data de referência AAAA-MM-DD, no lugar do relógio: reservas pendentes "
+                             f"já encerradas viram confirmadas (padrão {HOJE.isoformat()})")
+    parser.add_argument('--saida', help="diretório dos CSVs (padrão: temporário, apagado ao final)")
+    parser.add_argument('--sem-carga', action='store_true', help="apenas gera os CSVs, sem carregar no banco")
+    args = parser.parse_args()
+    
+    reservas = interpretar_escala(args.reservas)
+    if args.sem_carga and not args.saida:
+        parser.error("--sem-carga exige --saida")
+    
+    temporario = None
+    diretorio = args.saida
+    if not diretorio:
+        temporario = tempfile.TemporaryDirectory(prefix='ldi_dados_')
+        diretorio = temporario.name
+    
+    try:
+        print(f"🏭 Gerando {reservas:,} reservas (semente {args.semente}) em {diretorio}...")
+        inicio = time.perf_counter()
+        linhas = Gerador(reservas, args.semente, args.hoje).gerar(diretorio)
+        print(f"✅ {sum(linhas.values()):,} linhas geradas em {time.perf_counter() - inicio:.1f}s")
+        
+        if not args.sem_carga:
+            print("📥 Carregando no banco via COPY...")
+            inicio = time.perf_counter()
+            carregar(diretorio)
+            print(f"✅ Carga concluída em {time.perf_counter() - inicio:.1f}s")
+    except Exception as e:
+        print(f"❌ Erro: {e}")
+        sys.exit(1)
+    finally:
+        if temporario:
+            temporario.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,20 @@
 import streamlit as st
-import psycopg2
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
-from database import db_manager
+import concurrent.futures
+from datetime import date, datetime, timedelta
+import os
+import time
+import uuid
+from database import db_manager, ConsultaCancelada, TempoLimiteExcedido
+from cache import result_cache
+from aquecimento import cache_warmer, PERFIL_AQUECIMENTO
+from instrumentacao import query_log
+from consultas import argumentos, consultas_por_categoria, versao_registro
+from disponibilidade import LIMITE_BUSCA, imoveis_disponiveis
+from exportacao import DIRETORIO_DOWNLOADS, TAMANHO_MAXIMO_DOWNLOAD, exportar_arquivo, formatos_disponiveis, limpar_downloads, nome_arquivo
+import graficos
+
+# pandas e plotly são importados dentro das funções que os usam: o cabeçalho e a
+# barra lateral aparecem antes, e plotly só é carregado quando um gráfico é aberto
 
 # Configuração da página
 st.set_page_config(
@@ -129,52 +139,194 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def executar_consulta(sql):
-    """Executa consulta e retorna DataFrame"""
+def _chave_params(params):
+    """Parâmetros em forma estável para compor a chave do cache"""
+    return tuple(sorted(params.items())) if params else None
+
+def _ler_dataframe(sql, params=None, perfil=None):
+    """Executa a consulta no banco e monta o DataFrame (mesmos dtypes nos dois caminhos)"""
+    # Sem parâmetros: via COPY, lido por colunas; com parâmetros: comando preparado da conexão
+    return db_manager.fetch_dataframe(sql, params, profile=perfil, prepared=params is not None)
+
+# Intervalo (s) entre as atualizações da tela enquanto a consulta roda
+INTERVALO_ESPERA = 0.25
+
+@st.cache_resource
+def _executor():
+    """Threads das consultas em andamento, compartilhadas entre as sessões"""
+    return concurrent.futures.ThreadPoolExecutor(max_workers=int(db_manager.config['POOL_MAX']),
+                                                 thread_name_prefix='consulta')
+
+def _cancelar(rotulo):
+    st.session_state[f"cancelada::{rotulo}"] = True
+
+def _retomar(rotulo):
+    st.session_state.pop(f"cancelada::{rotulo}", None)
+
+def executar_interrompivel(rotulo, ler, vazio):
+    """Executa `ler` numa thread, com botão para cancelar; retorna o resultado ou `vazio`
+    
+    Enquanto espera, o tempo decorrido é atualizado na tela. Cada atualização
+    dá ao Streamlit a chance de interromper o script (clique em Cancelar ou em
+    outro widget), e então a consulta também é cancelada no servidor. Consulta
+    cancelada fica parada até "Executar novamente"; tempo limite e erros
+    aparecem como aviso.
+    """
+    if st.session_state.get(f"cancelada::{rotulo}"):
+        st.info("⏹️ Consulta cancelada.")
+        st.button("▶️ Executar novamente", key=f"retomar::{rotulo}", on_click=_retomar, args=(rotulo,))
+        return vazio
+    
+    token = uuid.uuid4().hex
+    def executar():
+        with db_manager.cancellable(token):
+            return ler()
+    
+    futuro = _executor().submit(executar)
+    progresso = st.empty()
+    botao = st.empty()
+    inicio = time.monotonic()
+    com_botao = False
     try:
-        conn = db_manager.get_connection()
-        df = pd.read_sql_query(sql, conn) # type: ignore
-        conn.close()
-        return df
+        while True:
+            try:
+                return futuro.result(timeout=INTERVALO_ESPERA)
+            except concurrent.futures.TimeoutError:
+                # O botão só aparece se a consulta não voltar no primeiro intervalo (cache, consultas rápidas)
+                if not com_botao:
+                    botao.button("⏹️ Cancelar", key=f"cancelar::{rotulo}", on_click=_cancelar, args=(rotulo,))
+                    com_botao = True
+                progresso.caption(f"⏳ Executando consulta... {time.monotonic() - inicio:.1f}s")
+    except TempoLimiteExcedido as e:
+        st.warning(f"⏱️ Tempo limite excedido: {e}. Refine os filtros ou tente mais tarde.")
+    except ConsultaCancelada:
+        st.info("⏹️ Consulta cancelada.")
     except Exception as e:
         st.error(f"Erro na consulta: {e}")
-        return pd.DataFrame()
+    finally:
+        if not futuro.done():
+            # Script interrompido antes do fim: a consulta não continua no servidor
+            db_manager.cancel(token)
+        progresso.empty()
+        botao.empty()
+    return vazio
+
+def leitura_consulta(sql, ttl=None, rotulo=None, params=None, perfil=None):
+    """Leitura da consulta inteira: chave no cache (sql, params, ttl) e função que lê do banco
+    
+    A tela e o aquecimento do cache usam a mesma descrição, e portanto a mesma chave.
+    """
+    def ler():
+        with db_manager.instrument(sql, label=rotulo):
+            return _ler_dataframe(sql, params, perfil)
+    return {'nome': rotulo, 'sql': sql, 'params': _chave_params(params), 'ttl': ttl, 'ler': ler}
+
+def leitura_pagina(sql, chaves, apos=None, limite=50, ttl=None, rotulo=None, params=None, perfil=None):
+    """Leitura de uma página (keyset), no mesmo formato de leitura_consulta"""
+    def ler():
+        with db_manager.instrument(sql, label=rotulo):
+            return db_manager.fetch_page(sql, chaves, after=apos, limit=limite, params=params,
+                                         prepared=params is not None, profile=perfil, dataframe=True)
+    return {'nome': rotulo, 'sql': sql, 'params': ('pagina', tuple(chaves), apos, limite, _chave_params(params)),
+            'ttl': ttl, 'ler': ler}
+
+def _do_cache(leitura):
+    return result_cache.get_or_execute(leitura['sql'], leitura['ler'], params=leitura['params'], ttl=leitura['ttl'])
+
+def executar_consulta(sql, ttl=None, rotulo=None, params=None, perfil=None):
+    """Executa consulta (ou busca no cache) e retorna DataFrame"""
+    import pandas as pd
+    leitura = leitura_consulta(sql, ttl, rotulo, params, perfil)
+    return executar_interrompivel(rotulo, lambda: _do_cache(leitura), pd.DataFrame())
+
+def executar_pagina(sql, chaves, apos=None, limite=50, ttl=None, rotulo=None, params=None, perfil=None):
+    """Busca uma página da consulta (keyset) e retorna (DataFrame, chave da próxima página)"""
+    import pandas as pd
+    leitura = leitura_pagina(sql, chaves, apos, limite, ttl, rotulo, params, perfil)
+    resultado = executar_interrompivel(rotulo, lambda: _do_cache(leitura), None)
+    if resultado is None:
+        return pd.DataFrame(), None
+    df, _, proxima = resultado
+    return df, proxima
+
+def estimar_total(sql, ttl=None, params=None):
+    """Total aproximado de linhas, estimado pelo planejador do PostgreSQL"""
+    try:
+        return result_cache.get_or_execute(
+            sql, lambda: db_manager.estimate_count(sql, params),
+            params=('estimativa', _chave_params(params)), ttl=ttl
+        )
+    except Exception:
+        return None
+
+def formato_colunas(consulta, df):
+    """Colunas em reais (@moeda) e datas formatadas só na exibição; o DataFrame segue tipado"""
+    formatos = {
+        coluna: st.column_config.DateColumn(format="DD/MM/YYYY")
+        for coluna in df.attrs.get('datas', ()) if coluna in df.columns
+    }
+    formatos.update({
+        coluna: st.column_config.NumberColumn(format="R$ %.2f")
+        for coluna in consulta['moeda'] if coluna in df.columns
+    })
+    return formatos
+
+def formatar_kpi(valor, formato):
+    """Valor numérico da consulta de KPIs -> texto do cartão (padrão brasileiro)"""
+    import pandas as pd
+    if valor is None or pd.isna(valor):
+        return "-"
+    if formato == 'moeda':
+        texto = f"{float(valor):,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+        return f"R$ {texto}"
+    if formato == 'nota':
+        return f"{float(valor):.1f}".replace('.', ',') + "/5"
+    return f"{int(valor):,}".replace(',', '.')
+
+def dados_grafico(sql, ler, ttl=None):
+    """Resultado agregado de um gráfico (módulo graficos), com cache como as consultas"""
+    try:
+        return result_cache.get_or_execute(
+            sql, ler, params=('grafico', graficos.BARRAS_MAXIMAS, graficos.PONTOS_MAXIMOS), ttl=ttl
+        )
+    except Exception as e:
+        st.error(f"Erro no gráfico: {e}")
+        return None
 
 def criar_grafico_receita_imoveis(df):
-    """Cria gráfico de receita por imóvel"""
+    """Cria gráfico de receita por imóvel (maiores receitas + "Outros")"""
+    if df is None:
+        return None
     if not df.empty and 'receita_total' in df.columns:
-        # Limpar formato R$ e converter para número
-        df_clean = df.copy()
-        # Remove 'R$ ' e pontos de milhar / vírgula decimal (ajuste conforme seu formato)
-        df_clean['receita_num'] = df_clean['receita_total'].astype(str).str.replace('R$ ', '').str.replace('.', '').str.replace(',', '.')
-        try:
-            df_clean['receita_num'] = df_clean['receita_num'].astype(float)
-        except:
-            # se já estiver numérico, ignore
-            df_clean['receita_num'] = pd.to_numeric(df_clean['receita_num'], errors='coerce').fillna(0.0)
-        
+        import plotly.express as px
+        x = 'titulo' if 'titulo' in df.columns else df.columns[0]
         fig = px.bar(
-            df_clean, 
-            x=df_clean.columns[0] if 'titulo' not in df_clean.columns else 'titulo', 
-            y='receita_num',
+            df, 
+            x=x, 
+            y='receita_total',
             title="💰 Receita Total por Imóvel",
-            labels={'receita_num': 'Receita (R$)', df_clean.columns[0]: 'Imóvel'},
-            color='receita_num',
+            labels={'receita_total': 'Receita (R$)', x: 'Imóvel'},
+            color='receita_total',
             color_continuous_scale='viridis'
         )
         fig.update_layout(showlegend=False, height=400)
         return fig
     return None
 
-def criar_grafico_ocupacao(df):
+AGRUPAMENTOS = {'week': "Semana", 'month': "Mês", 'quarter': "Trimestre", 'year': "Ano"}
+
+def criar_grafico_ocupacao(df, agrupamento='month'):
     """Cria gráfico de ocupação temporal"""
-    # aceita tanto 'mes_ano' quanto 'mes' dependendo da query
+    if df is None:
+        return None
+    # aceita 'periodo' (consulta do gráfico), 'mes_ano' ou 'mes'
     mes_col = None
-    for c in ['mes_ano', 'mes']:
+    for c in ['periodo', 'mes_ano', 'mes']:
         if c in df.columns:
             mes_col = c
             break
     if not df.empty and mes_col is not None and 'confirmadas' in df.columns and 'canceladas' in df.columns:
+        import plotly.graph_objects as go
         fig = go.Figure()
         
         fig.add_trace(go.Scatter(
@@ -197,7 +349,7 @@ def criar_grafico_ocupacao(df):
         
         fig.update_layout(
             title="📊 Evolução das Reservas por Período",
-            xaxis_title="Período",
+            xaxis_title=AGRUPAMENTOS.get(agrupamento, "Período"),
             yaxis_title="Quantidade de Reservas",
             height=400,
             hovermode='x unified'
@@ -205,427 +357,188 @@ def criar_grafico_ocupacao(df):
         return fig
     return None
 
-# Definição das consultas organizadas (todas as 21 que você enviou)
+# Consultas do registro único (SQL/v2-ldi.sql + versões sobre os resumos).
+# O registro fica em memória entre as reexecuções do script; o Streamlit só
+# confere se os arquivos SQL mudaram.
+REGISTRO = consultas_por_categoria()
+
 CONSULTAS = {
-    "🏢 CONSULTAS OPERACIONAIS": {
-        "1. Usuários e Perfis": """
-SELECT 
-    u.nome,
-    u.email,
-    CASE 
-        WHEN a.id_usuario IS NOT NULL THEN 'Anfitrião'
-        WHEN h.id_usuario IS NOT NULL THEN 'Hóspede'
-        ELSE 'Sem perfil'
-    END as perfil,
-    COUNT(DISTINCT tu.telefone) as total_telefones
-FROM usuario u
-LEFT JOIN anfitriao a ON u.id_usuario = a.id_usuario
-LEFT JOIN hospede h ON u.id_usuario = h.id_usuario
-LEFT JOIN telefone_usuario tu ON u.id_usuario = tu.id_usuario
-GROUP BY u.id_usuario, u.nome, u.email, a.id_usuario, h.id_usuario
-ORDER BY u.nome;
-        """,
-        "2. Imóveis Disponíveis e suas Características": """
-SELECT 
-    i.titulo,
-    CONCAT(i.cidade, ', ', i.estado) as localizacao,
-    i.capacidade_max as capacidade,
-    CONCAT('R$ ', i.valor_diaria) as diaria,
-    pc.tipo_politica as politica,
-    COUNT(DISTINCT c.comodidade) as total_comodidades
-FROM imovel i
-JOIN politica_cancelamento pc ON i.id_politica = pc.id_politica
-LEFT JOIN comodidades c ON i.id_imovel = c.id_imovel
-GROUP BY i.id_imovel, i.titulo, i.cidade, i.estado, i.capacidade_max, i.valor_diaria, pc.tipo_politica
-ORDER BY i.valor_diaria DESC;
-        """,
-        "3. Reservas e Status Atual": """
-SELECT 
-    u.nome as hospede,
-    i.titulo as imovel,
-    r.num_hospedes as hospedes,
-    TO_CHAR(r.data_inicio, 'DD/MM/YYYY') as check_in,
-    TO_CHAR(r.data_fim, 'DD/MM/YYYY') as check_out,
-    r.status,
-    CASE 
-        WHEN r.data_inicio > CURRENT_DATE THEN 'Futura'
-        WHEN r.data_fim < CURRENT_DATE THEN 'Finalizada'
-        ELSE 'Em andamento'
-    END as situacao
-FROM reserva r
-JOIN usuario u ON r.id_usuario = u.id_usuario
-JOIN imovel i ON r.id_imovel = i.id_imovel
-ORDER BY r.data_inicio DESC;
-        """,
-        "4. Disponibilidade de Imóveis - Consulta Prática": """
-SELECT 
-    i.titulo,
-    CONCAT(i.cidade, ', ', i.estado) as localizacao,
-    i.capacidade_max as capacidade,
-    CONCAT('R$ ', i.valor_diaria) as diaria_base,
-    pc.tipo_politica as politica,
-    CASE 
-        WHEN EXISTS (
-            SELECT 1 FROM reserva r 
-            WHERE r.id_imovel = i.id_imovel 
-            AND r.status IN ('confirmada', 'pendente')
-            AND r.data_inicio <= CURRENT_DATE + INTERVAL '90 days'
-            AND r.data_fim >= CURRENT_DATE
-        ) THEN 'Reservado próximos 90 dias'
-        WHEN EXISTS (
-            SELECT 1 FROM reserva r 
-            WHERE r.id_imovel = i.id_imovel 
-            AND r.status = 'confirmada'
-            AND r.data_inicio > CURRENT_DATE
-        ) THEN 'Reservas futuras confirmadas'
-        ELSE 'Disponível para reserva'
-    END as disponibilidade_30d,
-    COALESCE(ROUND(AVG(av.nota), 1), 0) as avaliacao_media,
-    COUNT(DISTINCT cm.comodidade) as total_comodidades
-FROM imovel i
-JOIN politica_cancelamento pc ON i.id_politica = pc.id_politica
-LEFT JOIN reserva r_av ON i.id_imovel = r_av.id_imovel AND r_av.status = 'confirmada'
-LEFT JOIN experiencia_avaliada ea ON r_av.id_reserva = ea.id_reserva
-LEFT JOIN avaliacao av ON ea.id_avaliacao = av.id_avaliacao
-LEFT JOIN comodidades cm ON i.id_imovel = cm.id_imovel
-GROUP BY i.id_imovel, i.titulo, i.cidade, i.estado, i.capacidade_max, 
-         i.valor_diaria, pc.tipo_politica
-ORDER BY avaliacao_media DESC, i.valor_diaria ASC;
-        """
-    },
-    "💰 ANÁLISES FINANCEIRAS": {
-        "5. Análise de Pagamentos": """
-SELECT 
-    p.id_pagamento as pagamento_id,
-    CONCAT('R$ ', p.valor_total) as valor,
-    p.forma_pagamento,
-    TO_CHAR(p.data_pagamento, 'DD/MM/YYYY') as data_pag,
-    COALESCE(COUNT(pa.num_parcelas), 0) as total_parcelas,
-    CASE 
-        WHEN COUNT(pa.num_parcelas) = 0 THEN 'À vista'
-        WHEN COUNT(pa.num_parcelas) = 1 THEN 'À vista' 
-        ELSE 'Parcelado'
-    END as tipo_pagamento
-FROM pagamento p
-LEFT JOIN parcela pa ON p.id_pagamento = pa.id_pagamento
-GROUP BY p.id_pagamento, p.valor_total, p.forma_pagamento, p.data_pagamento
-ORDER BY p.data_pagamento DESC;
-        """,
-        "6. Receita por Imóvel": """
-SELECT 
-    i.titulo, 
-    COUNT(r.id_reserva) as total_reservas,
-    CONCAT('R$ ', COALESCE(SUM(p.valor_total), 0)) AS receita_total
-FROM imovel i
-LEFT JOIN reserva r ON i.id_imovel = r.id_imovel AND r.status = 'confirmada'
-LEFT JOIN gera g ON r.id_reserva = g.id_reserva
-LEFT JOIN pagamento p ON g.id_pagamento = p.id_pagamento
-GROUP BY i.titulo, i.id_imovel
-ORDER BY COALESCE(SUM(p.valor_total), 0) DESC;
-        """,
-        "7. Parcelas em Aberto - Gestão Financeira": """
-SELECT 
-    u.nome as hospede,
-    i.titulo as imovel,
-    CONCAT('R$ ', pg.valor_total) as valor_total,
-    pg.forma_pagamento,
-    CONCAT('Parcela ', p.num_parcelas) as parcela,
-    CONCAT('R$ ', p.valor_parcela) as valor_parcela,
-    TO_CHAR(p.data_vencimento, 'DD/MM/YYYY') as vencimento,
-    CASE 
-        WHEN p.data_vencimento < CURRENT_DATE THEN 'EM ATRASO'
-        WHEN p.data_vencimento = CURRENT_DATE THEN 'VENCE HOJE'
-        WHEN p.data_vencimento <= CURRENT_DATE + INTERVAL '7 days' THEN 'PRÓXIMO VENCIMENTO'
-        ELSE 'EM DIA'
-    END as status,
-    (p.data_vencimento - CURRENT_DATE) as dias_para_vencimento
-FROM parcela p
-JOIN pagamento pg ON p.id_pagamento = pg.id_pagamento
-JOIN gera g ON pg.id_pagamento = g.id_pagamento
-JOIN reserva r ON g.id_reserva = r.id_reserva
-JOIN usuario u ON r.id_usuario = u.id_usuario
-JOIN imovel i ON r.id_imovel = i.id_imovel
-WHERE p.data_vencimento >= CURRENT_DATE
-ORDER BY p.data_vencimento, u.nome;
-        """,
-        "8. Receita Mensal por Anfitrião": """
-SELECT 
-    u.nome as anfitriao,
-    TO_CHAR(p.data_pagamento, 'YYYY-MM') as mes_ano,
-    COUNT(r.id_reserva) as reservas,
-    CONCAT('R$ ', SUM(p.valor_total)) as receita_mensal
-FROM usuario u
-JOIN anfitriao a ON u.id_usuario = a.id_usuario
-JOIN imovel i ON a.id_usuario = i.id_usuario
-JOIN reserva r ON i.id_imovel = r.id_imovel
-JOIN gera g ON r.id_reserva = g.id_reserva
-JOIN pagamento p ON g.id_pagamento = p.id_pagamento
-WHERE r.status = 'confirmada'
-GROUP BY u.nome, u.id_usuario, TO_CHAR(p.data_pagamento, 'YYYY-MM')
-ORDER BY mes_ano DESC, SUM(p.valor_total) DESC;
-        """,
-        "9. Fluxo Financeiro Completo": """
-SELECT r.id_reserva, 'Principal' as tipo, p.valor_total, p.forma_pagamento, p.data_pagamento
-FROM reserva r
-JOIN gera g ON r.id_reserva = g.id_reserva
-JOIN pagamento p ON g.id_pagamento = p.id_pagamento
-UNION ALL
-SELECT r.id_reserva, 'Multa' as tipo, p.valor_total, p.forma_pagamento, p.data_pagamento
-FROM reserva r
-JOIN reserva_cancelada rc ON EXISTS (
-    SELECT 1 FROM gera g2 WHERE g2.id_reserva = r.id_reserva AND g2.id_pagamento = rc.id_pagamento
-)
-JOIN gera_multa gm ON rc.id_cancelamento = gm.id_cancelamento
-JOIN gera_pag_multa gpm ON gm.id_multa = gpm.id_multa
-JOIN pagamento p ON gpm.id_pagamento = p.id_pagamento
-ORDER BY id_reserva, tipo;
-        """
-    },
-    "📊 BUSINESS INTELLIGENCE": {
-        "10. Ranking de Anfitriões": """
-SELECT 
-    u.nome as anfitriao,
-    COUNT(DISTINCT i.id_imovel) as total_imoveis,
-    COUNT(r.id_reserva) as total_reservas,
-    COUNT(CASE WHEN r.status = 'confirmada' THEN 1 END) as confirmadas,
-    COUNT(CASE WHEN r.status = 'cancelada' THEN 1 END) as canceladas,
-    CAST(
-        (COUNT(CASE WHEN r.status = 'confirmada' THEN 1 END)::float / 
-         NULLIF(COUNT(r.id_reserva), 0) * 100) AS DECIMAL(5,1)
-    ) as taxa_sucesso_percent,
-    CONCAT('R$ ', COALESCE(SUM(p.valor_total), 0)) as receita_total,
-    CONCAT('R$ ', CAST(COALESCE(AVG(p.valor_total), 0) AS DECIMAL(10,2))) as ticket_medio,
-    CAST(COALESCE(AVG(a.nota), 0) AS DECIMAL(3,1)) as nota_media,
-    COUNT(DISTINCT ea.id_avaliacao) as total_avaliacoes,
-    CASE 
-        WHEN AVG(a.nota) >= 4.5 THEN 'Excelente'
-        WHEN AVG(a.nota) >= 4.0 THEN 'Muito Bom'
-        WHEN AVG(a.nota) >= 3.0 THEN 'Bom'
-        WHEN AVG(a.nota) >= 2.0 THEN 'Regular'
-        ELSE 'Precisa Melhorar'
-    END as classificacao
-FROM usuario u
-JOIN anfitriao af ON u.id_usuario = af.id_usuario
-JOIN imovel i ON u.id_usuario = i.id_usuario
-LEFT JOIN reserva r ON i.id_imovel = r.id_imovel
-LEFT JOIN gera g ON r.id_reserva = g.id_reserva
-LEFT JOIN pagamento p ON g.id_pagamento = p.id_pagamento
-LEFT JOIN experiencia_avaliada ea ON r.id_reserva = ea.id_reserva
-LEFT JOIN avaliacao a ON ea.id_avaliacao = a.id_avaliacao
-GROUP BY u.id_usuario, u.nome
-ORDER BY receita_total DESC, nota_media DESC;
-        """,
-        "11. Hóspedes Mais Ativos": """
-SELECT 
-    u.nome, 
-    COUNT(*) AS total_reservas,
-    COUNT(CASE WHEN r.status = 'confirmada' THEN 1 END) as confirmadas,
-    COUNT(CASE WHEN r.status = 'cancelada' THEN 1 END) as canceladas
-FROM usuario u
-JOIN reserva r ON u.id_usuario = r.id_usuario
-GROUP BY u.nome, u.id_usuario
-ORDER BY total_reservas DESC;
-        """,
-        "12. Ocupação por Período": """
-SELECT 
-    TO_CHAR(r.data_inicio, 'YYYY-MM') as mes_ano,
-    COUNT(r.id_reserva) as total_reservas,
-    COUNT(CASE WHEN r.status = 'confirmada' THEN 1 END) as confirmadas,
-    COUNT(CASE WHEN r.status = 'cancelada' THEN 1 END) as canceladas,
-    COUNT(CASE WHEN r.status = 'pendente' THEN 1 END) as pendentes,
-    ROUND(COUNT(CASE WHEN r.status = 'confirmada' THEN 1 END)::numeric / 
-          NULLIF(COUNT(r.id_reserva), 0) * 100, 1) as taxa_sucesso
-FROM reserva r
-GROUP BY TO_CHAR(r.data_inicio, 'YYYY-MM')
-ORDER BY mes_ano DESC;
-        """,
-        "13. Relatório de Ocupação Completo": """
-SELECT 
-    i.titulo,
-    i.capacidade_max as capacidade,
-    COUNT(CASE WHEN r.status = 'confirmada' THEN 1 END) as confirmadas,
-    COUNT(CASE WHEN r.status = 'cancelada' THEN 1 END) as canceladas,
-    COUNT(CASE WHEN r.status = 'pendente' THEN 1 END) as pendentes,
-    ROUND(AVG(r.num_hospedes), 1) as media_hospedes,
-    COALESCE(SUM(CASE WHEN r.status = 'confirmada' THEN (r.data_fim - r.data_inicio) ELSE 0 END), 0) as dias_ocupados
-FROM imovel i
-LEFT JOIN reserva r ON i.id_imovel = r.id_imovel
-GROUP BY i.titulo, i.id_imovel, i.capacidade_max
-ORDER BY confirmadas DESC, dias_ocupados DESC;
-        """
-    },
-    "⭐ SERVIÇOS E AVALIAÇÕES": {
-        "14. Serviços Extras Mais Contratados": """
-SELECT 
-    se.nome as servico,
-    CONCAT('R$ ', se.valor_servico) as valor,
-    COUNT(sv.id_reserva) as vezes_contratado,
-    CONCAT('R$ ', (se.valor_servico * COUNT(sv.id_reserva))) as receita_total
-FROM servico_extra se
-LEFT JOIN servicos_vinculados sv ON se.id_servico = sv.id_servico
-GROUP BY se.id_servico, se.nome, se.valor_servico
-ORDER BY COUNT(sv.id_reserva) DESC;
-        """,
-        "15. Serviços Extras - Contratações por Hóspede": """
-SELECT 
-    u.nome AS hospede, 
-    se.nome AS servico,
-    CONCAT('R$ ', se.valor_servico) as valor,
-    COUNT(*) as vezes_contratado
-FROM reserva r
-JOIN servicos_vinculados sv ON r.id_reserva = sv.id_reserva
-JOIN servico_extra se ON sv.id_servico = se.id_servico
-JOIN usuario u ON r.id_usuario = u.id_usuario
-GROUP BY u.nome, se.nome, se.valor_servico
-ORDER BY u.nome, vezes_contratado DESC;
-        """,
-        "16. Avaliações e Qualidade dos Imóveis": """
-SELECT 
-    i.titulo as imovel,
-    ROUND(AVG(a.nota), 1) as nota_media,
-    COUNT(a.nota) as total_avaliacoes,
-    CASE 
-        WHEN AVG(a.nota) >= 4.5 THEN 'Excelente'
-        WHEN AVG(a.nota) >= 4.0 THEN 'Muito Bom'
-        WHEN AVG(a.nota) >= 3.5 THEN 'Bom'
-        WHEN AVG(a.nota) >= 3.0 THEN 'Regular'
-        ELSE 'Ruim'
-    END as classificacao
-FROM imovel i
-LEFT JOIN reserva r ON i.id_imovel = r.id_imovel
-LEFT JOIN experiencia_avaliada ea ON r.id_reserva = ea.id_reserva
-LEFT JOIN avaliacao a ON ea.id_avaliacao = a.id_avaliacao
-WHERE r.status = 'confirmada'
-GROUP BY i.id_imovel, i.titulo
-HAVING COUNT(a.nota) > 0
-ORDER BY AVG(a.nota) DESC NULLS LAST;
-        """,
-        "17. Efetividade das Políticas de Cancelamento": """
-SELECT 
-    pc.tipo_politica,
-    COUNT(DISTINCT i.id_imovel) as imoveis_com_politica,
-    COUNT(r.id_reserva) as total_reservas,
-    COUNT(CASE WHEN r.status = 'cancelada' THEN 1 END) as cancelamentos,
-    ROUND(COUNT(CASE WHEN r.status = 'cancelada' THEN 1 END)::numeric / 
-          NULLIF(COUNT(r.id_reserva), 0) * 100, 1) as taxa_cancelamento,
-    COALESCE(SUM(e.valor_estorno), 0) as total_estornos
-FROM politica_cancelamento pc
-JOIN imovel i ON pc.id_politica = i.id_politica
-LEFT JOIN reserva r ON i.id_imovel = r.id_imovel
-LEFT JOIN reserva_cancelada rc ON r.id_reserva = (
-    SELECT g.id_reserva FROM gera g 
-    JOIN reserva_cancelada rc2 ON g.id_pagamento = rc2.id_pagamento 
-    WHERE rc2.id_cancelamento = rc.id_cancelamento
-)
-LEFT JOIN gera_estorno ge ON rc.id_cancelamento = ge.id_cancelamento
-LEFT JOIN estorno e ON ge.id_estorno = e.id_estorno
-GROUP BY pc.id_politica, pc.tipo_politica
-ORDER BY taxa_cancelamento ASC;
-        """
-    },
-    "🚫 CANCELAMENTOS E POLÍTICAS": {
-        "18. Cancelamentos e Impacto Financeiro": """
-SELECT 
-    c.data_cancelamento as data_cancel,
-    c.tipo_cancelamento,
-    CONCAT('R$ ', p.valor_total) as valor_reserva,
-    COALESCE(CONCAT('R$ ', e.valor_estorno), 'Sem estorno') as valor_estorno,
-    CASE 
-        WHEN e.valor_estorno IS NULL THEN CONCAT('R$ ', p.valor_total)
-        ELSE CONCAT('R$ ', (p.valor_total - e.valor_estorno))
-    END as receita_liquida
-FROM cancelamento c
-JOIN reserva_cancelada rc ON c.id_cancelamento = rc.id_cancelamento
-JOIN pagamento p ON rc.id_pagamento = p.id_pagamento
-LEFT JOIN gera_estorno ge ON c.id_cancelamento = ge.id_cancelamento
-LEFT JOIN estorno e ON ge.id_estorno = e.id_estorno
-ORDER BY c.data_cancelamento DESC;
-        """,
-        "19. Análise de Estornos por Política": """
-SELECT 
-    pc.tipo_politica,
-    COUNT(*) as total_estornos,
-    CONCAT('R$ ', ROUND(AVG(e.valor_estorno), 2)) as valor_medio_estorno,
-    CONCAT('R$ ', SUM(e.valor_estorno)) as valor_total_estornos
-FROM politica_cancelamento pc
-JOIN imovel i ON pc.id_politica = i.id_politica
-JOIN reserva r ON i.id_imovel = r.id_imovel
-JOIN gera g ON r.id_reserva = g.id_reserva
-JOIN reserva_cancelada rc ON g.id_pagamento = rc.id_pagamento
-JOIN gera_estorno ge ON rc.id_cancelamento = ge.id_cancelamento
-JOIN estorno e ON ge.id_estorno = e.id_estorno
-GROUP BY pc.tipo_politica;
-        """
-    },
-    "📋 RELATÓRIOS ESPECIAIS": {
-        "20. Histórico Completo - Casa da Praia": """
-SELECT 
-    u.nome as hospede,
-    TO_CHAR(r.data_inicio, 'DD/MM/YYYY') as check_in,
-    TO_CHAR(r.data_fim, 'DD/MM/YYYY') as check_out,
-    r.status,
-    COALESCE(a.nota::text, 'Sem avaliação') as nota,
-    CASE 
-        WHEN r.status = 'cancelada' THEN TO_CHAR(c.data_cancelamento, 'DD/MM/YYYY')
-        ELSE NULL 
-    END as data_cancelamento
-FROM imovel i
-LEFT JOIN reserva r ON i.id_imovel = r.id_imovel
-LEFT JOIN usuario u ON r.id_usuario = u.id_usuario
-LEFT JOIN experiencia_avaliada ea ON r.id_reserva = ea.id_reserva
-LEFT JOIN avaliacao a ON ea.id_avaliacao = a.id_avaliacao
-LEFT JOIN gera g ON r.id_reserva = g.id_reserva
-LEFT JOIN reserva_cancelada rc ON g.id_pagamento = rc.id_pagamento
-LEFT JOIN cancelamento c ON rc.id_cancelamento = c.id_cancelamento
-WHERE i.titulo = 'Casa da Praia'
-ORDER BY r.data_inicio DESC;
-        """,
-        "21. KPIs do Negócio": """
-SELECT 
-    'Total de Usuários' as metrica,
-    (SELECT COUNT(*) FROM usuario)::text as valor
-UNION ALL
-SELECT 
-    'Anfitriões Ativos',
-    (SELECT COUNT(*) FROM anfitriao)::text
-UNION ALL
-SELECT 
-    'Hóspedes Ativos', 
-    (SELECT COUNT(*) FROM hospede)::text
-UNION ALL
-SELECT 
-    'Total de Imóveis',
-    (SELECT COUNT(*) FROM imovel)::text
-UNION ALL
-SELECT 
-    'Total de Reservas',
-    (SELECT COUNT(*) FROM reserva)::text
-UNION ALL
-SELECT 
-    'Reservas Confirmadas',
-    (SELECT COUNT(*) FROM reserva WHERE status = 'confirmada')::text
-UNION ALL
-SELECT 
-    'Reservas Canceladas',
-    (SELECT COUNT(*) FROM reserva WHERE status = 'cancelada')::text
-UNION ALL
-SELECT 
-    'Reservas Pendentes',
-    (SELECT COUNT(*) FROM reserva WHERE status = 'pendente')::text
-UNION ALL
-SELECT 
-    'Receita Total',
-    CONCAT('R$ ', (SELECT COALESCE(SUM(valor_total), 0) FROM pagamento)::text)
-UNION ALL
-SELECT 
-    'Nota Média Geral',
-    CONCAT((SELECT COALESCE(ROUND(AVG(nota), 1), 0) FROM avaliacao)::text, '/5');
-        """
-    }
+    categoria: {rotulo: consulta['sql_resumo'] or consulta['sql'] for rotulo, consulta in itens.items()}
+    for categoria, itens in REGISTRO.items()
+}
+
+# Tempo de vida (segundos) do resultado em cache por consulta (@ttl); as demais usam DB_CACHE_TTL
+TTL_CONSULTAS = {
+    rotulo: consulta['ttl']
+    for itens in REGISTRO.values() for rotulo, consulta in itens.items() if consulta['ttl'] is not None
+}
+
+# Consultas em nível de linha, exibidas em páginas (keyset pagination) pelas chaves @chave
+CHAVES_PAGINACAO = {
+    rotulo: [tuple(chave) for chave in consulta['chaves']]
+    for itens in REGISTRO.values() for rotulo, consulta in itens.items() if consulta['chaves']
 }
 
+TAMANHOS_PAGINA = [25, 50, 100, 250]
+
+def leituras_iniciais():
+    """Primeira tela de cada consulta como ela é aberta (parâmetros no padrão, primeira página)
+    
+    Mesma chave de cache da tela, mas lida no perfil do aquecimento: o preenchimento
+    em segundo plano não ocupa as vagas das consultas analíticas dos usuários.
+    Consultas com versão sobre os resumos leem as tabelas de resumo como a tela
+    (_ler_dataframe), sem atualizá-las.
+    """
+    leituras = []
+    for categoria, itens in REGISTRO.items():
+        for rotulo, registro in itens.items():
+            sql, params = CONSULTAS[categoria][rotulo], None
+            if registro['parametros']:
+                params = argumentos(registro)
+                sql = registro['sql_resumo_parametrizado'] or registro['sql_parametrizado']
+            ttl = TTL_CONSULTAS.get(rotulo)
+            chaves = CHAVES_PAGINACAO.get(rotulo)
+            if chaves:
+                leituras.append(leitura_pagina(sql, chaves, None, TAMANHOS_PAGINA[1], ttl,
+                                               rotulo, params, PERFIL_AQUECIMENTO))
+            else:
+                leituras.append(leitura_consulta(sql, ttl, rotulo, params, PERFIL_AQUECIMENTO))
+    return leituras
+
+@st.cache_resource
+def _iniciar_segundo_plano(versao_registro):
+    """Verificação do cache e aquecimento, configurados uma vez por processo
+    
+    `versao_registro` (sha256 dos arquivos SQL do registro) só entra na chave:
+    as leituras são montadas de novo apenas quando o conteúdo desses arquivos muda.
+    """
+    # Alterações feitas fora do app invalidam o cache e reagendam o aquecimento
+    result_cache.iniciar_verificacao()
+    cache_warmer.configurar(leituras_iniciais())
+    cache_warmer.iniciar()
+
+def _estado_paginacao(consulta):
+    """Pilha com a chave inicial de cada página visitada da consulta"""
+    chave = f"paginas::{consulta}"
+    if chave not in st.session_state:
+        st.session_state[chave] = []
+    return st.session_state[chave]
+
+def _avancar_pagina(consulta, proxima):
+    _estado_paginacao(consulta).append(proxima)
+
+def _voltar_pagina(consulta):
+    pilha = _estado_paginacao(consulta)
+    if pilha:
+        pilha.pop()
+
+def _reiniciar_paginacao(consulta):
+    _estado_paginacao(consulta).clear()
+
+def _converter_parametro(tipo, texto):
+    """Valor digitado -> valor Python do tipo declarado em @parametro (vazio = padrão)"""
+    texto = texto.strip()
+    if not texto:
+        return None
+    if tipo == 'date':
+        return date.fromisoformat(texto)
+    if tipo in ('int', 'integer', 'bigint'):
+        return int(texto)
+    return texto
+
+def ler_parametros(consulta, rotulo):
+    """Campos na barra lateral para os parâmetros declarados da consulta"""
+    valores = {}
+    st.sidebar.markdown("### 🎛️ Parâmetros")
+    for parametro in consulta['parametros']:
+        texto = st.sidebar.text_input(
+            f"{parametro['nome']} ({parametro['tipo']})",
+            placeholder=f"padrão: {parametro['padrao']}",
+            key=f"param::{rotulo}::{parametro['nome']}",
+            on_change=_reiniciar_paginacao, args=(rotulo,)
+        )
+        try:
+            valores[parametro['nome']] = _converter_parametro(parametro['tipo'], texto)
+        except ValueError:
+            st.sidebar.error(f"Valor inválido para {parametro['nome']}; usando o padrão")
+    return argumentos(consulta, valores)
+
+FORMATOS_EXPORTACAO = {
+    'csv.gz': ("CSV compactado (.csv.gz)", "application/gzip"),
+    'csv': ("CSV", "text/csv"),
+    'xlsx': ("Excel (.xlsx)", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    'parquet': ("Parquet", "application/octet-stream"),
+}
+
+def _descartar_exportacao(rotulo):
+    anterior = st.session_state.pop(f"exportacao::{rotulo}", None)
+    if anterior and os.path.exists(anterior['caminho']):
+        os.remove(anterior['caminho'])
+
+def preparar_exportacao(sql, params, rotulo, formato, perfil=None):
+    """Grava o resultado completo num arquivo temporário, lote a lote
+    
+    Roda como as consultas da tela: numa thread, com o perfil da consulta e o
+    botão de cancelar. Antes, os downloads vencidos de todas as sessões são apagados.
+    """
+    _descartar_exportacao(rotulo)
+    limpar_downloads()
+    os.makedirs(DIRETORIO_DOWNLOADS, exist_ok=True)
+    caminho = os.path.join(DIRETORIO_DOWNLOADS, f"{uuid.uuid4().hex}.{formato}")
+    tarefa = f"{rotulo} (exportação)"
+    _retomar(tarefa)  # novo pedido, mesmo que o anterior tenha sido cancelado
+    linhas = executar_interrompivel(
+        tarefa, lambda: exportar_arquivo(sql, caminho, formato, params, perfil), None
+    )
+    if linhas is not None:
+        st.session_state[f"exportacao::{rotulo}"] = {
+            'caminho': caminho, 'linhas': linhas, 'tamanho': os.path.getsize(caminho),
+            'chave': (formato, _chave_params(params)), 'entregue': False
+        }
+
+def secao_exportacao(consulta, sql, params, rotulo):
+    """Escolha do formato, geração do arquivo e botão de download"""
+    formatos = [formato for formato in FORMATOS_EXPORTACAO if formato in formatos_disponiveis()]
+    col_formato, col_gerar = st.columns([1, 1])
+    with col_formato:
+        formato = st.selectbox("Formato do arquivo", formatos, key=f"formato::{rotulo}",
+                               format_func=lambda formato: FORMATOS_EXPORTACAO[formato][0])
+    with col_gerar:
+        if st.button("📦 Gerar arquivo com todos os registros", key=f"gerar::{rotulo}"):
+            preparar_exportacao(sql, params, rotulo, formato, consulta['perfil'])
+    
+    pronto = st.session_state.get(f"exportacao::{rotulo}")
+    if not pronto or pronto['chave'] != (formato, _chave_params(params)):
+        return
+    if pronto['tamanho'] > TAMANHO_MAXIMO_DOWNLOAD:
+        # Grande demais para a memória do Streamlit: o arquivo sai e fica a exportação em lote
+        _descartar_exportacao(rotulo)
+        st.warning(
+            f"O arquivo tem {pronto['tamanho'] / 1024 / 1024:.0f} MB, acima do limite de download "
+            f"pelo navegador ({TAMANHO_MAXIMO_DOWNLOAD / 1024 / 1024:.0f} MB). Use a exportação em lote: "
+            f"`python src/apresentacao_ldi.py --exportar <pasta> --formato {formato}`"
+        )
+    elif not pronto['entregue']:
+        # O botão é exibido uma vez por arquivo: lido para a memória do Streamlit só nesta
+        # execução e apagado do disco em seguida, sem nova leitura a cada interação
+        with open(pronto['caminho'], 'rb') as arquivo:
+            st.download_button(
+                label=f"📥 Download ({pronto['linhas']} registros, {pronto['tamanho'] / 1024:.0f} KB)",
+                data=arquivo.read(),
+                file_name=nome_arquivo(consulta['id'], consulta['nome'], formato),
+                mime=FORMATOS_EXPORTACAO[formato][1],
+                key=f"download::{rotulo}"
+            )
+        os.remove(pronto['caminho'])
+        pronto['entregue'] = True
+    else:
+        st.caption("Link de download já exibido; gere o arquivo de novo para baixá-lo outra vez.")
+
 # Interface principal
 def main():
+    # Verificação do cache e aquecimento em segundo plano (não refeitos a cada interação)
+    _iniciar_segundo_plano(versao_registro())
+    
     # Header principal
     st.markdown('''
     <div class="main-header">
@@ -652,6 +565,18 @@ def main():
         list(CONSULTAS[categoria_selecionada].keys())
     )
     
+    # Parâmetros declarados: a consulta roda na versão com marcadores (comando preparado)
+    registro = REGISTRO[categoria_selecionada][consulta_selecionada]
+    if st.session_state.get('consulta_aberta') != consulta_selecionada:
+        # Aberturas por consulta definem a ordem do aquecimento do cache
+        st.session_state['consulta_aberta'] = consulta_selecionada
+        cache_warmer.registrar_acesso(consulta_selecionada)
+    params = None
+    sql_execucao = CONSULTAS[categoria_selecionada][consulta_selecionada]
+    if registro['parametros']:
+        params = ler_parametros(registro, consulta_selecionada)
+        sql_execucao = registro['sql_resumo_parametrizado'] or registro['sql_parametrizado']
+    
     st.sidebar.markdown("---")
     
     # Informações do sistema
@@ -660,6 +585,22 @@ def main():
         "Sistema desenvolvido para projeto acadêmica de banco de dados, projetando um banco para um Sistema de Locação de Imóveis por Temporada com 21 consultas organizadas por categoria."
     )
     
+    stats_cache = result_cache.estatisticas()
+    st.sidebar.caption(
+        f"🗄️ Cache: {stats_cache['entradas']} consultas, "
+        f"{stats_cache['bytes'] / 1024:.0f} KB, "
+        f"{stats_cache['acertos']} acertos / {stats_cache['falhas']} falhas"
+    )
+    stats_aquecimento = cache_warmer.estatisticas()
+    if stats_aquecimento['ultima_rodada_ms'] is not None:
+        st.sidebar.caption(
+            f"🔥 Aquecimento: {stats_aquecimento['executadas']} consultas em {stats_aquecimento['rodadas']} "
+            f"rodadas (última: {stats_aquecimento['ultima_rodada_ms'] / 1000:.1f}s)"
+        )
+    for replica in db_manager.replicas_status():
+        atraso = "sem resposta" if replica['atraso'] is None else f"atraso {replica['atraso']:.1f}s"
+        st.sidebar.caption(f"🔀 Réplica {replica['nome']}: {atraso}, {replica['consultas']} leituras")
+    
     # Área principal
     # Cabeçalho da consulta
     st.markdown(f'<div class="category-header"><h3>{categoria_selecionada}</h3></div>', unsafe_allow_html=True)
@@ -677,18 +618,49 @@ def main():
     with col2:
         st.markdown("### 📊 Resultado da Consulta")
         
-        # Executar consulta
-        with st.spinner('Executando consulta...'):
-            df_resultado = executar_consulta(sql_query)
+        chaves = CHAVES_PAGINACAO.get(consulta_selecionada)
+        ttl = TTL_CONSULTAS.get(consulta_selecionada)
+        
+        # Executar consulta (uma página por vez nas consultas paginadas), com o perfil
+        # de execução da consulta e botão para cancelar enquanto roda
+        if chaves:
+            limite = st.session_state.get(f"limite::{consulta_selecionada}", TAMANHOS_PAGINA[1])
+            pilha = _estado_paginacao(consulta_selecionada)
+            apos = pilha[-1] if pilha else None
+            df_resultado, proxima = executar_pagina(sql_execucao, chaves, apos, limite, ttl,
+                                                     rotulo=consulta_selecionada, params=params,
+                                                     perfil=registro['perfil'])
+        else:
+            df_resultado = executar_consulta(sql_execucao, ttl, rotulo=consulta_selecionada, params=params,
+                                            perfil=registro['perfil'])
         
         if not df_resultado.empty:
-            # Mostrar tabela completa com scroll
+            # Mostrar tabela com scroll
             st.dataframe(
                 df_resultado, 
                 use_container_width=True,
-                height=400
+                height=400,
+                column_config=formato_colunas(registro, df_resultado)
             )
-            st.info(f"📋 Total de {len(df_resultado)} registros encontrados")
+            if chaves:
+                total = estimar_total(sql_execucao, ttl, params)
+                inicio = len(pilha) * limite + 1
+                texto_total = f" de ~{total}" if total is not None else ""
+                st.info(f"📋 Registros {inicio}–{inicio + len(df_resultado) - 1}{texto_total} (página {len(pilha) + 1})")
+                
+                nav1, nav2, nav3 = st.columns([1, 1, 1])
+                with nav1:
+                    st.button("⬅️ Anterior", disabled=not pilha,
+                              on_click=_voltar_pagina, args=(consulta_selecionada,))
+                with nav2:
+                    st.selectbox("Linhas por página", TAMANHOS_PAGINA, index=1,
+                                 key=f"limite::{consulta_selecionada}",
+                                 on_change=_reiniciar_paginacao, args=(consulta_selecionada,))
+                with nav3:
+                    st.button("Próxima ➡️", disabled=proxima is None,
+                              on_click=_avancar_pagina, args=(consulta_selecionada, proxima))
+            else:
+                st.info(f"📋 Total de {len(df_resultado)} registros encontrados")
         else:
             st.warning("Nenhum resultado encontrado.")
     
@@ -696,45 +668,88 @@ def main():
     if not df_resultado.empty:
         st.markdown("---")
         with st.expander("🔍 Visualização Completa", expanded=False):
-            st.dataframe(
-                df_resultado, 
-                use_container_width=True,
-                height=600
-            )
+            # Consultas paginadas não repetem a tabela: a página já está acima
+            if not chaves:
+                st.dataframe(
+                    df_resultado, 
+                    use_container_width=True,
+                    height=600,
+                    column_config=formato_colunas(registro, df_resultado)
+                )
             
-            # Mostrar métricas para KPIs
-            if consulta_selecionada == "KPIs do Negócio":
+            # Mostrar métricas para KPIs (valores numéricos, formatados só na exibição)
+            if registro['id'] == 21:
                 st.markdown("### 📈 Métricas Principais")
                 cols = st.columns(4)
-                for idx, (i, row) in enumerate(df_resultado.iterrows()):
+                for idx, row in enumerate(df_resultado.itertuples(index=False)):
                     with cols[idx % 4]:
-                        st.metric(
-                            label=row['metrica'].replace('👥 ', '').replace('🏠 ', '').replace('🧳 ', '').replace('🏢 ', '').replace('📋 ', '').replace('✅ ', '').replace('❌ ', '').replace('💰 ', ''),
-                            value=row['valor']
-                        )
+                        st.metric(label=row.metrica, value=formatar_kpi(row.valor, row.formato))
             
-            # Gráficos específicos
-            if consulta_selecionada == "Receita por Imóvel":
-                fig = criar_grafico_receita_imoveis(df_resultado)
+            # Gráficos específicos, só quando pedidos (a consulta e o plotly ficam para depois)
+            # Os gráficos têm consulta própria, agregada no servidor e com número fixo de pontos
+            if registro['id'] in (6, 12) and st.toggle("📈 Mostrar gráfico", key=f"grafico::{consulta_selecionada}"):
+                if registro['id'] == 6:
+                    fig = criar_grafico_receita_imoveis(
+                        dados_grafico(graficos.SQL_RECEITA_TOPO, graficos.receita_por_imovel, ttl)
+                    )
+                else:
+                    agrupamento, df_grafico = dados_grafico(
+                        graficos.SQL_OCUPACAO_RESUMO, graficos.ocupacao_por_periodo, ttl
+                    ) or (None, None)
+                    fig = criar_grafico_ocupacao(df_grafico, agrupamento)
                 if fig:
                     st.plotly_chart(fig, use_container_width=True)
             
-            elif consulta_selecionada == "Ocupação por Período":
-                fig = criar_grafico_ocupacao(df_resultado)
-                if fig:
-                    st.plotly_chart(fig, use_container_width=True)
-            
-            # Download dos dados
-            csv = df_resultado.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="📥 Download CSV",
-                data=csv,
-                file_name=f"{consulta_selecionada.lower().replace(' ', '_')}.csv",
-                mime="text/csv"
-            )
+            # Download do resultado completo, gravado em arquivo direto do cursor no servidor
+            secao_exportacao(registro, sql_execucao, params, consulta_selecionada)
     else:
         st.warning("Nenhum resultado encontrado para esta consulta.")
     
+    # Tempos das últimas execuções no banco (acertos do cache não aparecem)
+    with st.expander("⏱️ Tempos de Execução", expanded=False):
+        medicoes = query_log.ultimas(consulta_selecionada)
+        if medicoes:
+            import pandas as pd
+            st.dataframe(
+                pd.DataFrame(medicoes).drop(columns=['consulta']),
+                use_container_width=True
+            )
+        else:
+            st.caption("Nenhuma execução registrada (resultado veio do cache).")
+        lentas = query_log.lentas()
+        if lentas:
+            st.caption(f"🐢 {len(lentas)} consultas recentes acima de {query_log.limite_lenta_ms:.0f}ms")
+    
+    # Busca de disponibilidade (índice GiST sobre os períodos das reservas): só roda ao
+    # clicar em Buscar; o último resultado fica na sessão para as outras interações
+    with st.expander("🔎 Buscar Imóveis Disponíveis", expanded=False):
+        with st.form("disp_busca"):
+            d1, d2, d3 = st.columns(3)
+            with d1:
+                entrada = st.date_input("Entrada", value=date.today(), key="disp_entrada")
+            with d2:
+                saida = st.date_input("Saída", value=date.today() + timedelta(days=7), key="disp_saida")
+            with d3:
+                hospedes = st.number_input("Hóspedes", min_value=1, value=2, step=1, key="disp_hospedes")
+            buscar = st.form_submit_button("🔎 Buscar")
+        if buscar:
+            if saida <= entrada:
+                st.warning("A saída deve ser depois da entrada.")
+                st.session_state.pop("disp_livres", None)
+            else:
+                _retomar("disponibilidade")  # nova busca, mesmo que a anterior tenha sido cancelada
+                st.session_state["disp_livres"] = executar_interrompivel(
+                    "disponibilidade", lambda: imoveis_disponiveis(entrada, saida, int(hospedes)), None
+                )
+        livres = st.session_state.get("disp_livres")
+        if livres:
+            import pandas as pd
+            st.dataframe(pd.DataFrame(livres).drop(columns=['id_imovel']), use_container_width=True)
+            if len(livres) == LIMITE_BUSCA:
+                st.caption(f"Mostrando os {LIMITE_BUSCA} imóveis livres mais baratos.")
+        elif livres is not None:
+            st.caption("Nenhum imóvel livre no período.")
+    
     # Footer
     st.markdown("---")
     st.markdown("### 🎓 Informações do Projeto")
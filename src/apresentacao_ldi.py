@@ -5,108 +5,152 @@ Sistema de Locação de Imóveis - Demonstração SQL
 Executa as 21 consultas definidas no arquivo SQL
 """
 
+import argparse
+import asyncio
 import os
+import sys
+import time
 from database import db_manager
+from consultas import carregar_consultas
 
 
-def executar_consulta(sql, titulo):
+def exibir_resultado(titulo, resultados, colunas, total):
+    """Exibe as primeiras linhas de uma consulta formatadas"""
+    print(f"\n{titulo}")
+    print("-" * 60)
+    
+    if not resultados:
+        print("Nenhum resultado encontrado.")
+        return
+    
+    # Exibir cabeçalho
+    header = " | ".join(f"{col[:15]:<15}" for col in colunas)
+    print(header)
+    print("-" * len(header))
+    
+    # Exibir dados (máximo 10 linhas)
+    for linha in resultados:
+        valores = []
+        for item in linha:
+            texto = str(item)[:15] if item is not None else ""
+            valores.append(f"{texto:<15}")
+        print(" | ".join(valores))
+    
+    print(f"\nTotal: {total} registros")
+    if total > 10:
+        print("(Mostrando apenas 10 primeiros)")
+
+
+def executar_consulta(sql, titulo, perfil=None):
     """Executa uma consulta e exibe resultados formatados"""
     try:
-        resultados, colunas = db_manager.execute_query(sql)
-        
-        print(f"\n{titulo}")
-        print("-" * 60)
-        
-        if not resultados:
-            print("Nenhum resultado encontrado.")
-            return
-        
-        # Exibir cabeçalho
-        header = " | ".join(f"{col[:15]:<15}" for col in colunas)
-        print(header)
-        print("-" * len(header))
-        
-        # Exibir dados (máximo 10 linhas)
-        for linha in resultados[:10]:
-            valores = []
-            for item in linha:
-                texto = str(item)[:15] if item is not None else ""
-                valores.append(f"{texto:<15}")
-            print(" | ".join(valores))
-        
-        print(f"\nTotal: {len(resultados)} registros")
-        if len(resultados) > 10:
-            print("(Mostrando apenas 10 primeiros)")
-            
+        # Busca só as linhas exibidas; o total é contado no servidor
+        exibir_resultado(titulo, *db_manager.preview_query(sql, limit=10, profile=perfil))
     except Exception as e:
         print(f"ERRO: {e}")
 
 
-def extrair_consultas():
-    """Extrai consultas do arquivo SQL"""
-    consultas = []
+async def executar_concorrente(consultas, limite):
+    """Dispara todas as consultas ao mesmo tempo (no máximo `limite` por vez)
+    e exibe os resultados na ordem original, à medida que ficam prontos"""
+    from database_async import async_db_manager
     
+    semaforo = asyncio.Semaphore(limite)
+    
+    async def buscar(sql):
+        async with semaforo:
+            return await async_db_manager.preview_query(sql, limit=10)
+    
+    tarefas = [asyncio.create_task(buscar(consulta['sql'])) for consulta in consultas]
     try:
-        # Busca o arquivo SQL
-        for sql_path in ["./v2-ldi.sql", "SQL/v2-ldi.sql", "../SQL/v2-ldi.sql"]:
-            if os.path.exists(sql_path):
-                with open(sql_path, 'r', encoding='utf-8') as f:
-                    linhas = f.readlines()
-                break
-        else:
-            raise FileNotFoundError("Arquivo SQL não encontrado")
-        
-        consulta_atual = ""
-        titulo_atual = ""
-        dentro_consulta = False
-        
-        for linha in linhas:
-            linha = linha.strip()
-            
-            # Identifica início de consulta
-            if linha.startswith("-- Consulta") and ":" in linha:
-                if consulta_atual and titulo_atual:
-                    consultas.append({"titulo": titulo_atual, "sql": consulta_atual.strip()})
-                
-                titulo_atual = linha.split(": ", 1)[1]
-                consulta_atual = ""
-                dentro_consulta = True
-                continue
-            
-            # Para na próxima seção
-            if linha.startswith("-- =") or linha.startswith("-- 💰") or linha.startswith("-- 📊"):
-                if consulta_atual and titulo_atual:
-                    consultas.append({"titulo": titulo_atual, "sql": consulta_atual.strip()})
-                    consulta_atual = ""
-                    titulo_atual = ""
-                dentro_consulta = False
-                continue
-            
-            # Coleta SQL
-            if dentro_consulta and linha and not linha.startswith("--"):
-                consulta_atual += linha + "\n"
-        
-        # Adiciona última consulta
-        if consulta_atual and titulo_atual:
-            consultas.append({"titulo": titulo_atual, "sql": consulta_atual.strip()})
-            
-        return consultas
-        
+        for i, (consulta, tarefa) in enumerate(zip(consultas, tarefas), 1):
+            print(f"\n[{i}/{len(consultas)}]", end=" ")
+            try:
+                exibir_resultado(consulta['titulo'], *await tarefa)
+            except Exception as e:
+                print(f"ERRO: {e}")
+    finally:
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        await async_db_manager.close()
+
+
+def extrair_consultas():
+    """Consultas do registro (SQL/v2-ldi.sql), na ordem do arquivo"""
+    try:
+        return list(carregar_consultas())
     except Exception as e:
         print(f"ERRO ao ler arquivo SQL: {e}")
         return []
 
 
+def exportar_lote(args):
+    """Modo não interativo: exporta todas as consultas e grava o manifesto"""
+    from exportacao import exportar_consultas
+    
+    consultas = extrair_consultas()
+    if not consultas:
+        print("ERRO: Nenhuma consulta encontrada")
+        sys.exit(1)
+    
+    print(f"Exportando {len(consultas)} consultas para {args.exportar} ({args.trabalhadores} em paralelo)...")
+    try:
+        manifesto = exportar_consultas(consultas, args.exportar, args.formato,
+                                       args.trabalhadores, args.tempo_limite)
+    except ConnectionError as e:
+        print(f"\n{e}")
+        sys.exit(1)
+    
+    falhas = 0
+    for entrada in manifesto['consultas']:
+        if entrada['erro']:
+            falhas += 1
+            print(f"[{entrada['consulta']:>2}] ERRO: {entrada['titulo']}: {entrada['erro']}")
+        else:
+            print(f"[{entrada['consulta']:>2}] {entrada['linhas']:>10} linhas  {entrada['segundos']:>7.2f}s  {entrada['arquivo']}")
+    print(f"\nConcluído em {manifesto['segundos']:.2f}s ({manifesto['formato']}); manifesto em "
+          f"{os.path.join(args.exportar, 'manifest.json')}")
+    if falhas:
+        sys.exit(1)
+
+
 def main():
     """Função principal"""
+    parser = argparse.ArgumentParser(description="Demonstração das 21 consultas")
+    parser.add_argument('--concorrente', action='store_true',
+                        help="executa as consultas em paralelo, sem pausas")
+    parser.add_argument('--limite', type=int, default=int(db_manager.config['POOL_MAX']),
+                        help="máximo de consultas simultâneas no modo concorrente")
+    parser.add_argument('--recriar', action='store_true',
+                        help="apaga e recria o banco de demonstração antes das consultas")
+    parser.add_argument('--adotar', action='store_true',
+                        help="banco criado antes das migrações: confere o schema e o registra, sem apagar os dados")
+    parser.add_argument('--exportar', metavar='DIRETORIO',
+                        help="modo lote: exporta o resultado completo de cada consulta, sem recriar o banco")
+    parser.add_argument('--formato', choices=['parquet', 'csv', 'csv.gz', 'xlsx'], default='parquet',
+                        help="formato dos arquivos exportados (parquet requer pyarrow, xlsx requer openpyxl)")
+    parser.add_argument('--trabalhadores', type=int, default=4,
+                        help="consultas exportadas em paralelo")
+    parser.add_argument('--tempo-limite', type=float,
+                        help="segundos para o lote inteiro terminar")
+    args = parser.parse_args()
+    
+    if args.exportar:
+        exportar_lote(args)
+        return
+    
     print("SISTEMA DE LOCAÇÃO DE IMÓVEIS")
     print("=" * 60)
     
     try:
-        # Inicializa banco de dados
-        print("Inicializando banco de dados...")
-        db_manager.execute_script("SQL/v2-ldi.sql")
-        print("Banco criado e populado com sucesso!")
+        # Aplica só os passos de migração novos (o banco não é recriado a cada execução)
+        print("Recriando banco de dados..." if args.recriar else "Verificando banco de dados...")
+        aplicados = db_manager.migrate(reset=args.recriar, adopt=args.adotar)
+        if aplicados:
+            print(f"Passos aplicados: {', '.join(aplicados)}")
+        else:
+            print("Banco de dados já atualizado.")
         
         # Executa consultas
         consultas = extrair_consultas()
@@ -115,11 +159,21 @@ def main():
             print("ERRO: Nenhuma consulta encontrada")
             return
         
+        if args.concorrente:
+            print(f"\nExecutando {len(consultas)} consultas (até {args.limite} simultâneas):")
+            if sys.platform == 'win32':
+                # O modo assíncrono do psycopg2 precisa de add_reader, ausente no loop Proactor
+                asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+            inicio = time.perf_counter()
+            asyncio.run(executar_concorrente(consultas, max(1, args.limite)))
+            print(f"\nConcluído! {len(consultas)} consultas executadas em {time.perf_counter() - inicio:.2f}s.")
+            return
+        
         print(f"\nExecutando {len(consultas)} consultas:")
         
         for i, consulta in enumerate(consultas, 1):
             print(f"\n[{i}/{len(consultas)}]", end=" ")
-            executar_consulta(consulta['sql'], consulta['titulo'])
+            executar_consulta(consulta['sql'], consulta['titulo'], consulta['perfil'])
             
             # Pausa a cada 5 consultas
             if i % 5 == 0 and i < len(consultas):
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Aquecimento do cache de resultados do Streamlit
+Sistema de Locação de Imóveis
+
+Uma thread em segundo plano executa a primeira tela de cada consulta e guarda
+o resultado no cache, para que o primeiro clique já encontre os dados prontos.
+Ela roda ao iniciar, depois de cada alteração dos dados (execute_script,
+migrações, escritas do app ou de fora dele, detectadas pela assinatura do
+cache) e antes de cada resultado expirar. As consultas mais acessadas vão
+primeiro; as contagens de acesso ficam num arquivo JSON e valem entre reinícios.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from cache import result_cache
+from database import db_manager, ler_env, ler_flag
+
+# Contagens de acesso: dados do usuário (XDG_DATA_HOME), não cache descartável do projeto
+ARQUIVO_ACESSOS = Path(os.environ.get('XDG_DATA_HOME') or Path.home() / ".local" / "share") \
+    / "ldi" / "acessos_consultas.json"
+
+# Perfil de execução das leituras do aquecimento (vagas próprias em PERFIS_EXECUCAO)
+PERFIL_AQUECIMENTO = 'aquecimento'
+
+
+class CacheWarmer:
+    """Mantém no cache a primeira tela de cada consulta, das mais acessadas para as menos"""
+    
+    def __init__(self, trabalhadores=2, intervalo=30, espera=2, arquivo=None, ativo=True, gravar_a_cada=30):
+        self.trabalhadores = max(1, trabalhadores)
+        self.intervalo = intervalo  # segundos entre as rodadas de manutenção
+        self.espera = espera  # segundos sem alterações antes de reaquecer (agrupa rajadas)
+        self.arquivo = arquivo
+        self.ativo = ativo
+        self.gravar_a_cada = gravar_a_cada  # segundos entre as gravações das contagens
+        self._leituras = []
+        self._com_erro = set()  # falharam na última tentativa; esperam os dados mudarem
+        self._lock = threading.Lock()
+        self._gravacao_lock = threading.Lock()
+        self._acessos = self._carregar_acessos()
+        self._acessos_pendentes = False
+        self._gravado_em = time.monotonic()
+        self._evento = threading.Event()
+        self._alterado_em = None
+        self._thread = None
+        self.rodadas = 0
+        self.executadas = 0
+        self.erros = 0
+        self.ultima_rodada_ms = None
+    
+    def configurar(self, leituras):
+        """Define o que aquecer: dicionários com nome, sql, params (chave do cache), ttl e ler
+        
+        `ler` deve usar o perfil PERFIL_AQUECIMENTO, para não disputar as vagas
+        das consultas abertas na tela.
+        """
+        with self._lock:
+            self._leituras = list(leituras)
+    
+    def iniciar(self):
+        """Inicia a thread (uma vez por processo); a primeira rodada espera `espera` segundos"""
+        with self._lock:
+            if not self.ativo or self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._executar, name="aquecimento-cache", daemon=True)
+            self._thread.start()
+        # Deixa a primeira tela do app usar o banco sozinha
+        self.agendar()
+    
+    def agendar(self):
+        """Pede uma rodada depois que os dados pararem de mudar"""
+        with self._lock:
+            self._com_erro.clear()
+        self._alterado_em = time.monotonic()
+        self._evento.set()
+    
+    def registrar_acesso(self, nome):
+        """Conta uma abertura da consulta `nome` (define a ordem do aquecimento)
+        
+        A contagem muda na hora, em memória; o arquivo é regravado no máximo a
+        cada `gravar_a_cada` segundos (e a cada rodada da thread), não a cada clique.
+        """
+        with self._lock:
+            self._acessos[nome] = self._acessos.get(nome, 0) + 1
+            self._acessos_pendentes = True
+            gravar = time.monotonic() - self._gravado_em >= self.gravar_a_cada
+        if gravar:
+            self.gravar_acessos()
+    
+    def gravar_acessos(self):
+        """Grava no arquivo as contagens ainda não gravadas"""
+        with self._lock:
+            if not self._acessos_pendentes:
+                return
+            acessos = dict(self._acessos)
+            self._acessos_pendentes = False
+            self._gravado_em = time.monotonic()
+        # Fora do lock: a tela não espera pelo disco
+        with self._gravacao_lock:
+            self._gravar_acessos(acessos)
+    
+    def acessos(self):
+        with self._lock:
+            return dict(self._acessos)
+    
+    def estatisticas(self):
+        """Resumo das rodadas de aquecimento"""
+        return {
+            'rodadas': self.rodadas,
+            'executadas': self.executadas,
+            'erros': self.erros,
+            'ultima_rodada_ms': self.ultima_rodada_ms
+        }
+    
+    def aquecer(self):
+        """Executa as leituras ausentes do cache ou que expiram antes da próxima rodada
+        
+        No máximo `trabalhadores` consultas ao mesmo tempo, na ordem dos acessos;
+        as que falharam (ex.: tempo limite) só são tentadas de novo depois de uma
+        alteração dos dados. Retorna quantas foram executadas.
+        """
+        with self._lock:
+            leituras = [leitura for leitura in self._leituras if leitura['nome'] not in self._com_erro]
+            acessos = dict(self._acessos)
+        pendentes = [
+            leitura for leitura in leituras
+            if result_cache.validade(leitura['sql'], leitura['params']) <= self.intervalo
+        ]
+        # sorted é estável: com o mesmo número de acessos vale a ordem do registro
+        pendentes.sort(key=lambda leitura: acessos.get(leitura['nome'], 0), reverse=True)
+        if not pendentes:
+            return 0
+        
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.trabalhadores, thread_name_prefix="aquecimento") as executor:
+            resultados = list(executor.map(self._preencher, pendentes))
+        with self._lock:
+            self._com_erro.update(leitura['nome'] for leitura, ok in zip(pendentes, resultados) if not ok)
+        self.rodadas += 1
+        self.executadas += sum(resultados)
+        self.erros += len(resultados) - sum(resultados)
+        self.ultima_rodada_ms = (time.perf_counter() - inicio) * 1000
+        return sum(resultados)
+    
+    @staticmethod
+    def _preencher(leitura):
+        try:
+            result_cache.preencher(leitura['sql'], leitura['ler'], params=leitura['params'], ttl=leitura['ttl'])
+            return True
+        except Exception:
+            # Consulta com erro (ou tempo limite) fica para o clique do usuário
+            return False
+    
+    def _executar(self):
+        while True:
+            self._evento.wait(self.intervalo)
+            self._evento.clear()
+            # Carga de dados em andamento: espera as alterações pararem
+            while self._alterado_em is not None and time.monotonic() - self._alterado_em < self.espera:
+                time.sleep(self.espera)
+            self._alterado_em = None
+            try:
+                # Escritas feitas fora do app chegam pelo agendar(), via verificação
+                # da assinatura em segundo plano (result_cache.iniciar_verificacao)
+                self.aquecer()
+            except Exception:
+                # Sem banco não há o que aquecer; tenta de novo na próxima rodada
+                pass
+            self.gravar_acessos()
+    
+    def _carregar_acessos(self):
+        if not self.arquivo or not os.path.exists(self.arquivo):
+            return {}
+        try:
+            with open(self.arquivo, 'r', encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (OSError, ValueError):
+            return {}
+    
+    def _gravar_acessos(self, acessos):
+        if not self.arquivo:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.arquivo), exist_ok=True)
+            temporario = f"{self.arquivo}.tmp"
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
+                json.dump(acessos, arquivo, ensure_ascii=False)
+            os.replace(temporario, self.arquivo)
+        except OSError:
+            # Contagem só em memória (diretório sem permissão de escrita)
+            pass
+
+
+# Instância global: reaquece sempre que os dados mudam (scripts, migrações, escritas)
+cache_warmer = CacheWarmer(
+    trabalhadores=int(ler_env('DB_CACHE_WARM_WORKERS', '2')),
+    intervalo=float(ler_env('DB_CACHE_WARM_INTERVAL', '30')),
+    arquivo=ler_env('DB_CACHE_WARM_STATS') or str(ARQUIVO_ACESSOS),
+    ativo=ler_flag('DB_CACHE_WARM', 'true')
+)
+db_manager.on_data_change(cache_warmer.agendar)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de resultados das consultas
+Sistema de Locação de Imóveis
+"""
+
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from database import db_manager, ler_env
+
+
+# Soma dos contadores de escrita de todas as tabelas: muda sempre que algum
+# INSERT/UPDATE/DELETE é registrado pelo coletor de estatísticas do PostgreSQL
+SQL_ASSINATURA_DADOS = """
+SELECT COALESCE(SUM(n_tup_ins + n_tup_upd + n_tup_del), 0), COUNT(*)
+FROM pg_stat_user_tables
+"""
+
+
+def estimar_tamanho(valor):
+    """Estimativa em bytes da memória ocupada por um resultado"""
+    if hasattr(valor, 'memory_usage'):
+        # DataFrame do pandas
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(estimar_tamanho(item) for item in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(
+            estimar_tamanho(k) + estimar_tamanho(v) for k, v in valor.items()
+        )
+    return sys.getsizeof(valor)
+
+
+class ResultCache:
+    """Cache LRU de resultados com TTL, limite de memória e invalidação por escrita"""
+    
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl_padrao=300, intervalo_verificacao=5):
+        self.max_bytes = max_bytes
+        self.ttl_padrao = ttl_padrao
+        self.intervalo_verificacao = intervalo_verificacao
+        self._entradas = OrderedDict()  # chave -> (valor, tamanho, expira_em)
+        self._bytes = 0
+        self._versao = 0
+        self._lock = threading.Lock()
+        self._assinatura = None
+        self._ultima_verificacao = 0.0
+        self._verificador = None
+        self.acertos = 0
+        self.falhas = 0
+    
+    @staticmethod
+    def chave(sql, params=None):
+        """Chave do cache a partir do texto da consulta e dos parâmetros"""
+        texto = repr((' '.join(sql.split()), params))
+        return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+    
+    def get(self, sql, params=None):
+        """Retorna o resultado guardado ou None se ausente/expirado"""
+        chave = self.chave(sql, params)
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.falhas += 1
+                return None
+            valor, tamanho, expira_em = entrada
+            if expira_em < time.monotonic():
+                self._remover(chave)
+                self.falhas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return valor
+    
+    def set(self, sql, valor, params=None, ttl=None, versao=None):
+        """Guarda um resultado; ignora se houve invalidação desde `versao`"""
+        tamanho = estimar_tamanho(valor)
+        if tamanho > self.max_bytes:
+            return
+        chave = self.chave(sql, params)
+        expira_em = time.monotonic() + (self.ttl_padrao if ttl is None else ttl)
+        with self._lock:
+            if versao is not None and versao != self._versao:
+                return
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = (valor, tamanho, expira_em)
+            self._bytes += tamanho
+            # Remove as entradas menos usadas até caber no limite
+            while self._bytes > self.max_bytes:
+                self._remover(next(iter(self._entradas)))
+    
+    def get_or_execute(self, sql, executar, params=None, ttl=None):
+        """Busca no cache ou executa `executar()` e guarda o resultado"""
+        valor = self.get(sql, params)
+        if valor is not None:
+            return valor
+        versao = self._versao
+        valor = executar()
+        self.set(sql, valor, params=params, ttl=ttl, versao=versao)
+        return valor
+    
+    def preencher(self, sql, executar, params=None, ttl=None):
+        """Executa `executar()` e guarda o resultado, mesmo que já exista um (renovação)"""
+        versao = self._versao
+        valor = executar()
+        self.set(sql, valor, params=params, ttl=ttl, versao=versao)
+        return valor
+    
+    def validade(self, sql, params=None):
+        """Segundos até o resultado guardado expirar (0 se ausente), sem contar acerto ou falha"""
+        with self._lock:
+            entrada = self._entradas.get(self.chave(sql, params))
+        return 0.0 if entrada is None else max(0.0, entrada[2] - time.monotonic())
+    
+    def invalidate(self):
+        """Descarta todos os resultados guardados"""
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+            self._versao += 1
+            self._assinatura = None
+    
+    def iniciar_verificacao(self):
+        """Confere a assinatura dos dados em segundo plano a cada `intervalo_verificacao` s
+        
+        A consulta ao banco fica fora do get(): uma leitura da tela nunca espera
+        por ela. Só uma thread por processo; intervalo 0 desliga a verificação.
+        """
+        with self._lock:
+            if self._verificador is not None or not self.intervalo_verificacao:
+                return
+            self._verificador = threading.Thread(target=self._verificar_sempre, name="cache-assinatura", daemon=True)
+            self._verificador.start()
+    
+    def _verificar_sempre(self):
+        while True:
+            time.sleep(self.intervalo_verificacao)
+            self.verificar_alteracoes(forcar=True)
+    
+    def verificar_alteracoes(self, forcar=False):
+        """Invalida o cache se as tabelas foram alteradas desde a última verificação"""
+        agora = time.monotonic()
+        if not forcar and agora - self._ultima_verificacao < self.intervalo_verificacao:
+            return
+        self._ultima_verificacao = agora
+        try:
+            # As estatísticas de uma réplica não contam as escritas replicadas: lê do primário.
+            # Conexão direta, fora de execute_query: a consulta periódica não é medida,
+            # não entra no log de lentas nem ganha EXPLAIN
+            with db_manager.connection(replica=False) as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(SQL_ASSINATURA_DADOS)
+                    assinatura = tuple(cursor.fetchone())
+        except Exception:
+            # Sem banco não há como validar; mantém o cache até o TTL
+            return
+        with self._lock:
+            anterior, self._assinatura = self._assinatura, assinatura
+        if anterior is not None and anterior != assinatura:
+            # Notifica como escrita local: invalida o cache e as leituras seguintes
+            # vão ao primário até as réplicas alcançarem a alteração
+            db_manager.notify_data_change()
+            with self._lock:
+                self._assinatura = assinatura
+    
+    def estatisticas(self):
+        """Resumo de uso do cache"""
+        with self._lock:
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'acertos': self.acertos,
+                'falhas': self.falhas
+            }
+    
+    def _remover(self, chave):
+        _, tamanho, _ = self._entradas.pop(chave)
+        self._bytes -= tamanho
+
+
+# Instância global, invalidada sempre que um script recarrega o banco
+result_cache = ResultCache(
+    max_bytes=int(float(ler_env('DB_CACHE_MAX_MB', '64')) * 1024 * 1024),
+    ttl_padrao=float(ler_env('DB_CACHE_TTL', '300')),
+    intervalo_verificacao=float(ler_env('DB_CACHE_CHECK_INTERVAL', '5'))
+)
+db_manager.on_data_change(result_cache.invalidate)
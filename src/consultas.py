@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registro das 21 consultas do Sistema de Locação de Imóveis
+Fonte única para o Streamlit e para a demonstração no terminal
+
+As consultas vêm de SQL/v2-ldi.sql (blocos "-- Consulta N: TÍTULO" com as
+anotações "-- @..." descritas no próprio arquivo); as versões sobre as tabelas
+de resumo vêm de SQL/v2-ldi-analytics.sql. Parâmetros são marcados no SQL
+como /*:nome*/padrão, de modo que o arquivo continua executável como script;
+o registro guarda também a versão com %(nome)s para execução preparada. O
+resultado do parser é guardado em __pycache__/consultas.json e só é refeito
+quando os arquivos mudam.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+ARQUIVO_CONSULTAS = "v2-ldi.sql"
+ARQUIVO_RESUMOS = "v2-ldi-analytics.sql"
+CACHE_COMPILADO = Path(__file__).parent / "__pycache__" / "consultas.json"
+VERSAO_FORMATO = 4
+
+_INICIO = re.compile(r'--\s*Consulta\s+(\d+)\s*:\s*(.+)')
+_ANOTACAO = re.compile(r'--\s*@(\w+)\s*:\s*(.*)')
+_CHAVE = re.compile(r'(.+?)\s+(ASC|DESC)\s*$', re.IGNORECASE)
+_PARAMETRO = re.compile(r'(\w+)\s+([\w\[\]]+)$')
+_MARCADOR = re.compile(r'/\*:(\w+)\*/')
+_PALAVRA = re.compile(r'[\w.]+')
+
+_registro = None
+_assinatura = None
+_versao = None
+_lock = threading.Lock()
+
+
+def _localizar(nome):
+    """Busca o arquivo SQL nos mesmos locais usados pelos scripts"""
+    for caminho in [Path(nome), Path("SQL") / nome, Path("..") / "SQL" / nome,
+                    Path(__file__).parent.parent / "SQL" / nome]:
+        if caminho.exists():
+            return caminho
+    return None
+
+
+def interpretar(texto):
+    """Extrai as consultas anotadas de um arquivo SQL
+    
+    Retorna uma lista de dicionários com id, categoria, titulo, nome, sql,
+    parametros, chaves, moeda (colunas em reais), ttl e perfil (de execução).
+    """
+    consultas = []
+    categoria = None
+    atual = None
+    
+    def fechar():
+        if atual is not None:
+            atual['sql'] = "\n".join(atual.pop('_linhas')).strip()
+            if atual['sql']:
+                consultas.append(atual)
+    
+    for linha in texto.splitlines():
+        limpa = linha.strip()
+        
+        anotacao = _ANOTACAO.match(limpa)
+        if anotacao:
+            nome, valor = anotacao.group(1).lower(), anotacao.group(2).strip()
+            if nome == 'categoria':
+                categoria = valor
+            elif atual is None:
+                continue
+            elif nome == 'nome':
+                atual['nome'] = valor
+            elif nome == 'ttl':
+                atual['ttl'] = float(valor)
+            elif nome == 'perfil':
+                atual['perfil'] = valor
+            elif nome == 'chave':
+                chave = _CHAVE.match(valor)
+                if not chave:
+                    raise ValueError(f"Consulta {atual['id']}: @chave sem ASC/DESC: {valor}")
+                atual['chaves'].append([chave.group(1).strip(), chave.group(2).upper()])
+            elif nome == 'moeda':
+                atual['moeda'] += [coluna.strip() for coluna in valor.split(',') if coluna.strip()]
+            elif nome == 'parametro':
+                parametro = _PARAMETRO.match(valor)
+                if not parametro:
+                    raise ValueError(f"Consulta {atual['id']}: @parametro inválido: {valor}")
+                atual['parametros'].append(
+                    {'nome': parametro.group(1), 'tipo': parametro.group(2), 'padrao': None}
+                )
+            continue
+        
+        inicio = _INICIO.match(limpa)
+        if inicio:
+            fechar()
+            titulo = inicio.group(2).strip()
+            atual = {'id': int(inicio.group(1)), 'categoria': categoria, 'titulo': titulo,
+                     'nome': titulo, 'sql': None, 'parametros': [], 'chaves': [], 'moeda': [], 'ttl': None,
+                     'perfil': 'operacional', '_linhas': []}
+            continue
+        
+        # Linha de seção encerra a consulta em andamento
+        if limpa.startswith("-- =") or limpa.startswith("-- 💰") or limpa.startswith("-- 📊"):
+            fechar()
+            atual = None
+            continue
+        
+        if atual is not None and not limpa.startswith("--"):
+            atual['_linhas'].append(linha.rstrip())
+    
+    fechar()
+    return consultas
+
+
+def _fim_literal(texto, i):
+    """Posição logo após a string SQL que começa em `i` (aspas dobradas escapam)"""
+    j = i + 1
+    while True:
+        j = texto.find("'", j)
+        if j == -1:
+            raise ValueError("string SQL sem fechamento após parâmetro")
+        if texto.startswith("''", j):
+            j += 2
+            continue
+        return j + 1
+
+
+def _fim_padrao(texto, i):
+    """Fim do valor padrão após um marcador: 'texto', DATE '...', (expressão) ou palavra"""
+    while i < len(texto) and texto[i].isspace():
+        i += 1
+    if texto.startswith("'", i):
+        return _fim_literal(texto, i)
+    if texto.startswith("(", i):
+        nivel = 0
+        for j in range(i, len(texto)):
+            if texto[j] == '(':
+                nivel += 1
+            elif texto[j] == ')':
+                nivel -= 1
+                if nivel == 0:
+                    return j + 1
+        raise ValueError("parênteses sem fechamento após parâmetro")
+    palavra = _PALAVRA.match(texto, i)
+    if not palavra:
+        raise ValueError(f"parâmetro sem valor padrão: {texto[i:i + 20]!r}")
+    # Literal com tipo, como DATE 'infinity'
+    j = palavra.end()
+    while j < len(texto) and texto[j] in ' \t':
+        j += 1
+    if texto.startswith("'", j):
+        return _fim_literal(texto, j)
+    return palavra.end()
+
+
+def parametrizar(sql, parametros):
+    """Troca cada /*:nome*/padrão por COALESCE(%(nome)s::tipo, padrão)
+    
+    Sem argumento (None) vale o padrão, e o plano preparado é o mesmo para
+    qualquer valor. Preenche o 'padrao' de cada parâmetro com o texto original.
+    """
+    por_nome = {parametro['nome']: parametro for parametro in parametros}
+    texto = sql.replace('%', '%%')  # '%' literal não pode virar marcador do psycopg2
+    partes, posicao, usados = [], 0, set()
+    for marcador in _MARCADOR.finditer(texto):
+        if marcador.start() < posicao:
+            continue
+        nome = marcador.group(1)
+        if nome not in por_nome:
+            raise ValueError(f"parâmetro /*:{nome}*/ sem @parametro")
+        fim = _fim_padrao(texto, marcador.end())
+        padrao = texto[marcador.end():fim].strip()
+        if por_nome[nome]['padrao'] is None:
+            por_nome[nome]['padrao'] = padrao.replace('%%', '%')
+        partes.append(texto[posicao:marcador.start()])
+        partes.append(f"COALESCE(%({nome})s::{por_nome[nome]['tipo']}, {padrao})")
+        posicao = fim
+        usados.add(nome)
+    partes.append(texto[posicao:])
+    return "".join(partes), usados
+
+
+def argumentos(consulta, valores=None):
+    """Argumentos de todos os parâmetros declarados (None = padrão do SQL)"""
+    valores = valores or {}
+    return {parametro['nome']: valores.get(parametro['nome']) for parametro in consulta['parametros']}
+
+
+def _compilar(caminhos):
+    """Monta o registro a partir dos arquivos SQL"""
+    consultas = interpretar(caminhos[ARQUIVO_CONSULTAS].read_text(encoding='utf-8'))
+    ids = [consulta['id'] for consulta in consultas]
+    if len(ids) != len(set(ids)):
+        raise ValueError(f"{ARQUIVO_CONSULTAS}: número de consulta repetido")
+    
+    resumos = {}
+    if ARQUIVO_RESUMOS in caminhos:
+        resumos = {c['id']: c['sql'] for c in interpretar(caminhos[ARQUIVO_RESUMOS].read_text(encoding='utf-8'))}
+    for consulta in consultas:
+        consulta['sql_resumo'] = resumos.get(consulta['id'])
+        consulta['rotulo'] = f"{consulta['id']}. {consulta['nome']}"
+        consulta['sql_parametrizado'] = consulta['sql_resumo_parametrizado'] = None
+        if consulta['parametros']:
+            try:
+                consulta['sql_parametrizado'], usados = parametrizar(consulta['sql'], consulta['parametros'])
+                if consulta['sql_resumo']:
+                    consulta['sql_resumo_parametrizado'], _ = parametrizar(
+                        consulta['sql_resumo'], consulta['parametros']
+                    )
+            except ValueError as e:
+                raise ValueError(f"Consulta {consulta['id']}: {e}")
+            sobrando = {p['nome'] for p in consulta['parametros']} - usados
+            if sobrando:
+                raise ValueError(f"Consulta {consulta['id']}: @parametro sem marcador no SQL: {sorted(sobrando)}")
+    return consultas
+
+
+def _ler_cache():
+    try:
+        with open(CACHE_COMPILADO, 'r', encoding='utf-8') as arquivo:
+            cache = json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+    if cache.get('versao') != VERSAO_FORMATO:
+        return None
+    return cache
+
+
+def _gravar_cache(arquivos, consultas):
+    try:
+        CACHE_COMPILADO.parent.mkdir(exist_ok=True)
+        temporario = CACHE_COMPILADO.with_suffix(f".{os.getpid()}.tmp")
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump({'versao': VERSAO_FORMATO, 'arquivos': arquivos, 'consultas': consultas},
+                      arquivo, ensure_ascii=False)
+        os.replace(temporario, CACHE_COMPILADO)
+    except OSError:
+        # Sem permissão de escrita o registro só não fica salvo entre execuções
+        pass
+
+
+def carregar_consultas():
+    """Retorna o registro de consultas, reaproveitando a versão compilada
+    
+    Chamadas seguintes no mesmo processo só conferem mtime/tamanho dos
+    arquivos; se mudaram mas o conteúdo (sha256) é o mesmo, nada é refeito.
+    """
+    global _registro, _assinatura, _versao
+    
+    caminhos = {}
+    for nome in (ARQUIVO_CONSULTAS, ARQUIVO_RESUMOS):
+        caminho = _localizar(nome)
+        if caminho is not None:
+            caminhos[nome] = caminho
+    if ARQUIVO_CONSULTAS not in caminhos:
+        raise FileNotFoundError("Arquivo SQL não encontrado")
+    
+    estado = {}
+    for nome, caminho in caminhos.items():
+        info = caminho.stat()
+        estado[nome] = [info.st_mtime_ns, info.st_size]
+    assinatura = json.dumps(estado, sort_keys=True)
+    
+    with _lock:
+        if _registro is not None and assinatura == _assinatura:
+            return _registro
+        
+        cache = _ler_cache()
+        if cache is not None and {n: a[:2] for n, a in cache['arquivos'].items()} == estado:
+            _registro, _assinatura = cache['consultas'], assinatura
+            _versao = _resumo_conteudo(cache['arquivos'])
+            return _registro
+        
+        arquivos = {}
+        for nome, caminho in caminhos.items():
+            conteudo = caminho.read_bytes()
+            arquivos[nome] = estado[nome] + [hashlib.sha256(conteudo).hexdigest()]
+        
+        if cache is not None and {n: a[2] for n, a in cache['arquivos'].items()} == \
+                {n: a[2] for n, a in arquivos.items()}:
+            consultas = cache['consultas']  # só o mtime mudou
+        else:
+            consultas = _compilar(caminhos)
+        _gravar_cache(arquivos, consultas)
+        _registro, _assinatura = consultas, assinatura
+        _versao = _resumo_conteudo(arquivos)
+        return _registro
+
+
+def _resumo_conteudo(arquivos):
+    """sha256 único a partir do sha256 de cada arquivo ({nome: [mtime, tamanho, sha256]})"""
+    conteudo = json.dumps({nome: dados[2] for nome, dados in arquivos.items()}, sort_keys=True)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def versao_registro():
+    """Versão do registro: muda só quando o conteúdo dos arquivos SQL muda
+    
+    Serve de chave para o que é montado a partir do registro (as leituras do
+    aquecimento, por exemplo); tocar nos arquivos sem alterá-los não a muda.
+    """
+    carregar_consultas()
+    return _versao
+
+
+def consultas_por_categoria():
+    """{categoria: {rótulo: consulta}} na ordem do arquivo"""
+    categorias = {}
+    for consulta in carregar_consultas():
+        categorias.setdefault(consulta['categoria'], {})[consulta['rotulo']] = consulta
+    return categorias
+
+
+def obter_consulta(consulta_id):
+    """Consulta pelo número (1 a 21)"""
+    for consulta in carregar_consultas():
+        if consulta['id'] == consulta_id:
+            return consulta
+    raise KeyError(f"Consulta {consulta_id} não registrada")
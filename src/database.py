@@ -6,50 +6,432 @@ Sistema de Locação de Imóveis
 """
 
 import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+import functools
+import hashlib
+import io
+import itertools
+import json
 import os
+import re
+import sys
+import threading
+import time
+import uuid
+import weakref
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 
 
+class ConnectionPool:
+    """Pool de conexões reutilizáveis com tempo ocioso e verificação de saúde"""
+    
+    def __init__(self, conectar, minimo=1, maximo=10, tempo_ocioso=300, verificar_saude=True, timeout=30):
+        self._conectar = conectar
+        self.minimo = max(0, minimo)
+        self.maximo = max(1, maximo, self.minimo)
+        self.tempo_ocioso = tempo_ocioso
+        self.verificar_saude = verificar_saude
+        self.timeout = timeout
+        self._livres = []  # pares (conexão, instante em que foi devolvida)
+        self._em_uso = 0
+        self._condicao = threading.Condition()
+        self._fechado = False
+        
+        # Abre as conexões mínimas já na criação do pool
+        for _ in range(self.minimo):
+            self._livres.append((self._conectar(), time.monotonic()))
+    
+    def obter(self):
+        """Retira uma conexão do pool, abrindo uma nova se houver vaga"""
+        limite = time.monotonic() + self.timeout
+        with self._condicao:
+            while True:
+                if self._fechado:
+                    raise ConnectionError("ERRO: pool de conexões já foi fechado")
+                self._descartar_ociosas()
+                if self._livres:
+                    conn, _ = self._livres.pop()
+                    break
+                if self._em_uso < self.maximo:
+                    conn = None
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0 or not self._condicao.wait(restante):
+                    raise ConnectionError(
+                        f"ERRO: pool de conexões esgotado ({self.maximo} conexões em uso)"
+                    )
+            self._em_uso += 1
+        
+        # Conexão e ping ficam fora do lock para não bloquear as outras threads
+        try:
+            if conn is not None and not self._saudavel(conn):
+                self._fechar(conn)
+                conn = None
+            if conn is None:
+                conn = self._conectar()
+        except BaseException:
+            with self._condicao:
+                self._em_uso -= 1
+                self._condicao.notify()
+            raise
+        return conn
+    
+    def devolver(self, conn, descartar=False):
+        """Devolve a conexão ao pool (ou a fecha se estiver quebrada)"""
+        if not descartar and not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                descartar = True
+        
+        with self._condicao:
+            self._em_uso -= 1
+            if descartar or conn.closed or self._fechado:
+                self._fechar(conn)
+            else:
+                self._livres.append((conn, time.monotonic()))
+            self._condicao.notify()
+    
+    def fechar(self):
+        """Fecha todas as conexões livres e impede novos empréstimos"""
+        with self._condicao:
+            self._fechado = True
+            for conn, _ in self._livres:
+                self._fechar(conn)
+            self._livres.clear()
+            self._condicao.notify_all()
+    
+    def estatisticas(self):
+        """Retorna contagem de conexões livres e em uso"""
+        with self._condicao:
+            return {'livres': len(self._livres), 'em_uso': self._em_uso, 'maximo': self.maximo}
+    
+    def _descartar_ociosas(self):
+        """Fecha conexões ociosas além do mínimo configurado"""
+        if not self.tempo_ocioso:
+            return
+        agora = time.monotonic()
+        # As mais antigas ficam no início da lista
+        while len(self._livres) > self.minimo and agora - self._livres[0][1] > self.tempo_ocioso:
+            conn, _ = self._livres.pop(0)
+            self._fechar(conn)
+    
+    def _saudavel(self, conn):
+        """Verifica se a conexão continua utilizável"""
+        if conn.closed:
+            return False
+        if not self.verificar_saude:
+            return True
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.autocommit = False
+            return True
+        except psycopg2.Error:
+            return False
+    
+    @staticmethod
+    def _fechar(conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+
+class _RowStream:
+    """Converte um iterável de linhas no formato texto do COPY, sob demanda"""
+    
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._resto = ''
+        self.rows = 0
+    
+    @staticmethod
+    def _formatar(linha):
+        valores = []
+        for valor in linha:
+            if valor is None:
+                valores.append('\\N')
+            else:
+                valores.append(str(valor).replace('\\', '\\\\').replace('\t', '\\t')
+                               .replace('\n', '\\n').replace('\r', '\\r'))
+        return '\t'.join(valores) + '\n'
+    
+    def read(self, size=-1):
+        partes, tamanho = [self._resto], len(self._resto)
+        while size is None or size < 0 or tamanho < size:
+            linha = next(self._rows, None)
+            if linha is None:
+                break
+            texto = self._formatar(linha)
+            partes.append(texto)
+            tamanho += len(texto)
+            self.rows += 1
+        dados = ''.join(partes)
+        if size is None or size < 0:
+            self._resto = ''
+            return dados
+        self._resto = dados[size:]
+        return dados[:size]
+
+
+class _Prazo:
+    """Cancela no servidor o comando em andamento da conexão quando o prazo (monotonic) vence
+    
+    `disparado` indica que o cancelamento partiu daqui, e não de um cancel() ou
+    do statement_timeout do perfil.
+    """
+    
+    def __init__(self, prazo, conn):
+        self.prazo = prazo
+        self.disparado = False
+        self._conn = conn
+        self._lock = threading.Lock()
+        self._ativo = True
+        self._timer = threading.Timer(max(0.0, prazo - time.monotonic()), self._cancelar)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def _cancelar(self):
+        with self._lock:
+            if self._ativo:
+                self.disparado = True
+                try:
+                    self._conn.cancel()
+                except psycopg2.Error:
+                    pass
+    
+    def esgotado(self):
+        return time.monotonic() >= self.prazo
+    
+    def parar(self):
+        with self._lock:
+            self._ativo = False
+        self._timer.cancel()
+
+
+def _estimar_bytes(linhas, amostra=100):
+    """Estimativa do tamanho das linhas em memória (extrapolada de uma amostra)"""
+    if not linhas:
+        return 0
+    trecho = linhas[:amostra]
+    tamanho = sum(sys.getsizeof(valor) for linha in trecho for valor in linha)
+    return tamanho * len(linhas) // len(trecho)
+
+
+# Locais onde o .env é procurado, na ordem
+ARQUIVOS_ENV = ('.env', '../.env', Path(__file__).parent.parent / '.env')
+
+
+@functools.lru_cache(maxsize=None)
+def carregar_ambiente():
+    """Carrega o primeiro .env encontrado em os.environ, uma vez por processo
+    
+    Retorna o caminho lido (ou None). Importar este módulo não lê o arquivo: ele
+    é lido na primeira configuração pedida (ler_env ou db_manager.config) e as
+    seguintes reaproveitam os valores já em os.environ.
+    """
+    for env_path in ARQUIVOS_ENV:
+        if os.path.exists(env_path):
+            with open(env_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    line = line.strip()
+                    if line and not line.startswith('#') and '=' in line:
+                        key, value = line.split('=', 1)
+                        os.environ[key.strip()] = value.strip()
+            return str(env_path)
+    # Se não encontrar .env, usa valores padrão
+    print("Arquivo .env não encontrado, usando valores padrão...")
+    return None
+
+
+def ler_env(nome, padrao=None):
+    """Variável de configuração (DB_*), depois de carregar o .env"""
+    carregar_ambiente()
+    return os.getenv(nome, padrao)
+
+
+def _ligado(valor):
+    """Interpreta valores booleanos vindos do .env"""
+    return str(valor).strip().lower() in ('1', 'true', 'sim', 'yes', 'on')
+
+
+def ler_flag(nome, padrao='false'):
+    """Variável de configuração sim/não (1, true, sim, yes ou on ligam)"""
+    return _ligado(ler_env(nome, padrao))
+
+
+# Atraso (segundos) da réplica em relação ao primário; 0 se já aplicou tudo o que
+# recebeu ou se o servidor não é standby (instância independente, útil em testes)
+SQL_ATRASO_REPLICA = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+# Scripts com passos de migração, na ordem de aplicação
+SCRIPTS_MIGRACAO = ("SQL/v2-ldi.sql", "SQL/v2-ldi-analytics.sql")
+
+
+class MigracaoInvalida(Exception):
+    """O banco não corresponde aos passos registrados (passo alterado ou banco sem versão)"""
+
+
+class ConsultaCancelada(Exception):
+    """A consulta foi interrompida no servidor por cancel(token)"""
+
+
+class TempoLimiteExcedido(Exception):
+    """A consulta passou do statement_timeout (do perfil de execução ou do chamador)"""
+
+
+# Perfis de execução das consultas (anotação @perfil): os parâmetros valem só para a
+# transação (SET LOCAL) e `simultaneas` limita quantas rodam ao mesmo tempo (None: só
+# o limite do pool). As analíticas ganham memória, JIT e paralelismo, mas no máximo 3
+# de cada vez, para não tomarem o pool e os processos paralelos das operacionais.
+PERFIS_EXECUCAO = {
+    'operacional': {
+        'parametros': {'statement_timeout': '10s', 'work_mem': '4MB', 'jit': 'off',
+                       'max_parallel_workers_per_gather': '0'},
+        'simultaneas': None,
+    },
+    'analitico': {
+        'parametros': {'statement_timeout': '60s', 'work_mem': '64MB', 'jit': 'on',
+                       'max_parallel_workers_per_gather': '2'},
+        'simultaneas': 3,
+    },
+    # Aquecimento do cache em segundo plano: vagas próprias (não ocupa as das
+    # analíticas abertas na tela), sem JIT nem paralelismo e com menos memória
+    'aquecimento': {
+        'parametros': {'statement_timeout': '60s', 'work_mem': '16MB', 'jit': 'off',
+                       'max_parallel_workers_per_gather': '0'},
+        'simultaneas': 2,
+    },
+}
+
+
+# OID do tipo no PostgreSQL -> dtype do pandas nos DataFrames (inteiros anuláveis,
+# NUMERIC como float64: valores em reais com centavos cabem exatos na exibição)
+_DTYPES_PANDAS = {
+    16: 'boolean',
+    20: 'Int64', 21: 'Int16', 23: 'Int32',
+    700: 'float32', 701: 'float64', 1700: 'float64',
+}
+# DATE e TIMESTAMP -> datetime64, convertidos depois da leitura (OID -> com fuso, em UTC)
+_TIPOS_DATA = {1082: False, 1114: False, 1184: True}
+_OID_DATE = 1082
+_TIPOS_TEXTO = {18, 19, 25, 1042, 1043}
+
+
+class QueryTiming:
+    """Medição de uma consulta: tempo por fase, linhas e bytes recebidos"""
+    
+    def __init__(self, sql, rotulo=None, params=None):
+        self.sql = sql
+        self.rotulo = rotulo
+        self.params = params
+        self.fases = {}  # nome da fase -> milissegundos
+        self.linhas = 0
+        self.bytes = 0
+        self.erro = None
+        self.inicio = time.time()
+        self.total_ms = 0.0
+    
+    @contextmanager
+    def fase(self, nome):
+        """Cronometra um trecho e acumula o tempo na fase `nome`"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases[nome] = self.fases.get(nome, 0.0) + (time.perf_counter() - inicio) * 1000
+    
+    def registrar_linhas(self, linhas):
+        self.linhas += len(linhas)
+        self.bytes += _estimar_bytes(linhas)
+    
+    def executada(self, sql, params=None):
+        """Guarda o comando efetivamente enviado ao banco (usado no EXPLAIN)"""
+        self.sql = sql
+        self.params = params
+
+
 class DatabaseManager:
     """Gerenciador de conexão e operações com banco PostgreSQL"""
     
     def __init__(self):
-        self.config = self._load_config()
+        self._config = None
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # Réplicas de leitura (DB_REPLICAS), montadas no primeiro uso
+        self._replicas = None
+        self._replicas_lock = threading.Lock()
+        self._rodizio = itertools.count()
+        self._ultima_escrita = float('-inf')
+        # Cancelamento: token -> conexões em uso; tokens já cancelados; vagas por perfil
+        self._em_execucao = {}
+        self._canceladas = set()
+        self._cancelamento_lock = threading.Lock()
+        self._vagas = {}
+        self._data_change_callbacks = []
+        self._query_hooks = []
+        self._local = threading.local()
+        # Comandos preparados por conexão: conn -> {'geracao': n, 'comandos': {sql: (nome, parâmetros)}}
+        self._preparados = weakref.WeakKeyDictionary()
+        self._preparados_lock = threading.Lock()
+        self._geracao_preparados = 0
+        self._nomes_preparados = itertools.count(1)
+    
+    @property
+    def config(self):
+        """Configuração de conexão, lida do ambiente (e do .env) no primeiro uso"""
+        if self._config is None:
+            self._config = self._load_config()
+        return self._config
     
     def _load_config(self):
-        """Carrega configurações do arquivo .env"""
-        # Busca .env em diferentes locais
-        for env_path in ['.env', '../.env', Path(__file__).parent.parent / '.env']:
-            if os.path.exists(env_path):
-                self._load_env_file(env_path)
-                break
-        else:
-            # Se não encontrar .env, usa valores padrão
-            print("Arquivo .env não encontrado, usando valores padrão...")
-        
+        """Monta a configuração a partir das variáveis DB_* (com o .env já carregado)"""
         return {
-            'HOST': os.getenv('DB_HOST', 'localhost'),
-            'PORT': os.getenv('DB_PORT', '5432'),
-            'DATABASE': os.getenv('DB_DATABASE', 'ldi'),
-            'USER': os.getenv('DB_USER', 'ldi'),
-            'PASSWORD': os.getenv('DB_PASSWORD', 'ldi123')
+            'HOST': ler_env('DB_HOST', 'localhost'),
+            'PORT': ler_env('DB_PORT', '5432'),
+            'DATABASE': ler_env('DB_DATABASE', 'ldi'),
+            'USER': ler_env('DB_USER', 'ldi'),
+            'PASSWORD': ler_env('DB_PASSWORD', 'ldi123'),
+            'POOL_ENABLED': ler_env('DB_POOL_ENABLED', 'true'),
+            'POOL_MIN': ler_env('DB_POOL_MIN', '1'),
+            'POOL_MAX': ler_env('DB_POOL_MAX', '10'),
+            'POOL_IDLE_TIMEOUT': ler_env('DB_POOL_IDLE_TIMEOUT', '300'),
+            'POOL_HEALTH_CHECK': ler_env('DB_POOL_HEALTH_CHECK', 'true'),
+            'STREAM_ITERSIZE': ler_env('DB_STREAM_ITERSIZE', '2000'),
+            'COPY_CHUNK_SIZE': ler_env('DB_COPY_CHUNK_SIZE', '1048576'),
+            'REPLICAS': ler_env('DB_REPLICAS', ''),
+            'REPLICA_ROUTING': ler_env('DB_REPLICA_ROUTING', 'round_robin'),
+            'REPLICA_MAX_LAG': ler_env('DB_REPLICA_MAX_LAG', '5'),
+            'REPLICA_CHECK_INTERVAL': ler_env('DB_REPLICA_CHECK_INTERVAL', '5')
         }
     
-    def _load_env_file(self, env_path):
-        """Carrega variáveis do arquivo .env"""
-        with open(env_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ[key.strip()] = value.strip()
-    
-    def get_connection(self):
-        """Conecta ao banco PostgreSQL"""
+    @property
+    def pool_enabled(self):
+        return _ligado(self.config['POOL_ENABLED'])
+    
+    @property
+    def pool_health_check(self):
+        return _ligado(self.config['POOL_HEALTH_CHECK'])
+    
+    def get_connection(self, replica=None):
+        """Conecta ao banco PostgreSQL (ao primário, ou à `replica` indicada)"""
+        host = replica['host'] if replica else self.config['HOST']
+        port = replica['port'] if replica else self.config['PORT']
         try:
             return psycopg2.connect(
-                host=self.config['HOST'],
-                port=int(self.config['PORT']),
+                host=host,
+                port=int(port),
                 database=self.config['DATABASE'],
                 user=self.config['USER'],
                 password=self.config['PASSWORD']
@@ -58,34 +440,1178 @@ class DatabaseManager:
             if "role" in str(e) and "does not exist" in str(e):
                 raise ConnectionError(f"ERRO: Usuário '{self.config['USER']}' não existe no PostgreSQL")
             elif "Connection refused" in str(e):
-                raise ConnectionError(f"ERRO: PostgreSQL não está rodando na porta {self.config['PORT']}")
+                raise ConnectionError(f"ERRO: PostgreSQL não está rodando em {host}:{port}")
             else:
                 raise ConnectionError(f"ERRO de conexão: {e}")
     
-    def execute_query(self, sql):
-        """Executa consulta SQL e retorna resultados"""
-        with self.get_connection() as conn:
+    def _novo_pool(self, replica=None):
+        return ConnectionPool(
+            lambda: self.get_connection(replica),
+            minimo=int(self.config['POOL_MIN']),
+            maximo=int(self.config['POOL_MAX']),
+            tempo_ocioso=float(self.config['POOL_IDLE_TIMEOUT']),
+            verificar_saude=self.pool_health_check
+        )
+    
+    def get_pool(self, replica=None):
+        """Retorna o pool de conexões (do primário ou da `replica`), criando-o no primeiro uso"""
+        if replica is not None:
+            if replica['pool'] is None:
+                with self._pool_lock:
+                    if replica['pool'] is None:
+                        replica['pool'] = self._novo_pool(replica)
+            return replica['pool']
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = self._novo_pool()
+        return self._pool
+    
+    def _abrir(self, replica=None):
+        """Abre ou empresta uma conexão; retorna (conexão, pool ou None)"""
+        if not self.pool_enabled:
+            return self.get_connection(replica), None
+        pool = self.get_pool(replica)
+        return pool.obter(), pool
+    
+    # Espera máxima (s) por uma vaga do perfil antes de desistir
+    _ESPERA_VAGA = 30
+    
+    @contextmanager
+    def connection(self, replica=False, profile=None):
+        """Empresta uma conexão (do pool, se habilitado) e faz commit ao final
+        
+        Com `replica`, a conexão vem de uma réplica de leitura em dia
+        (DB_REPLICAS); sem réplica disponível, vem do primário.
+        `profile` (chave de PERFIS_EXECUCAO) aplica o perfil de execução à
+        transação. Dentro de `cancellable(token)`, o comando em andamento pode
+        ser interrompido por `cancel(token)` a partir de outra thread.
+        """
+        perfil = self._perfil(profile)
+        vagas = self._vagas_perfil(profile)
+        if vagas is not None:
+            with self._fase('aguardar'):
+                if not vagas.acquire(timeout=self._ESPERA_VAGA):
+                    raise ConnectionError(
+                        f"ERRO: {perfil['simultaneas']} consultas do perfil '{profile}' já em execução"
+                    )
+        try:
+            destino = self.choose_replica() if replica else None
+            with self._fase('conectar'):
+                try:
+                    conn, pool = self._abrir(destino)
+                except ConnectionError:
+                    if destino is None:
+                        raise
+                    # Réplica fora do ar: fica de lado até a próxima verificação
+                    self.mark_replica_down(destino)
+                    destino = None
+                    conn, pool = self._abrir()
+            
+            token = getattr(self._local, 'cancelamento', None)
+            self.track_replica_use(destino, 1)
+            descartar = False
+            try:
+                self._registrar_execucao(token, conn, True)
+                if perfil is not None:
+                    with conn.cursor() as cursor:
+                        cursor.execute(
+                            "SELECT " + ", ".join(["set_config(%s, %s, true)"] * len(perfil['parametros'])),
+                            [valor for item in perfil['parametros'].items() for valor in item]
+                        )
+                yield conn
+                conn.commit()
+            except BaseException as e:
+                self._invalidar_preparados(conn)
+                try:
+                    if not conn.closed:
+                        conn.rollback()
+                except psycopg2.Error:
+                    descartar = True
+                if isinstance(e, psycopg2.errors.QueryCanceled):
+                    raise self._interrupcao(token, profile) from e
+                raise
+            finally:
+                self._registrar_execucao(token, conn, False)
+                self.track_replica_use(destino, -1)
+                if pool is None:
+                    conn.close()
+                else:
+                    pool.devolver(conn, descartar)
+        finally:
+            if vagas is not None:
+                vagas.release()
+    
+    @staticmethod
+    def _perfil(profile):
+        if profile is None:
+            return None
+        if profile not in PERFIS_EXECUCAO:
+            raise ValueError(f"perfil de execução desconhecido: {profile}")
+        return PERFIS_EXECUCAO[profile]
+    
+    def _vagas_perfil(self, profile):
+        """Semáforo do limite de consultas simultâneas do perfil (None se não houver limite)"""
+        perfil = self._perfil(profile)
+        if perfil is None or not perfil['simultaneas']:
+            return None
+        with self._cancelamento_lock:
+            if profile not in self._vagas:
+                self._vagas[profile] = threading.BoundedSemaphore(perfil['simultaneas'])
+            return self._vagas[profile]
+    
+    @contextmanager
+    def cancellable(self, token):
+        """As consultas desta thread dentro do bloco podem ser interrompidas por cancel(token)"""
+        anterior = getattr(self._local, 'cancelamento', None)
+        self._local.cancelamento = token
+        try:
+            yield
+        finally:
+            self._local.cancelamento = anterior
+            with self._cancelamento_lock:
+                self._canceladas.discard(token)
+    
+    def cancel(self, token):
+        """Cancela no servidor os comandos em andamento de `token`; retorna quantos
+        
+        As conexões pedidas depois do cancelamento (ainda dentro do mesmo
+        `cancellable`) falham na hora com ConsultaCancelada.
+        """
+        with self._cancelamento_lock:
+            self._canceladas.add(token)
+            conexoes = list(self._em_execucao.get(token, ()))
+        for conn in conexoes:
+            try:
+                conn.cancel()
+            except psycopg2.Error:
+                pass
+        return len(conexoes)
+    
+    def _registrar_execucao(self, token, conn, ativa):
+        if token is None:
+            return
+        with self._cancelamento_lock:
+            if ativa:
+                if token in self._canceladas:
+                    raise ConsultaCancelada("consulta cancelada pelo usuário")
+                self._em_execucao.setdefault(token, set()).add(conn)
+            else:
+                conexoes = self._em_execucao.get(token, set())
+                conexoes.discard(conn)
+                if not conexoes:
+                    self._em_execucao.pop(token, None)
+    
+    def _interrupcao(self, token, profile):
+        """Exceção para um QueryCanceled: cancelamento pedido ou tempo limite"""
+        with self._cancelamento_lock:
+            if token is not None and token in self._canceladas:
+                return ConsultaCancelada("consulta cancelada pelo usuário")
+        perfil = self._perfil(profile)
+        if perfil is None:
+            return TempoLimiteExcedido("consulta interrompida pelo tempo limite (statement_timeout)")
+        limite = perfil['parametros']['statement_timeout']
+        return TempoLimiteExcedido(f"consulta passou do tempo limite de {limite} do perfil '{profile}'")
+    
+    def close(self):
+        """Fecha o pool de conexões (e os das réplicas)"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.fechar()
+                self._pool = None
+            for replica in self._replicas or ():
+                if replica['pool'] is not None:
+                    replica['pool'].fechar()
+                    replica['pool'] = None
+    
+    # Comandos que só leem; CTE com escrita e SELECT ... FOR UPDATE/SHARE ficam no primário
+    _LEITURA = re.compile(r'\s*(?:--[^\n]*\n\s*|/\*.*?\*/\s*)*(SELECT|WITH|VALUES|TABLE)\b',
+                          re.IGNORECASE | re.DOTALL)
+    _ESCRITA = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE|FOR\s+(NO\s+KEY\s+)?UPDATE|FOR\s+(KEY\s+)?SHARE|nextval|setval)\b',
+                          re.IGNORECASE)
+    # Strings e comentários, descartados antes de procurar chamadas de função
+    _LITERAIS = re.compile(r"'(?:[^']|'')*'|--[^\n]*|/\*.*?\*/", re.DOTALL)
+    # SELECT ... INTO cria uma tabela; fora de strings e comentários, INTO só aparece em escritas
+    _INTO = re.compile(r'\bINTO\b', re.IGNORECASE)
+    # `nome(`; depois de AS é a lista de colunas de um alias, não uma chamada
+    _CHAMADA = re.compile(r'(\bAS\s+)?\b([A-Za-z_][\w.]*)\s*\(', re.IGNORECASE)
+    # Funções do PostgreSQL que só leem, e palavras-chave e tipos seguidos de "("
+    _FUNCOES_LEITURA = frozenset("""
+        count sum avg min max array_agg string_agg json_agg jsonb_agg bool_and bool_or every
+        row_number rank dense_rank ntile lag lead first_value last_value percent_rank cume_dist
+        percentile_cont percentile_disc mode
+        coalesce nullif greatest least round trunc floor ceil ceiling abs mod power sqrt
+        concat concat_ws lower upper length substring substr replace trim btrim ltrim rtrim
+        left right split_part position format initcap
+        to_char to_date to_number to_timestamp date_trunc date_part extract age make_date now
+        cardinality unnest generate_series array_length array_position array_remove
+        daterange tsrange int4range numrange isempty lower_inc upper_inc
+        json_build_object jsonb_build_object row_to_json
+        select from where in any all some exists array filter over within as join lateral
+        values and or not on using when then else case cast row interval between distinct
+        union intersect except by limit offset having
+        numeric decimal varchar char character text int integer bigint smallint date
+        timestamp timestamptz time float real double boolean
+    """.split())
+    
+    @classmethod
+    def is_read_only(cls, sql):
+        """True se a consulta pode ir para uma réplica (na dúvida, primário)
+        
+        Vão para a réplica os SELECT/WITH/VALUES/TABLE sem escrita, sem INTO
+        (SELECT ... INTO nova_tabela), sem FOR UPDATE/SHARE e que só chamam
+        funções de _FUNCOES_LEITURA: qualquer outra
+        função (atualizar_resumos(), funções do próprio banco, de extensões ou
+        com schema) pode escrever e fica no primário. `replica=True` em
+        execute_query força a réplica para uma função que só lê.
+        """
+        if not cls._LEITURA.match(sql) or cls._ESCRITA.search(sql):
+            return False
+        texto = cls._LITERAIS.sub("''", sql)
+        if cls._INTO.search(texto):
+            return False
+        for chamada in cls._CHAMADA.finditer(texto):
+            if not chamada.group(1) and chamada.group(2).lower() not in cls._FUNCOES_LEITURA:
+                return False
+        return True
+    
+    def _lista_replicas(self):
+        """Réplicas de DB_REPLICAS ('host[:porta]' separados por vírgula), como dicionários"""
+        if self._replicas is None:
+            with self._replicas_lock:
+                if self._replicas is None:
+                    replicas = []
+                    for item in self.config['REPLICAS'].split(','):
+                        if not item.strip():
+                            continue
+                        host, _, port = item.strip().partition(':')
+                        replicas.append({
+                            'nome': item.strip(), 'host': host, 'port': port or self.config['PORT'],
+                            'pool': None, 'em_uso': 0, 'consultas': 0,
+                            'atraso': None, 'verificado_em': float('-inf'), 'verificando': False
+                        })
+                    self._replicas = replicas
+        return self._replicas
+    
+    def choose_replica(self):
+        """Réplica para a próxima leitura, ou None para ler do primário
+        
+        Só entram réplicas com atraso até DB_REPLICA_MAX_LAG segundos. Logo
+        depois de uma escrita deste processo as leituras ficam no primário pelo
+        mesmo prazo, para que o resultado já inclua o que acabou de ser gravado.
+        """
+        replicas = self._lista_replicas()
+        atraso_maximo = float(self.config['REPLICA_MAX_LAG'])
+        if not replicas or time.monotonic() - self._ultima_escrita < atraso_maximo:
+            return None
+        em_dia = [replica for replica in replicas if self._replica_em_dia(replica, atraso_maximo)]
+        if not em_dia:
+            return None
+        # Rodízio; em 'least_busy' ele só desempata entre as réplicas menos ocupadas
+        inicio = next(self._rodizio) % len(em_dia)
+        em_dia = em_dia[inicio:] + em_dia[:inicio]
+        if self.config['REPLICA_ROUTING'] == 'least_busy':
+            return min(em_dia, key=lambda replica: replica['em_uso'])
+        return em_dia[0]
+    
+    def _replica_em_dia(self, replica, atraso_maximo):
+        """True se o último atraso medido da réplica está dentro do limite
+        
+        A medição roda numa thread própria, no máximo a cada
+        DB_REPLICA_CHECK_INTERVAL s: a leitura usa o valor já conhecido e nunca
+        espera pela consulta do atraso. Até a primeira medição, a réplica fica
+        de fora e as leituras vão para o primário.
+        """
+        with self._replicas_lock:
+            verificar = (not replica['verificando'] and
+                         time.monotonic() - replica['verificado_em'] >= float(self.config['REPLICA_CHECK_INTERVAL']))
+            if verificar:
+                replica['verificando'] = True
+        if verificar:
+            threading.Thread(target=self._verificar_replica, args=(replica,),
+                             name=f"replica-{replica['nome']}", daemon=True).start()
+        return replica['atraso'] is not None and replica['atraso'] <= atraso_maximo
+    
+    def _verificar_replica(self, replica):
+        """Mede o atraso da réplica (None se fora do ar)"""
+        # Conexão própria: a verificação não espera vaga no pool de uma réplica ocupada
+        atraso = None
+        try:
+            conn = self.get_connection(replica)
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(SQL_ATRASO_REPLICA)
+                    atraso = float(cursor.fetchone()[0])
+            finally:
+                conn.close()
+        except (ConnectionError, psycopg2.Error):
+            pass
+        finally:
+            with self._replicas_lock:
+                replica['atraso'] = atraso
+                replica['verificado_em'] = time.monotonic()
+                replica['verificando'] = False
+    
+    def mark_replica_down(self, replica):
+        """Tira a réplica (que recusou a conexão) do rodízio até a próxima verificação"""
+        with self._replicas_lock:
+            replica['atraso'] = None
+            replica['verificado_em'] = time.monotonic()
+    
+    def track_replica_use(self, replica, delta):
+        """Conta a conexão emprestada (+1) ou devolvida (-1) na réplica; None é o primário"""
+        if replica is None:
+            return
+        with self._replicas_lock:
+            replica['em_uso'] += delta
+            if delta > 0:
+                replica['consultas'] += 1
+    
+    def replicas_status(self):
+        """Situação de cada réplica: nome, atraso (s, None se fora do ar ou não verificada), em_uso e consultas"""
+        replicas = self._lista_replicas()
+        with self._replicas_lock:
+            return [{chave: replica[chave] for chave in ('nome', 'atraso', 'em_uso', 'consultas')}
+                    for replica in replicas]
+    
+    def on_data_change(self, callback):
+        """Registra função chamada sempre que um script altera os dados"""
+        self._data_change_callbacks.append(callback)
+    
+    def notify_data_change(self):
+        """Avisa que os dados mudaram (cache, aquecimento e roteamento para réplicas)
+        
+        Chamado pelos métodos que escrevem (scripts, migrações, COPY, resumos) e
+        por quem escreve por fora deles, como reservar() e o gerador de dados.
+        """
+        self._ultima_escrita = time.monotonic()
+        for callback in self._data_change_callbacks:
+            callback()
+    
+    def on_query(self, callback):
+        """Registra função chamada com o QueryTiming de cada consulta concluída"""
+        self._query_hooks.append(callback)
+    
+    @contextmanager
+    def instrument(self, sql, label=None, params=None):
+        """Mede a consulta executada dentro do bloco e repassa aos hooks
+        
+        Blocos aninhados na mesma thread compartilham a medição externa, de
+        modo que o chamador pode somar fases próprias (ex.: montar o DataFrame).
+        """
+        atual = getattr(self._local, 'medicao', None)
+        if atual is not None:
+            if label and not atual.rotulo:
+                atual.rotulo = label
+            yield atual
+            return
+        
+        medicao = QueryTiming(sql, label, params)
+        self._local.medicao = medicao
+        inicio = time.perf_counter()
+        try:
+            yield medicao
+        except Exception as e:
+            medicao.erro = str(e)
+            raise
+        finally:
+            self._local.medicao = None
+            medicao.total_ms = (time.perf_counter() - inicio) * 1000
+            self.notify_query(medicao)
+    
+    def _fase(self, nome):
+        medicao = getattr(self._local, 'medicao', None)
+        return medicao.fase(nome) if medicao is not None else nullcontext()
+    
+    def notify_query(self, medicao):
+        """Repassa o QueryTiming aos hooks de on_query (usado também pelo modo assíncrono)"""
+        for callback in self._query_hooks:
+            try:
+                callback(medicao)
+            except Exception:
+                # Falha na instrumentação não pode derrubar a consulta
+                pass
+    
+    _MARCADOR = re.compile(r'%\((\w+)\)s|%%')
+    
+    def _preparar(self, conn, cursor, sql, params):
+        """Garante o PREPARE de `sql` nesta conexão e retorna (EXECUTE, valores)
+        
+        `sql` usa marcadores nomeados %(nome)s; cada texto distinto vira um
+        comando preparado no servidor, reaproveitado enquanto a conexão viver.
+        """
+        with self._preparados_lock:
+            estado = self._preparados.get(conn)
+            desatualizado = estado is not None and estado['geracao'] != self._geracao_preparados
+            if estado is None or desatualizado:
+                estado = {'geracao': self._geracao_preparados, 'comandos': {}}
+                self._preparados[conn] = estado
+            comando = estado['comandos'].get(sql)
+        
+        if desatualizado:
+            # Schema recriado ou transação desfeita: recomeça do zero nesta conexão
+            cursor.execute("DEALLOCATE ALL")
+        
+        if comando is None:
+            nomes = []
+            def trocar(marcador):
+                if marcador.group(0) == '%%':
+                    return '%'
+                if marcador.group(1) not in nomes:
+                    nomes.append(marcador.group(1))
+                return f"${nomes.index(marcador.group(1)) + 1}"
+            corpo = self._MARCADOR.sub(trocar, sql.strip().rstrip(';'))
+            nome = f"ldi_{next(self._nomes_preparados)}"
+            cursor.execute(f"PREPARE {nome} AS\n{corpo}\n")
+            comando = (nome, nomes)
+            with self._preparados_lock:
+                estado['comandos'][sql] = comando
+        
+        nome, nomes = comando
+        if not nomes:
+            return f"EXECUTE {nome}", None
+        return f"EXECUTE {nome} ({', '.join(['%s'] * len(nomes))})", [params[n] for n in nomes]
+    
+    def _invalidar_preparados(self, conn):
+        """Após erro não se sabe quais PREPARE sobreviveram: força DEALLOCATE ALL no próximo uso"""
+        with self._preparados_lock:
+            estado = self._preparados.get(conn)
+            if estado is not None:
+                estado['geracao'] = None
+    
+    def _executar(self, conn, cursor, sql, params=None, prepared=False):
+        """Executa direto ou, se `prepared`, via comando preparado da conexão"""
+        if prepared:
+            sql, params = self._preparar(conn, cursor, sql, params or {})
+        cursor.execute(sql, params)
+    
+    def execute_query(self, sql, params=None, prepared=False, replica=None, profile=None):
+        """Executa consulta SQL e retorna resultados
+        
+        Com `prepared`, a consulta (marcadores %(nome)s, `params` como dict)
+        roda como comando preparado: chamadas repetidas na mesma conexão não
+        refazem parse nem planejamento.
+        SELECTs vão para uma réplica de leitura, se houver; `replica=False`
+        força o primário (e `True`, a réplica, para consultas não reconhecidas).
+        `profile` escolhe o perfil de execução (PERFIS_EXECUCAO).
+        """
+        if replica is None:
+            replica = self.is_read_only(sql)
+        with self.instrument(sql, params=params) as medicao:
+            with self.connection(replica, profile) as conn:
+                with conn.cursor() as cursor:
+                    medicao.executada(sql, params)
+                    with medicao.fase('executar'):
+                        self._executar(conn, cursor, sql, params, prepared)
+                    with medicao.fase('buscar'):
+                        results = cursor.fetchall()
+                    medicao.registrar_linhas(results)
+                    columns = [desc[0] for desc in cursor.description] if cursor.description else []
+                    return results, columns
+    
+    @staticmethod
+    def as_subquery(sql):
+        """Prepara a consulta para ser usada dentro de outro SELECT"""
+        # Quebras de linha protegem contra comentários '--' na última linha
+        return "(\n" + sql.strip().rstrip(';').strip() + "\n)"
+    
+    def describe_query(self, sql, params=None):
+        """Colunas da consulta como pares (nome, OID do tipo), sem buscar linhas"""
+        with self.connection(self.is_read_only(sql)) as conn:
             with conn.cursor() as cursor:
-                cursor.execute(sql)
-                results = cursor.fetchall()
+                cursor.execute(f"SELECT * FROM {self.as_subquery(sql)} AS consulta LIMIT 0", params)
+                return [(desc[0], desc[1]) for desc in cursor.description]
+    
+    @staticmethod
+    def _categorias_enum(cursor, tipos):
+        """Rótulos de cada tipo ENUM das colunas (na ordem declarada), para virar dtype category"""
+        oids = {oid for _, oid in tipos
+                if oid not in _DTYPES_PANDAS and oid not in _TIPOS_DATA and oid not in _TIPOS_TEXTO}
+        if not oids:
+            return {}
+        cursor.execute("""
+            SELECT enumtypid, array_agg(enumlabel::text ORDER BY enumsortorder)
+            FROM pg_enum WHERE enumtypid = ANY(%s) GROUP BY enumtypid
+        """, (list(oids),))
+        return dict(cursor.fetchall())
+    
+    @staticmethod
+    def _dtypes(tipos, enums):
+        """dtype do pandas de cada coluna (pares nome, OID); datas ficam para _tipar"""
+        import pandas as pd
+        return {
+            nome: pd.CategoricalDtype(enums[oid]) if oid in enums else _DTYPES_PANDAS.get(oid, object)
+            for nome, oid in tipos
+        }
+    
+    @classmethod
+    def _tipar(cls, df, tipos, enums):
+        """Aplica os dtypes das colunas ao DataFrame, vindo do COPY ou de linhas
+        
+        As colunas DATE ficam listadas em df.attrs['datas'], para a exibição
+        mostrar só a data.
+        """
+        import pandas as pd
+        df.attrs['datas'] = [nome for nome, oid in tipos if oid == _OID_DATE]
+        for (nome, oid), dtype in zip(tipos, cls._dtypes(tipos, enums).values()):
+            if oid in _TIPOS_DATA:
+                # 'infinity' e datas fora do alcance do datetime64 viram NaT; a mesma
+                # resolução (µs) venha a data de texto ou de objetos date/datetime
+                utc = _TIPOS_DATA[oid]
+                df[nome] = pd.to_datetime(df[nome], errors='coerce', utc=utc).astype(
+                    'datetime64[us, UTC]' if utc else 'datetime64[us]'
+                )
+            elif df[nome].dtype != dtype:
+                df[nome] = df[nome].astype(dtype)
+        return df
+    
+    @classmethod
+    def _dataframe_de_linhas(cls, linhas, tipos, enums):
+        """Linhas já buscadas -> DataFrame com os mesmos dtypes do COPY"""
+        import pandas as pd
+        df = pd.DataFrame.from_records(linhas, columns=[nome for nome, _ in tipos], coerce_float=True)
+        return cls._tipar(df, tipos, enums)
+    
+    def fetch_dataframe(self, sql, params=None, profile=None, prepared=False):
+        """Executa a consulta e monta o DataFrame com os dtypes das colunas
+        
+        Por padrão o resultado vem via COPY TO STDOUT em CSV e é lido pelo
+        parser em C do pandas, sem criar uma tupla Python por linha. Com
+        `prepared` (consultas com parâmetros %(nome)s), a consulta roda como
+        comando preparado da conexão e as linhas recebem os mesmos dtypes.
+        Dtypes: inteiros anuláveis, NUMERIC como float64, DATE e TIMESTAMP como
+        datetime64 e ENUMs (ex.: enum_forma_pagamento) como category; fetch_page
+        e as páginas do Streamlit usam a mesma conversão.
+        """
+        import pandas as pd
+        
+        with self.instrument(sql, params=params) as medicao:
+            with self.connection(self.is_read_only(sql), profile) as conn:
+                codificacao = psycopg2.extensions.encodings.get(conn.encoding, 'utf-8')
+                with conn.cursor() as cursor:
+                    if prepared:
+                        medicao.executada(sql, params)
+                        with medicao.fase('executar'):
+                            self._executar(conn, cursor, sql, params, prepared)
+                        with medicao.fase('buscar'):
+                            linhas = cursor.fetchall()
+                            tipos = [(desc[0], desc[1]) for desc in cursor.description]
+                            enums = self._categorias_enum(cursor, tipos)
+                        medicao.registrar_linhas(linhas)
+                    else:
+                        # COPY não aceita parâmetros: os valores entram já escapados pelo psycopg2
+                        consulta = cursor.mogrify(sql.strip().rstrip(';'), params).decode(codificacao)
+                        medicao.executada(consulta)
+                        buffer = io.BytesIO()
+                        with medicao.fase('executar'):
+                            cursor.execute("SET LOCAL DateStyle = 'ISO'")
+                            cursor.execute(f"SELECT * FROM {self.as_subquery(consulta)} AS consulta LIMIT 0")
+                            tipos = [(desc[0], desc[1]) for desc in cursor.description]
+                            enums = self._categorias_enum(cursor, tipos)
+                        with medicao.fase('buscar'):
+                            cursor.copy_expert(
+                                f"COPY {self.as_subquery(consulta)} TO STDOUT WITH (FORMAT csv, NULL '\\N')", buffer
+                            )
+                        medicao.bytes += buffer.tell()
+            
+            with medicao.fase('dataframe'):
+                if prepared:
+                    return self._dataframe_de_linhas(linhas, tipos, enums)
+                dtypes = self._dtypes(tipos, enums)
+                if buffer.tell() == 0:
+                    # read_csv não aceita entrada vazia
+                    df = pd.DataFrame({nome: pd.Series(dtype=dtype) for nome, dtype in dtypes.items()})
+                else:
+                    buffer.seek(0)
+                    df = pd.read_csv(
+                        buffer, header=None, names=list(dtypes), dtype=dtypes,
+                        na_values=['\\N'], keep_default_na=False, true_values=['t'], false_values=['f'],
+                        encoding=codificacao
+                    )
+                df = self._tipar(df, tipos, enums)
+            medicao.linhas += len(df)
+            return df
+    
+    def stream_query(self, sql, params=None, itersize=None, timeout_ms=None, profile=None):
+        """Executa consulta com cursor no servidor e gera (colunas, lote) sem carregar tudo
+        
+        `timeout_ms` é o orçamento do stream inteiro, contado a partir da
+        chamada: todos os FETCH e o tempo do consumidor entre os lotes. Ao fim
+        do prazo o comando em andamento é cancelado no servidor e nenhum lote
+        novo é buscado (TempoLimiteExcedido). `profile` como em connection().
+        """
+        itersize = itersize or int(self.config['STREAM_ITERSIZE'])
+        prazo = None if timeout_ms is None else time.monotonic() + max(1, int(timeout_ms)) / 1000
+        # Gerador: a medição não entra no contexto da thread, pois o consumidor
+        # pode executar outras consultas entre um lote e outro
+        medicao = QueryTiming(sql, params=params)
+        inicio = time.perf_counter()
+        try:
+            with self.connection(self.is_read_only(sql), profile) as conn:
+                medicao.fases['conectar'] = (time.perf_counter() - inicio) * 1000
+                relogio = None
+                if prazo is not None:
+                    # statement_timeout vale por comando (cada FETCH recomeça a contagem);
+                    # o relógio cancela o que estiver rodando quando o orçamento acabar
+                    with conn.cursor() as cursor:
+                        cursor.execute("SET LOCAL statement_timeout = %s", (max(1, int(timeout_ms)),))
+                    relogio = _Prazo(prazo, conn)
+                try:
+                    with conn.cursor(name=f"stream_{uuid.uuid4().hex}") as cursor:
+                        cursor.itersize = itersize
+                        with medicao.fase('executar'):
+                            cursor.execute(sql, params)
+                        while True:
+                            if relogio is not None and relogio.esgotado():
+                                raise TempoLimiteExcedido(
+                                    f"stream passou do tempo limite de {int(timeout_ms)}ms"
+                                )
+                            with medicao.fase('buscar'):
+                                lote = cursor.fetchmany(itersize)
+                            if not lote:
+                                break
+                            medicao.registrar_linhas(lote)
+                            yield [desc[0] for desc in cursor.description], lote
+                except psycopg2.errors.QueryCanceled as e:
+                    # Cancelado pelo relógio: o erro é o prazo do stream, não o do perfil
+                    if relogio is not None and relogio.disparado:
+                        raise TempoLimiteExcedido(
+                            f"stream passou do tempo limite de {int(timeout_ms)}ms"
+                        ) from e
+                    raise
+                finally:
+                    # Antes de devolver a conexão ao pool: o relógio não pode cancelar outra consulta
+                    if relogio is not None:
+                        relogio.parar()
+        except Exception as e:
+            medicao.erro = str(e)
+            raise
+        finally:
+            medicao.total_ms = (time.perf_counter() - inicio) * 1000
+            self.notify_query(medicao)
+    
+    def preview_query(self, sql, limit=10, params=None, profile=None):
+        """Retorna as primeiras `limit` linhas, as colunas e o total de registros
+        
+        `profile` escolhe o perfil de execução (PERFIS_EXECUCAO) das duas leituras.
+        """
+        with self.instrument(sql, params=params) as medicao, \
+                self.connection(self.is_read_only(sql), profile) as conn:
+            medicao.executada(sql, params)
+            with conn.cursor(name=f"preview_{uuid.uuid4().hex}") as cursor:
+                with medicao.fase('executar'):
+                    cursor.execute(sql, params)
+                with medicao.fase('buscar'):
+                    results = cursor.fetchmany(limit)
+                medicao.registrar_linhas(results)
                 columns = [desc[0] for desc in cursor.description] if cursor.description else []
-                return results, columns
+            
+            if len(results) < limit:
+                return results, columns, len(results)
+            
+            # O total é contado no servidor, sem transferir as demais linhas
+            with conn.cursor() as cursor, medicao.fase('contar'):
+                cursor.execute(f"SELECT COUNT(*) FROM {self.as_subquery(sql)} AS consulta", params)
+                total = cursor.fetchone()[0]
+            return results, columns, total
     
-    def execute_script(self, script_path):
-        """Executa script SQL completo"""
-        # Busca arquivo SQL em diferentes locais
+    # Palavras-chave que delimitam as cláusulas de um SELECT
+    _CLAUSULAS = re.compile(
+        r'(SELECT|FROM|WHERE|GROUP\s+BY|HAVING|WINDOW|ORDER\s+BY|LIMIT|OFFSET|FETCH|FOR|UNION|INTERSECT|EXCEPT)\b',
+        re.IGNORECASE
+    )
+    
+    @classmethod
+    def _clausulas(cls, texto):
+        """Cláusulas do nível externo da consulta: [(PALAVRA, início, fim da palavra)]
+        
+        Ignora o que está entre parênteses (subconsultas, CTEs, funções), em
+        strings, em identificadores entre aspas e em comentários -- e /* */.
+        """
+        clausulas, nivel, i = [], 0, 0
+        while i < len(texto):
+            caractere = texto[i]
+            if caractere in ("'", '"'):
+                # '' e "" dentro do texto viram dois trechos seguidos, o que dá no mesmo
+                fim = texto.find(caractere, i + 1)
+                i = len(texto) if fim == -1 else fim + 1
+                continue
+            if texto.startswith('--', i):
+                fim = texto.find('\n', i)
+                i = len(texto) if fim == -1 else fim + 1
+                continue
+            if texto.startswith('/*', i):
+                fim = texto.find('*/', i + 2)
+                i = len(texto) if fim == -1 else fim + 2
+                continue
+            if caractere == '(':
+                nivel += 1
+            elif caractere == ')':
+                nivel -= 1
+            elif nivel == 0 and (i == 0 or not (texto[i - 1].isalnum() or texto[i - 1] in '_.$')):
+                palavra = cls._CLAUSULAS.match(texto, i)
+                if palavra:
+                    clausulas.append((' '.join(palavra.group(1).upper().split()), i, palavra.end()))
+                    i = palavra.end()
+                    continue
+            i += 1
+        return clausulas
+    
+    @classmethod
+    def _strip_order_by(cls, sql):
+        """Remove o ORDER BY do nível externo da consulta (se não houver LIMIT depois)"""
+        texto = sql.strip().rstrip(';').strip()
+        clausulas = cls._clausulas(texto)
+        ordens = [inicio for nome, inicio, _ in clausulas if nome == 'ORDER BY']
+        if not ordens:
+            return texto
+        if any(nome in ('LIMIT', 'OFFSET', 'FETCH') and inicio > ordens[-1] for nome, inicio, _ in clausulas):
+            return texto
+        return texto[:ordens[-1]].rstrip()
+    
+    @staticmethod
+    def _keyset_filter(keys, after):
+        """Monta o filtro 'depois da última linha' para as chaves de ordenação"""
+        operadores = ['<' if direcao.upper() == 'DESC' else '>' for _, direcao in keys]
+        expressoes = [expr for expr, _ in keys]
+        marcadores = [f"%(_apos_{i})s" for i in range(len(keys))]
+        valores = {f"_apos_{i}": valor for i, valor in enumerate(after)}
+        
+        if len(set(operadores)) == 1:
+            # Mesma direção em todas as chaves: comparação de linha, que usa índice
+            return f"({', '.join(expressoes)}) {operadores[0]} ({', '.join(marcadores)})", valores
+        
+        # Direções mistas: (k1 op v1) OR (k1 = v1 AND k2 op v2) OR ...
+        termos = []
+        for i, expr in enumerate(expressoes):
+            partes = [f"{expressoes[j]} = {marcadores[j]}" for j in range(i)] + [f"{expr} {operadores[i]} {marcadores[i]}"]
+            termos.append("(" + " AND ".join(partes) + ")")
+        return "(" + " OR ".join(termos) + ")", valores
+    
+    @classmethod
+    def _consulta_pagina(cls, sql, keys, filtro=None):
+        """SELECT de uma página: chaves no fim das colunas, filtro `filtro` e ORDER BY das chaves
+        
+        Num SELECT simples, as chaves são expressões sobre as tabelas da própria
+        consulta: as colunas _chave_i entram na lista do SELECT, o filtro vai
+        para o WHERE e o ORDER BY é trocado pelo das chaves, de modo que um
+        índice sobre elas entrega a página sem ordenar o resultado inteiro.
+        Com GROUP BY, as chaves devem ser colunas do agrupamento. Consultas
+        com UNION/INTERSECT/EXCEPT (ou LIMIT, FOR UPDATE próprios) viram
+        subconsulta e as chaves se referem às colunas do resultado.
+        """
+        texto = cls._strip_order_by(sql)
+        clausulas = cls._clausulas(texto)
+        nomes = [nome for nome, _, _ in clausulas]
+        extras = ", ".join(f"{expr} AS _chave_{i}" for i, (expr, _) in enumerate(keys))
+        ordem = ", ".join(f"{expr} {direcao}" for expr, direcao in keys)
+        
+        direta = (nomes.count('SELECT') == 1 and nomes.count('FROM') == 1 and not
+                  {'UNION', 'INTERSECT', 'EXCEPT', 'ORDER BY', 'LIMIT', 'OFFSET', 'FETCH', 'FOR'} & set(nomes))
+        if not direta:
+            consulta = f"SELECT pagina.*, {extras} FROM {cls.as_subquery(texto)} AS pagina"
+            if filtro:
+                consulta += f"\nWHERE {filtro}"
+            return consulta + "\nORDER BY " + ", ".join(
+                f"_chave_{i} {direcao}" for i, (_, direcao) in enumerate(keys)
+            )
+        
+        # Do fim para o início, para as posições continuarem válidas
+        posicoes = {nome: (inicio, fim) for nome, inicio, fim in clausulas}
+        if filtro:
+            if 'WHERE' in posicoes:
+                inicio_where, fim_where = posicoes['WHERE']
+                seguintes = [inicio for _, inicio, _ in clausulas if inicio > inicio_where]
+                fim_corpo = min(seguintes) if seguintes else len(texto)
+                corpo = texto[fim_where:fim_corpo].strip()
+                texto = f"{texto[:fim_where]} {filtro}\n  AND (\n{corpo}\n)\n{texto[fim_corpo:]}"
+            else:
+                seguintes = [inicio for _, inicio, _ in clausulas if inicio > posicoes['FROM'][0]]
+                fim_from = min(seguintes) if seguintes else len(texto)
+                texto = f"{texto[:fim_from]}\nWHERE {filtro}\n{texto[fim_from:]}"
+        inicio_from = posicoes['FROM'][0]
+        texto = f"{texto[:inicio_from]}\n    , {extras}\n{texto[inicio_from:]}"
+        return texto.rstrip() + "\nORDER BY " + ordem
+    
+    def fetch_page(self, sql, keys, after=None, limit=50, params=None, prepared=False, profile=None,
+                   dataframe=False):
+        """Busca uma página da consulta por keyset pagination
+        
+        `keys` é uma lista de (expressão, 'ASC'|'DESC'); juntas devem
+        identificar cada linha (a última costuma ser a chave primária) e não
+        podem ser nulas. Num SELECT simples são expressões sobre as tabelas da
+        consulta, de preferência as colunas de um índice (ver _consulta_pagina).
+        `params` (dict) preenche marcadores %(nome)s da consulta; com `prepared`
+        a página roda como comando preparado da conexão.
+        Retorna (linhas, colunas, chave da próxima página ou None); com
+        `dataframe`, as linhas vêm num DataFrame com os dtypes de fetch_dataframe.
+        """
+        if params is None:
+            # Os valores da página usam marcadores: '%' literal precisa de escape
+            sql = sql.replace('%', '%%')
+        valores = dict(params or {})
+        filtro = None
+        if after is not None:
+            filtro, valores_filtro = self._keyset_filter(keys, after)
+            valores.update(valores_filtro)
+        # Uma linha a mais indica se existe próxima página
+        consulta = self._consulta_pagina(sql, keys, filtro) + "\nLIMIT %(_limite)s"
+        valores['_limite'] = limit + 1
+        
+        with self.instrument(sql, params=params) as medicao, \
+                self.connection(self.is_read_only(sql), profile) as conn:
+            medicao.executada(consulta, valores)
+            with conn.cursor() as cursor:
+                with medicao.fase('executar'):
+                    self._executar(conn, cursor, consulta, valores, prepared)
+                with medicao.fase('buscar'):
+                    linhas = cursor.fetchall()
+                medicao.registrar_linhas(linhas[:limit])
+                tipos = [(desc[0], desc[1]) for desc in cursor.description][:-len(keys)]
+                enums = self._categorias_enum(cursor, tipos) if dataframe else {}
+        
+        proxima = tuple(linhas[limit - 1][-len(keys):]) if len(linhas) > limit else None
+        results = [linha[:-len(keys)] for linha in linhas[:limit]]
+        if dataframe:
+            results = self._dataframe_de_linhas(results, tipos, enums)
+        return results, [nome for nome, _ in tipos], proxima
+    
+    def estimate_count(self, sql, params=None):
+        """Estimativa do total de linhas feita pelo planejador, sem executar a consulta"""
+        with self.connection(self.is_read_only(sql)) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("EXPLAIN (FORMAT JSON) " + sql.strip().rstrip(';'), params)
+                plano = cursor.fetchone()[0]
+        if isinstance(plano, str):
+            plano = json.loads(plano)
+        return int(plano[0]['Plan']['Plan Rows'])
+    
+    def refresh_analytics(self, full=False):
+        """Atualiza as tabelas de resumo (só as chaves pendentes, ou todas se `full`)"""
+        funcao = "reconstruir_resumos" if full else "atualizar_resumos"
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT {funcao}()")
+                atualizadas = cursor.fetchone()[0]
+        if atualizadas:
+            self.notify_data_change()
+        return atualizadas
+    
+    @staticmethod
+    def _drop_secondary_indexes(cursor, table):
+        """Remove os índices que não sustentam restrições e retorna como recriá-los"""
+        cursor.execute("""
+            SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+            FROM pg_index i
+            LEFT JOIN pg_constraint c ON c.conindid = i.indexrelid
+            WHERE i.indrelid = %s::regclass AND c.oid IS NULL
+        """, (table,))
+        indices = cursor.fetchall()
+        for nome, _ in indices:
+            cursor.execute(f"DROP INDEX {nome}")
+        return [definicao for _, definicao in indices]
+    
+    @staticmethod
+    def _drop_foreign_keys(cursor, table):
+        """Remove as chaves estrangeiras da tabela e retorna (nome, definição)"""
+        cursor.execute("""
+            SELECT quote_ident(conname), pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'f'
+        """, (table,))
+        chaves = cursor.fetchall()
+        for nome, _ in chaves:
+            cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {nome}")
+        return chaves
+    
+    def bulk_load_many(self, loads, truncate=False, defer_indexes=True,
+                       defer_constraints=True, disable_triggers=False, chunk_size=None):
+        """Carrega várias tabelas via COPY FROM STDIN numa única transação
+        
+        `loads` é uma lista de (tabela, origem, colunas); a origem é o caminho
+        de um CSV ou um iterável de linhas. Índices secundários e chaves
+        estrangeiras são recriados só depois da carga (as FKs são validadas
+        numa única varredura). Retorna estatísticas de linhas/s por tabela.
+        """
+        chunk_size = chunk_size or int(self.config['COPY_CHUNK_SIZE'])
+        tabelas = list(dict.fromkeys(tabela for tabela, _, _ in loads))
+        estatisticas = []
+        
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                if truncate:
+                    cursor.execute(f"TRUNCATE {', '.join(tabelas)} RESTART IDENTITY")
+                if disable_triggers:
+                    for tabela in tabelas:
+                        cursor.execute(f"ALTER TABLE {tabela} DISABLE TRIGGER USER")
+                indices, chaves = [], []
+                for tabela in tabelas:
+                    if defer_constraints:
+                        chaves += [(tabela, nome, definicao)
+                                   for nome, definicao in self._drop_foreign_keys(cursor, tabela)]
+                    if defer_indexes:
+                        indices += self._drop_secondary_indexes(cursor, tabela)
+                
+                for tabela, origem, colunas in loads:
+                    lista = f" ({', '.join(colunas)})" if colunas else ""
+                    inicio = time.perf_counter()
+                    if isinstance(origem, (str, Path)):
+                        with open(origem, 'r', encoding='utf-8') as arquivo:
+                            cursor.copy_expert(
+                                f"COPY {tabela}{lista} FROM STDIN WITH (FORMAT csv)", arquivo, size=chunk_size
+                            )
+                        linhas = cursor.rowcount
+                    else:
+                        fluxo = _RowStream(origem)
+                        cursor.copy_expert(f"COPY {tabela}{lista} FROM STDIN", fluxo, size=chunk_size)
+                        linhas = fluxo.rows
+                    segundos = time.perf_counter() - inicio
+                    estatisticas.append({
+                        'tabela': tabela,
+                        'linhas': linhas,
+                        'segundos': segundos,
+                        'linhas_por_segundo': linhas / segundos if segundos > 0 else 0.0
+                    })
+                
+                inicio = time.perf_counter()
+                for definicao in indices:
+                    cursor.execute(definicao)
+                for tabela, nome, definicao in chaves:
+                    cursor.execute(f"ALTER TABLE {tabela} ADD CONSTRAINT {nome} {definicao} NOT VALID")
+                    cursor.execute(f"ALTER TABLE {tabela} VALIDATE CONSTRAINT {nome}")
+                if disable_triggers:
+                    for tabela in tabelas:
+                        cursor.execute(f"ALTER TABLE {tabela} ENABLE TRIGGER USER")
+                if indices or chaves:
+                    estatisticas.append({
+                        'tabela': '(índices e FKs)',
+                        'linhas': 0,
+                        'segundos': time.perf_counter() - inicio,
+                        'linhas_por_segundo': 0.0
+                    })
+        
+        self.notify_data_change()
+        return estatisticas
+    
+    def bulk_load(self, table, source, columns=None, **options):
+        """Carrega uma tabela via COPY (ver bulk_load_many)"""
+        return self.bulk_load_many([(table, source, columns)], **options)[0]
+    
+    @staticmethod
+    def _ler_script(script_path):
+        """Conteúdo do script SQL, buscado em diferentes locais"""
         for path in [script_path, f"../{script_path}", Path(__file__).parent.parent / script_path]:
             if os.path.exists(path):
                 with open(path, 'r', encoding='utf-8') as file:
-                    sql_content = file.read()
-                break
-        else:
-            raise FileNotFoundError(f"Script SQL não encontrado: {script_path}")
+                    return file.read()
+        raise FileNotFoundError(f"Script SQL não encontrado: {script_path}")
+    
+    def _schema_alterado(self):
+        # Tabelas recriadas: comandos preparados nas conexões do pool são refeitos
+        with self._preparados_lock:
+            self._geracao_preparados += 1
+        self.notify_data_change()
+    
+    def execute_script(self, script_path):
+        """Executa script SQL completo"""
+        sql_content = self._ler_script(script_path)
         
-        with self.get_connection() as conn:
+        with self.connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(sql_content)
-                conn.commit()
+        
+        self._schema_alterado()
+    
+    _MARCA_MIGRACAO = re.compile(r'--\s*@migracao\s*:\s*(\S+)\s*$')
+    
+    @classmethod
+    def _passos_migracao(cls, texto):
+        """Divide o script nos passos marcados com '-- @migracao: nome'
+        
+        Retorna [(nome, sql)]. Texto antes do primeiro marcador e depois de
+        'consultas' (consultas de demonstração) não entra em nenhum passo.
+        """
+        passos, nome, linhas = [], None, []
+        for linha in texto.splitlines():
+            marca = cls._MARCA_MIGRACAO.match(linha.strip())
+            if marca:
+                if nome not in (None, 'consultas'):
+                    passos.append((nome, "\n".join(linhas).strip()))
+                nome, linhas = marca.group(1), []
+            else:
+                linhas.append(linha)
+        if nome not in (None, 'consultas'):
+            passos.append((nome, "\n".join(linhas).strip()))
+        return passos
+    
+    @staticmethod
+    def _checksum(sql):
+        """sha256 do passo, ignorando comentários de linha inteira e linhas em branco"""
+        linhas = [linha.rstrip() for linha in sql.splitlines()
+                  if linha.strip() and not linha.strip().startswith('--')]
+        return hashlib.sha256("\n".join(linhas).encode('utf-8')).hexdigest()
+    
+    _CRIA_TABELA = re.compile(r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\(', re.IGNORECASE)
+    _CRIA_TIPO = re.compile(r'CREATE\s+TYPE\s+(\w+)', re.IGNORECASE)
+    _CRIA_INDICE = re.compile(r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)', re.IGNORECASE)
+    _RESTRICOES = {'PRIMARY', 'FOREIGN', 'CONSTRAINT', 'UNIQUE', 'CHECK', 'EXCLUDE'}
+    
+    @classmethod
+    def _objetos_passo(cls, sql):
+        """Objetos criados pelo passo: [('tabela'|'coluna'|'tipo'|'índice', nome)]
+        
+        Tabelas (com as colunas) e tipos; índices só contam num passo que não
+        cria tabela nem tipo. Passo só de dados retorna [].
+        """
+        texto = cls._LITERAIS.sub(lambda trecho: "''" if trecho.group().startswith("'") else " ", sql)
+        objetos = [('tipo', nome.lower()) for nome in cls._CRIA_TIPO.findall(texto)]
+        for criacao in cls._CRIA_TABELA.finditer(texto):
+            tabela = criacao.group(1).lower()
+            objetos.append(('tabela', tabela))
+            # Itens do nível externo de CREATE TABLE (...): colunas e restrições
+            nivel, inicio = 1, criacao.end()
+            for i in range(criacao.end(), len(texto)):
+                if texto[i] == '(':
+                    nivel += 1
+                elif texto[i] in ',)' and nivel == 1:
+                    palavras = texto[inicio:i].split()
+                    if palavras and palavras[0].upper() not in cls._RESTRICOES:
+                        objetos.append(('coluna', f"{tabela}.{palavras[0].lower()}"))
+                    inicio = i + 1
+                if texto[i] == ')':
+                    nivel -= 1
+                    if nivel == 0:
+                        break
+        if not objetos:
+            objetos = [('índice', nome.lower()) for nome in cls._CRIA_INDICE.findall(texto)]
+        return objetos
+    
+    @staticmethod
+    def _schema_existente(cursor):
+        """Tabelas, colunas, tipos e índices do schema atual, no formato de _objetos_passo"""
+        cursor.execute("""
+            SELECT 'coluna', table_name || '.' || column_name FROM information_schema.columns
+            WHERE table_schema = current_schema()
+            UNION ALL
+            SELECT 'tabela', table_name FROM information_schema.tables WHERE table_schema = current_schema()
+            UNION ALL
+            SELECT 'tipo', t.typname FROM pg_type t JOIN pg_namespace n ON n.oid = t.typnamespace
+            WHERE n.nspname = current_schema()
+            UNION ALL
+            SELECT 'índice', indexname FROM pg_indexes WHERE schemaname = current_schema()
+        """)
+        return {(tipo, nome) for tipo, nome in cursor.fetchall()}
+    
+    def _adotar(self, cursor, passos):
+        """Registra sem executar os passos cujo schema já existe; retorna {nome: checksum}
+        
+        Para bancos criados antes das migrações (execute_script): um passo é
+        adotado se todos os seus objetos existem, e um passo só de dados segue o
+        anterior. A adoção para no primeiro passo sem nenhum objeto no banco
+        (ele e os seguintes são aplicados normalmente); um passo que existe só
+        em parte levanta MigracaoInvalida com o que falta.
+        """
+        existentes = self._schema_existente(cursor)
+        adotados = {}
+        for indice, (nome, script, sql) in enumerate(passos):
+            objetos = self._objetos_passo(sql)
+            if not objetos:
+                # Os adotados são sempre os primeiros passos: o anterior foi adotado?
+                adotar = 0 < indice == len(adotados)
+            else:
+                faltando = [f"{tipo} {objeto}" for tipo, objeto in objetos if (tipo, objeto) not in existentes]
+                if faltando and len(faltando) < len(objetos):
+                    raise MigracaoInvalida(
+                        f"Não é possível adotar o banco: o passo {nome} de {script} existe só em parte "
+                        f"(falta {', '.join(faltando[:10])}{'...' if len(faltando) > 10 else ''})"
+                    )
+                adotar = not faltando
+            if not adotar:
+                break
+            adotados[nome] = self._checksum(sql)
+            cursor.execute(
+                "INSERT INTO schema_migracao (versao, script, checksum, segundos) VALUES (%s, %s, %s, 0)",
+                (nome, script, adotados[nome])
+            )
+        return adotados
+    
+    def migrate(self, scripts=SCRIPTS_MIGRACAO, reset=False, adopt=False):
+        """Aplica os passos de migração que ainda não constam em schema_migracao
+        
+        Cada passo aplicado é registrado com o checksum e pulado nas próximas
+        execuções, então reiniciar o app não recria nem recarrega nada. Com
+        `reset`, os blocos 'reset' dos scripts apagam tudo antes (os dados são
+        perdidos). Com `adopt`, um banco criado antes das migrações (tabelas sem
+        schema_migracao) tem o schema conferido e os passos já presentes
+        registrados sem executar (ver _adotar); os dados ficam. Tudo roda numa
+        transação. Retorna os nomes dos passos aplicados (os adotados como
+        'nome (adotado)').
+        """
+        limpezas, passos = [], []
+        for script in scripts:
+            for nome, sql in self._passos_migracao(self._ler_script(script)):
+                if nome == 'reset':
+                    limpezas.append(sql)
+                else:
+                    passos.append((nome, script, sql))
+        nomes = [nome for nome, _, _ in passos]
+        if len(nomes) != len(set(nomes)):
+            raise MigracaoInvalida(f"Passo de migração repetido em {', '.join(scripts)}")
+        
+        aplicados = []
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                # Um processo por vez (ex.: Streamlit e terminal iniciando juntos)
+                cursor.execute("SELECT pg_advisory_xact_lock(hashtext('ldi_migracao'))")
+                if reset:
+                    # Scripts posteriores dependem dos anteriores: limpa de trás para frente
+                    for sql in reversed(limpezas):
+                        cursor.execute(sql)
+                    cursor.execute("DROP TABLE IF EXISTS schema_migracao")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_migracao (
+                        versao VARCHAR(100) PRIMARY KEY,
+                        script VARCHAR(255) NOT NULL,
+                        checksum CHAR(64) NOT NULL,
+                        segundos NUMERIC(10,3) NOT NULL,
+                        aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                cursor.execute("SELECT versao, checksum FROM schema_migracao")
+                registrados = dict(cursor.fetchall())
+                
+                if not registrados:
+                    cursor.execute("SELECT to_regclass('reserva') IS NOT NULL")
+                    if cursor.fetchone()[0]:
+                        if not adopt:
+                            raise MigracaoInvalida(
+                                "Banco criado sem controle de versão; adote-o com --adotar (mantém os dados) "
+                                "ou recrie-o com --recriar (apaga os dados)"
+                            )
+                        adotados = self._adotar(cursor, passos)
+                        registrados.update(adotados)
+                        aplicados.extend(f"{nome} (adotado)" for nome in adotados)
+                
+                for nome, script, sql in passos:
+                    checksum = self._checksum(sql)
+                    if nome in registrados:
+                        if registrados[nome] != checksum:
+                            raise MigracaoInvalida(
+                                f"Passo {nome} de {script} mudou depois de aplicado; "
+                                "crie um passo novo ou recrie o banco com --recriar"
+                            )
+                        continue
+                    inicio = time.perf_counter()
+                    cursor.execute(sql)
+                    cursor.execute(
+                        "INSERT INTO schema_migracao (versao, script, checksum, segundos) VALUES (%s, %s, %s, %s)",
+                        (nome, script, checksum, round(time.perf_counter() - inicio, 3))
+                    )
+                    aplicados.append(nome)
+        
+        if aplicados or reset:
+            self._schema_alterado()
+        return aplicados
 
 
 # Instância global
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Versão assíncrona (asyncio) do gerenciador de banco de dados
+Sistema de Locação de Imóveis
+
+Usa o modo assíncrono nativo do psycopg2: cada conexão é conduzida pelo loop
+do asyncio (add_reader/add_writer), sem threads e sem dependências novas.
+"""
+
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+import psycopg2
+import psycopg2.extensions
+
+from database import db_manager, QueryTiming
+
+
+async def _aguardar(conn):
+    """Conduz a operação pendente da conexão assíncrona até o fim"""
+    loop = asyncio.get_running_loop()
+    while True:
+        estado = conn.poll()
+        if estado == psycopg2.extensions.POLL_OK:
+            return
+        if estado not in (psycopg2.extensions.POLL_READ, psycopg2.extensions.POLL_WRITE):
+            raise psycopg2.OperationalError(f"estado inesperado da conexão: {estado}")
+        
+        pronto = loop.create_future()
+        def sinalizar():
+            if not pronto.done():
+                pronto.set_result(None)
+        
+        descritor = conn.fileno()
+        if estado == psycopg2.extensions.POLL_READ:
+            loop.add_reader(descritor, sinalizar)
+            try:
+                await pronto
+            finally:
+                loop.remove_reader(descritor)
+        else:
+            loop.add_writer(descritor, sinalizar)
+            try:
+                await pronto
+            finally:
+                loop.remove_writer(descritor)
+
+
+class AsyncConnectionPool:
+    """Pool de conexões assíncronas com limite, tempo ocioso e verificação de saúde"""
+    
+    def __init__(self, conectar, maximo=10, tempo_ocioso=300, verificar_saude=True, timeout=30):
+        self._conectar = conectar
+        self.maximo = max(1, maximo)
+        self.tempo_ocioso = tempo_ocioso
+        self.verificar_saude = verificar_saude
+        self.timeout = timeout
+        self._livres = []  # pares (conexão, instante em que foi devolvida)
+        self._vagas = asyncio.Semaphore(self.maximo)
+        self._em_uso = 0
+    
+    async def obter(self):
+        """Retira uma conexão do pool, abrindo uma nova se necessário"""
+        try:
+            await asyncio.wait_for(self._vagas.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError(
+                f"ERRO: pool de conexões esgotado ({self.maximo} conexões em uso)"
+            )
+        
+        try:
+            agora = time.monotonic()
+            while self._livres:
+                conn, devolvida = self._livres.pop()
+                if conn.closed or agora - devolvida > self.tempo_ocioso or not await self._saudavel(conn):
+                    conn.close()
+                    continue
+                break
+            else:
+                conn = await self._conectar()
+        except BaseException:
+            self._vagas.release()
+            raise
+        self._em_uso += 1
+        return conn
+    
+    async def devolver(self, conn, descartar=False):
+        """Devolve a conexão ao pool, desfazendo transação pendente"""
+        try:
+            if not descartar and not conn.closed:
+                if conn.isexecuting():
+                    # Consulta interrompida (ex.: tarefa cancelada): a conexão não é reaproveitável
+                    descartar = True
+                elif conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    try:
+                        with conn.cursor() as cursor:
+                            cursor.execute("ROLLBACK")
+                            await _aguardar(conn)
+                    except psycopg2.Error:
+                        descartar = True
+            if descartar or conn.closed:
+                conn.close()
+            else:
+                self._livres.append((conn, time.monotonic()))
+        finally:
+            self._em_uso -= 1
+            self._vagas.release()
+    
+    def fechar(self):
+        """Fecha as conexões ociosas do pool"""
+        for conn, _ in self._livres:
+            conn.close()
+        self._livres = []
+    
+    def estatisticas(self):
+        return {'livres': len(self._livres), 'em_uso': self._em_uso, 'maximo': self.maximo}
+    
+    async def _saudavel(self, conn):
+        if not self.verificar_saude:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                await _aguardar(conn)
+            return True
+        except psycopg2.Error:
+            return False
+
+
+class AsyncDatabaseManager:
+    """Contraparte assíncrona do DatabaseManager (mesma configuração, hooks e réplicas)"""
+    
+    def __init__(self, manager):
+        self._manager = manager
+        self._pool = None
+        # Pools das réplicas de leitura (DB_REPLICAS), por nome
+        self._pools_replicas = {}
+    
+    @property
+    def config(self):
+        """A mesma configuração do gerenciador síncrono (lida no primeiro uso)"""
+        return self._manager.config
+    
+    async def get_connection(self, replica=None):
+        """Abre uma conexão assíncrona com o PostgreSQL (o primário, ou a `replica` indicada)"""
+        host = replica['host'] if replica else self.config['HOST']
+        port = replica['port'] if replica else self.config['PORT']
+        try:
+            conn = psycopg2.connect(
+                host=host,
+                port=int(port),
+                database=self.config['DATABASE'],
+                user=self.config['USER'],
+                password=self.config['PASSWORD'],
+                async_=True
+            )
+            await _aguardar(conn)
+            return conn
+        except psycopg2.OperationalError as e:
+            if "role" in str(e) and "does not exist" in str(e):
+                raise ConnectionError(f"ERRO: Usuário '{self.config['USER']}' não existe no PostgreSQL")
+            elif "Connection refused" in str(e):
+                raise ConnectionError(f"ERRO: PostgreSQL não está rodando em {host}:{port}")
+            else:
+                raise ConnectionError(f"ERRO de conexão: {e}")
+    
+    def _novo_pool(self, replica=None):
+        return AsyncConnectionPool(
+            lambda: self.get_connection(replica),
+            maximo=int(self.config['POOL_MAX']),
+            tempo_ocioso=float(self.config['POOL_IDLE_TIMEOUT']),
+            verificar_saude=self._manager.pool_health_check
+        )
+    
+    def get_pool(self, replica=None):
+        """Retorna o pool assíncrono (do primário ou da `replica`), criando-o no primeiro uso (dentro do loop)"""
+        if replica is not None:
+            if replica['nome'] not in self._pools_replicas:
+                self._pools_replicas[replica['nome']] = self._novo_pool(replica)
+            return self._pools_replicas[replica['nome']]
+        if self._pool is None:
+            self._pool = self._novo_pool()
+        return self._pool
+    
+    @asynccontextmanager
+    async def connection(self, replica=False):
+        """Empresta uma conexão do pool (conexões assíncronas estão sempre em autocommit)
+        
+        Com `replica`, a conexão vem de uma réplica em dia, escolhida pelas
+        mesmas regras do DatabaseManager (rodízio ou a menos ocupada, atraso
+        medido em segundo plano, primário logo após uma escrita); sem réplica
+        disponível ou com ela fora do ar, vem do primário.
+        """
+        destino = self._manager.choose_replica() if replica else None
+        pool = self.get_pool(destino)
+        try:
+            conn = await pool.obter()
+        except ConnectionError:
+            if destino is None:
+                raise
+            self._manager.mark_replica_down(destino)
+            destino, pool = None, self.get_pool()
+            conn = await pool.obter()
+        self._manager.track_replica_use(destino, 1)
+        try:
+            yield conn
+        finally:
+            self._manager.track_replica_use(destino, -1)
+            await pool.devolver(conn)
+    
+    async def close(self):
+        """Fecha os pools; deve ser chamado antes de encerrar o loop"""
+        if self._pool is not None:
+            self._pool.fechar()
+            self._pool = None
+        for pool in self._pools_replicas.values():
+            pool.fechar()
+        self._pools_replicas = {}
+    
+    @asynccontextmanager
+    async def _medir(self, sql, params=None):
+        """Mede a consulta e repassa aos mesmos hooks do DatabaseManager"""
+        medicao = QueryTiming(sql, params=params)
+        inicio = time.perf_counter()
+        try:
+            yield medicao
+        except Exception as e:
+            medicao.erro = str(e)
+            raise
+        finally:
+            medicao.total_ms = (time.perf_counter() - inicio) * 1000
+            self._manager.notify_query(medicao)
+    
+    @staticmethod
+    async def _executar(cursor, sql, params=None):
+        cursor.execute(sql, params)
+        await _aguardar(cursor.connection)
+    
+    async def execute_query(self, sql, params=None, replica=None):
+        """Executa consulta SQL e retorna (resultados, colunas)
+        
+        Como no DatabaseManager, leituras vão para uma réplica, se houver;
+        `replica=False` força o primário.
+        """
+        if replica is None:
+            replica = self._manager.is_read_only(sql)
+        async with self._medir(sql, params) as medicao:
+            inicio = time.perf_counter()
+            async with self.connection(replica) as conn:
+                medicao.fases['conectar'] = (time.perf_counter() - inicio) * 1000
+                with conn.cursor() as cursor:
+                    with medicao.fase('executar'):
+                        await self._executar(cursor, sql, params)
+                    with medicao.fase('buscar'):
+                        results = cursor.fetchall() if cursor.description else []
+                    medicao.registrar_linhas(results)
+                    columns = [desc[0] for desc in cursor.description] if cursor.description else []
+                    return results, columns
+    
+    @asynccontextmanager
+    async def _cursor_servidor(self, conn, sql, params=None):
+        """Declara um cursor no servidor (o modo assíncrono não tem named cursors)"""
+        nome = f"cursor_{uuid.uuid4().hex}"
+        with conn.cursor() as cursor:
+            await self._executar(cursor, "BEGIN")
+            await self._executar(
+                cursor, f"DECLARE {nome} NO SCROLL CURSOR FOR\n{sql.strip().rstrip(';')}\n", params
+            )
+            yield cursor, nome
+            await self._executar(cursor, f"CLOSE {nome}")
+            await self._executar(cursor, "COMMIT")
+    
+    async def stream_query(self, sql, params=None, itersize=None):
+        """Gerador assíncrono de (colunas, lote), sem carregar tudo em memória"""
+        itersize = itersize or int(self.config['STREAM_ITERSIZE'])
+        async with self._medir(sql, params) as medicao:
+            inicio = time.perf_counter()
+            async with self.connection(self._manager.is_read_only(sql)) as conn:
+                medicao.fases['conectar'] = (time.perf_counter() - inicio) * 1000
+                # Se o consumidor abandonar o gerador, o pool faz o ROLLBACK da transação
+                async with self._cursor_servidor(conn, sql, params) as (cursor, nome):
+                    while True:
+                        with medicao.fase('buscar'):
+                            await self._executar(cursor, f"FETCH {itersize} FROM {nome}")
+                            lote = cursor.fetchall()
+                        if not lote:
+                            break
+                        medicao.registrar_linhas(lote)
+                        yield [desc[0] for desc in cursor.description], lote
+    
+    async def preview_query(self, sql, limit=10, params=None):
+        """Retorna as primeiras `limit` linhas, as colunas e o total de registros"""
+        async with self._medir(sql, params) as medicao:
+            inicio = time.perf_counter()
+            async with self.connection(self._manager.is_read_only(sql)) as conn:
+                medicao.fases['conectar'] = (time.perf_counter() - inicio) * 1000
+                with medicao.fase('executar'):
+                    async with self._cursor_servidor(conn, sql, params) as (cursor, nome):
+                        await self._executar(cursor, f"FETCH {int(limit)} FROM {nome}")
+                        results = cursor.fetchall()
+                        columns = [desc[0] for desc in cursor.description] if cursor.description else []
+                medicao.registrar_linhas(results)
+                
+                if len(results) < limit:
+                    return results, columns, len(results)
+                
+                # O total é contado no servidor, sem transferir as demais linhas
+                with conn.cursor() as cursor, medicao.fase('contar'):
+                    await self._executar(
+                        cursor, f"SELECT COUNT(*) FROM {self._manager.as_subquery(sql)} AS consulta", params
+                    )
+                    total = cursor.fetchone()[0]
+                return results, columns, total
+
+
+# Instância global, com a mesma configuração do db_manager
+async_db_manager = AsyncDatabaseManager(db_manager)
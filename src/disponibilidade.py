@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Busca de disponibilidade e criação de reservas
+Sistema de Locação de Imóveis
+
+As reservas guardam o período como DATERANGE (coluna gerada `periodo`, noites
+de data_inicio até o dia anterior a data_fim). A restrição de exclusão
+ex_reserva_periodo impede que duas reservas ativas do mesmo imóvel se
+sobreponham, e o índice GiST dela responde às buscas abaixo sem varrer as
+reservas de cada imóvel.
+"""
+
+import psycopg2.errors
+
+from database import db_manager
+
+# Reservas que ocupam o imóvel (as mesmas da restrição de exclusão)
+STATUS_ATIVOS = ('confirmada', 'pendente')
+
+# Imóveis devolvidos por busca, os mais baratos primeiro
+LIMITE_BUSCA = 50
+
+# O filtro de status repete o predicado da restrição para o planejador usar o índice parcial
+SQL_DISPONIVEIS = """
+SELECT
+    i.id_imovel,
+    i.titulo,
+    i.cidade,
+    i.estado,
+    i.capacidade_max AS capacidade,
+    i.valor_diaria,
+    i.valor_diaria * (%(fim)s::date - %(inicio)s::date) AS valor_estadia
+FROM imovel i
+WHERE i.capacidade_max >= %(hospedes)s
+  AND i.cidade = COALESCE(%(cidade)s::text, i.cidade)
+  AND NOT EXISTS (
+      SELECT 1 FROM reserva r
+      WHERE r.id_imovel = i.id_imovel
+        AND r.status IN ('confirmada', 'pendente')
+        AND r.periodo && daterange(%(inicio)s::date, %(fim)s::date, '[)')
+  )
+ORDER BY i.valor_diaria, i.id_imovel
+LIMIT %(limite)s
+"""
+
+SQL_OCUPADO = """
+SELECT EXISTS (
+    SELECT 1 FROM reserva r
+    WHERE r.id_imovel = %(imovel)s
+      AND r.status IN ('confirmada', 'pendente')
+      AND r.periodo && daterange(%(inicio)s::date, %(fim)s::date, '[)')
+)
+"""
+
+SQL_RESERVAR = """
+INSERT INTO reserva (id_usuario, id_imovel, num_hospedes, data_inicio, data_fim, status)
+SELECT %(usuario)s, i.id_imovel, %(hospedes)s, %(inicio)s, %(fim)s, %(status)s
+FROM imovel i
+WHERE i.id_imovel = %(imovel)s AND i.capacidade_max >= %(hospedes)s
+RETURNING id_reserva
+"""
+
+
+class PeriodoIndisponivel(Exception):
+    """O imóvel já tem reserva ativa no período (ou não comporta os hóspedes)"""
+
+
+def _validar_periodo(inicio, fim):
+    if fim <= inicio:
+        raise ValueError(f"período inválido: saída ({fim}) deve ser depois da entrada ({inicio})")
+
+
+def imoveis_disponiveis(inicio, fim, hospedes=1, cidade=None, limite=LIMITE_BUSCA):
+    """Imóveis livres de `inicio` (entrada) a `fim` (saída) para `hospedes` pessoas
+    
+    Retorna dicionários com id_imovel, titulo, cidade, estado, capacidade,
+    valor_diaria e valor_estadia, do mais barato para o mais caro; no máximo
+    `limite` imóveis (None: todos).
+    """
+    _validar_periodo(inicio, fim)
+    params = {'inicio': inicio, 'fim': fim, 'hospedes': hospedes, 'cidade': cidade, 'limite': limite}
+    linhas, colunas = db_manager.execute_query(SQL_DISPONIVEIS, params, prepared=True)
+    return [dict(zip(colunas, linha)) for linha in linhas]
+
+
+def esta_disponivel(id_imovel, inicio, fim):
+    """True se o imóvel não tem reserva ativa entre `inicio` e `fim`"""
+    _validar_periodo(inicio, fim)
+    params = {'imovel': id_imovel, 'inicio': inicio, 'fim': fim}
+    linhas, _ = db_manager.execute_query(SQL_OCUPADO, params, prepared=True)
+    return not linhas[0][0]
+
+
+def reservar(id_usuario, id_imovel, inicio, fim, hospedes, status='pendente'):
+    """Cria a reserva e retorna o id; PeriodoIndisponivel se houver conflito
+    
+    A verificação é feita pelo próprio banco (restrição de exclusão), então
+    duas reservas simultâneas para o mesmo período não passam juntas.
+    """
+    _validar_periodo(inicio, fim)
+    if status not in STATUS_ATIVOS:
+        raise ValueError(f"status inválido para nova reserva: {status}")
+    params = {'usuario': id_usuario, 'imovel': id_imovel, 'hospedes': hospedes,
+              'inicio': inicio, 'fim': fim, 'status': status}
+    try:
+        linhas, _ = db_manager.execute_query(SQL_RESERVAR, params)
+    except psycopg2.errors.ExclusionViolation:
+        raise PeriodoIndisponivel(f"Imóvel {id_imovel} já reservado entre {inicio} e {fim}")
+    if not linhas:
+        raise PeriodoIndisponivel(f"Imóvel {id_imovel} não existe ou não comporta {hospedes} hóspedes")
+    db_manager.notify_data_change()
+    return linhas[0][0]
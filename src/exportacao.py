@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Exportação das consultas para Parquet, CSV (simples ou gzip) ou Excel
+Sistema de Locação de Imóveis
+
+O resultado vem em lotes de um cursor no servidor e é gravado direto no
+arquivo, sem montar o resultado inteiro em memória.
+"""
+
+import csv
+import functools
+import gzip
+import importlib.util
+import json
+import os
+import re
+import tempfile
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from database import db_manager, ler_env
+
+# pyarrow (Parquet) e openpyxl (Excel) são opcionais e só são importados pelo
+# escritor que os usa: abrir o app ou exportar CSV não paga o custo da importação
+
+
+# Arquivos de download do Streamlit: apagados por idade e pelo espaço total ocupado
+DIRETORIO_DOWNLOADS = os.path.join(tempfile.gettempdir(), 'ldi_exportacoes')
+IDADE_MAXIMA_DOWNLOADS = float(ler_env('DB_EXPORT_MAX_AGE', '3600'))
+ESPACO_MAXIMO_DOWNLOADS = int(float(ler_env('DB_EXPORT_MAX_MB', '512')) * 1024 * 1024)
+# O botão de download guarda o arquivo inteiro na memória do servidor do Streamlit:
+# acima disso, a exportação fica para o lote (apresentacao_ldi.py --exportar)
+TAMANHO_MAXIMO_DOWNLOAD = int(float(ler_env('DB_EXPORT_DOWNLOAD_MAX_MB', '50')) * 1024 * 1024)
+# Arquivo modificado há menos que isso pode estar sendo gravado por outra sessão
+_EM_GRAVACAO = 60
+
+
+class TempoEsgotado(Exception):
+    """O lote passou do tempo limite antes de terminar a consulta"""
+
+
+def nome_arquivo(numero, titulo, extensao):
+    """'Receita por Imóvel' -> '08_receita_por_imovel.parquet'"""
+    texto = unicodedata.normalize('NFKD', titulo).encode('ascii', 'ignore').decode('ascii')
+    texto = re.sub(r'[^a-z0-9]+', '_', texto.lower()).strip('_')
+    return f"{numero:02d}_{texto}.{extensao}"
+
+
+class _EscritorCSV:
+    """Grava os lotes direto no arquivo, sem acumular o resultado"""
+    
+    extensao = 'csv'
+    dependencia = None
+    
+    def __init__(self, caminho, tipos):
+        self._arquivo = self._abrir(caminho)
+        self._escritor = csv.writer(self._arquivo)
+        self._escritor.writerow([nome for nome, _ in tipos])
+    
+    @staticmethod
+    def _abrir(caminho):
+        return open(caminho, 'w', encoding='utf-8', newline='')
+    
+    def escrever(self, linhas):
+        self._escritor.writerows(linhas)
+    
+    def fechar(self):
+        self._arquivo.close()
+
+
+class _EscritorCSVGzip(_EscritorCSV):
+    """CSV compactado à medida que os lotes chegam"""
+    
+    extensao = 'csv.gz'
+    
+    @staticmethod
+    def _abrir(caminho):
+        return gzip.open(caminho, 'wt', encoding='utf-8', newline='', compresslevel=6)
+
+
+class _EscritorExcel:
+    """Planilha em modo write_only do openpyxl: as linhas vão para disco, não para a memória"""
+    
+    extensao = 'xlsx'
+    dependencia = 'openpyxl'
+    MAXIMO_LINHAS = 1048576  # limite do Excel, contando o cabeçalho
+    
+    def __init__(self, caminho, tipos):
+        from openpyxl import Workbook
+        self._caminho = caminho
+        self._livro = Workbook(write_only=True)
+        self._planilha = self._livro.create_sheet("consulta")
+        self._planilha.append([nome for nome, _ in tipos])
+        self._linhas = 1
+    
+    @staticmethod
+    def _valor(valor):
+        # Excel não guarda fuso horário
+        if isinstance(valor, datetime) and valor.tzinfo is not None:
+            return valor.astimezone(timezone.utc).replace(tzinfo=None)
+        return valor
+    
+    def escrever(self, linhas):
+        self._linhas += len(linhas)
+        if self._linhas > self.MAXIMO_LINHAS:
+            raise ValueError(f"resultado maior que o limite do Excel ({self.MAXIMO_LINHAS} linhas); use CSV")
+        for linha in linhas:
+            self._planilha.append([self._valor(valor) for valor in linha])
+    
+    def fechar(self):
+        self._livro.save(self._caminho)
+
+
+class _EscritorParquet:
+    """Grava cada lote como um row group, com o esquema tirado dos tipos do PostgreSQL"""
+    
+    extensao = 'parquet'
+    dependencia = 'pyarrow'
+    
+    # NUMERIC tem escala arbitrária: vai como decimal de escala fixa (centavos exatos;
+    # médias com mais casas são arredondadas na sexta)
+    ESCALA_DECIMAL = 6
+    _QUANTUM = Decimal(1).scaleb(-ESCALA_DECIMAL)
+    
+    # OID do tipo no PostgreSQL -> (tipo Arrow, conversão do valor Python)
+    TIPOS = {
+        16: ('bool', None),
+        20: ('int64', None), 21: ('int16', None), 23: ('int32', None),
+        700: ('float32', None), 701: ('float64', None),
+        1700: ('decimal', lambda valor: valor.quantize(_EscritorParquet._QUANTUM)),
+        1082: ('date32', None),
+        1114: ('timestamp', None), 1184: ('timestamptz', None),
+    }
+    
+    def __init__(self, caminho, tipos):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        campos, self._conversoes = [], []
+        for nome, oid in tipos:
+            tipo, conversao = self.TIPOS.get(oid, ('string', str))
+            if tipo == 'decimal':
+                tipo_arrow = pa.decimal128(38, self.ESCALA_DECIMAL)
+            elif tipo == 'timestamp':
+                tipo_arrow = pa.timestamp('us')
+            elif tipo == 'timestamptz':
+                tipo_arrow = pa.timestamp('us', tz='UTC')
+            else:
+                tipo_arrow = getattr(pa, tipo)()
+            campos.append(pa.field(nome, tipo_arrow))
+            self._conversoes.append(conversao)
+        self._esquema = pa.schema(campos)
+        self._escritor = pq.ParquetWriter(caminho, self._esquema)
+    
+    def escrever(self, linhas):
+        pa = self._pa
+        colunas = []
+        for i, (campo, conversao) in enumerate(zip(self._esquema, self._conversoes)):
+            valores = [linha[i] for linha in linhas]
+            if conversao is not None:
+                valores = [None if valor is None else conversao(valor) for valor in valores]
+            colunas.append(pa.array(valores, type=campo.type))
+        self._escritor.write_table(pa.Table.from_arrays(colunas, schema=self._esquema))
+    
+    def fechar(self):
+        self._escritor.close()
+
+
+ESCRITORES = {
+    'parquet': _EscritorParquet,
+    'csv': _EscritorCSV,
+    'csv.gz': _EscritorCSVGzip,
+    'xlsx': _EscritorExcel,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _instalado(modulo):
+    """True se o módulo pode ser importado (sem importá-lo)"""
+    return importlib.util.find_spec(modulo) is not None
+
+
+def formatos_disponiveis():
+    """Formatos cujas dependências opcionais estão instaladas"""
+    return [formato for formato, escritor in ESCRITORES.items()
+            if escritor.dependencia is None or _instalado(escritor.dependencia)]
+
+
+def limpar_downloads(diretorio=DIRETORIO_DOWNLOADS, idade_maxima=None, espaco_maximo=None):
+    """Apaga os downloads vencidos e, acima do espaço máximo, os mais antigos; retorna quantos"""
+    idade_maxima = IDADE_MAXIMA_DOWNLOADS if idade_maxima is None else idade_maxima
+    espaco_maximo = ESPACO_MAXIMO_DOWNLOADS if espaco_maximo is None else espaco_maximo
+    arquivos = []
+    try:
+        with os.scandir(diretorio) as entradas:
+            for entrada in entradas:
+                try:
+                    if entrada.is_file():
+                        info = entrada.stat()
+                        arquivos.append((info.st_mtime, info.st_size, entrada.path))
+                except FileNotFoundError:
+                    pass  # apagado por outra sessão
+    except FileNotFoundError:
+        return 0
+    
+    agora = time.time()
+    removidos, ocupado = 0, 0
+    for modificado, tamanho, caminho in sorted(arquivos, reverse=True):  # mais novos primeiro
+        ocupado += tamanho
+        if agora - modificado < _EM_GRAVACAO:
+            continue
+        if agora - modificado > idade_maxima or ocupado > espaco_maximo:
+            try:
+                os.remove(caminho)
+                removidos += 1
+            except OSError:
+                pass  # já apagado ou aberto em outro processo
+            ocupado -= tamanho
+    return removidos
+
+
+def _gravar(escritor_cls, caminho, sql, params=None, prazo=None, perfil=None):
+    """Grava o resultado da consulta lote a lote; retorna o número de linhas"""
+    linhas = 0
+    escritor = None
+    try:
+        if prazo is not None and time.monotonic() >= prazo:
+            raise TempoEsgotado("tempo limite do lote esgotado antes do início")
+        escritor = escritor_cls(caminho, db_manager.describe_query(sql, params))
+        restante_ms = None if prazo is None else (prazo - time.monotonic()) * 1000
+        # closing: em caso de erro o cursor e a conexão são liberados na hora
+        with closing(db_manager.stream_query(sql, params, timeout_ms=restante_ms, profile=perfil)) as lotes:
+            for _, lote in lotes:
+                escritor.escrever(lote)
+                linhas += len(lote)
+                if prazo is not None and time.monotonic() >= prazo:
+                    raise TempoEsgotado("tempo limite do lote esgotado")
+    except BaseException:
+        if escritor is not None:
+            escritor.fechar()
+        # Arquivo incompleto não fica no disco
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        raise
+    escritor.fechar()
+    return linhas
+
+
+def exportar_arquivo(sql, caminho, formato='csv.gz', params=None, perfil=None):
+    """Exporta o resultado completo de uma consulta para `caminho`; retorna o número de linhas
+    
+    `perfil` é o perfil de execução da consulta (@perfil), como na leitura da tela.
+    """
+    if formato not in formatos_disponiveis():
+        raise ValueError(f"formato indisponível: {formato}")
+    return _gravar(ESCRITORES[formato], caminho, sql, params, perfil=perfil)
+
+
+def exportar_consulta(numero, consulta, diretorio, formato='parquet', prazo=None):
+    """Exporta o resultado completo de uma consulta em lotes; retorna a entrada do manifesto"""
+    escritor_cls = ESCRITORES[formato]
+    arquivo = nome_arquivo(numero, consulta['titulo'], escritor_cls.extensao)
+    caminho = os.path.join(diretorio, arquivo)
+    entrada = {'consulta': numero, 'titulo': consulta['titulo'], 'arquivo': arquivo,
+               'linhas': 0, 'bytes': 0, 'segundos': 0.0, 'erro': None}
+    
+    inicio = time.perf_counter()
+    try:
+        entrada['linhas'] = _gravar(escritor_cls, caminho, consulta['sql'], prazo=prazo)
+        entrada['bytes'] = os.path.getsize(caminho)
+    except Exception as e:
+        # Arquivo incompleto não entra no snapshot
+        entrada['erro'] = str(e)
+    entrada['segundos'] = round(time.perf_counter() - inicio, 3)
+    return entrada
+
+
+def exportar_consultas(consultas, diretorio, formato='parquet', trabalhadores=4, tempo_limite=None):
+    """Exporta todas as consultas em paralelo e grava o manifest.json
+    
+    `tempo_limite` (segundos) vale para o lote inteiro: consultas que não
+    terminarem no prazo são interrompidas e registradas com erro.
+    """
+    if formato not in formatos_disponiveis():
+        print(f"⚠️  dependência de {formato} não instalada; exportando em CSV")
+        formato = 'csv'
+    os.makedirs(diretorio, exist_ok=True)
+    prazo = None if tempo_limite is None else time.monotonic() + tempo_limite
+    
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, trabalhadores)) as executor:
+        futuros = [
+            executor.submit(exportar_consulta, numero, consulta, diretorio, formato, prazo)
+            for numero, consulta in enumerate(consultas, 1)
+        ]
+        entradas = [futuro.result() for futuro in futuros]
+    
+    manifesto = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'formato': formato,
+        'segundos': round(time.perf_counter() - inicio, 3),
+        'consultas': entradas
+    }
+    with open(os.path.join(diretorio, 'manifest.json'), 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False, indent=2)
+    return manifesto
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Consultas de agregação dos gráficos do Streamlit
+Sistema de Locação de Imóveis
+
+Os gráficos não plotam o resultado da consulta exibida: cada um tem uma
+consulta própria, agregada no servidor, com um limite de pontos que não
+depende do volume de dados (top N + "Outros" para receita, agrupamento por
+semana/mês/trimestre/ano para ocupação).
+"""
+
+from datetime import date
+
+from database import db_manager, ler_env
+
+# Máximo de barras (incluindo "Outros") e de pontos por série
+BARRAS_MAXIMAS = int(ler_env('DB_CHART_MAX_BARS', '15'))
+PONTOS_MAXIMOS = int(ler_env('DB_CHART_MAX_POINTS', '60'))
+
+# Do mais fino para o mais grosso: (unidade do date_trunc, dias aproximados por ponto)
+AGRUPAMENTOS = [('week', 7), ('month', 30.44), ('quarter', 91.31), ('year', 365.25)]
+
+SQL_RECEITA_TOPO = """
+WITH topo AS (
+    SELECT id_imovel, titulo, receita_total
+    FROM resumo_imovel
+    ORDER BY receita_total DESC, id_imovel
+    LIMIT %(topo)s
+)
+SELECT titulo, receita_total, 1 AS imoveis, 0 AS grupo
+FROM topo
+UNION ALL
+SELECT 'Outros (' || COUNT(*) || ' imóveis)', SUM(ri.receita_total), COUNT(*), 1
+FROM resumo_imovel ri
+WHERE NOT EXISTS (SELECT 1 FROM topo t WHERE t.id_imovel = ri.id_imovel)
+HAVING COUNT(*) > 0
+ORDER BY grupo, receita_total DESC
+"""
+
+SQL_INTERVALO = "SELECT MIN(data_inicio), MAX(data_inicio) FROM reserva"
+
+# Semanas saem da tabela de reservas; mês ou mais, do resumo mensal
+SQL_OCUPACAO_SEMANA = """
+SELECT
+    date_trunc('week', r.data_inicio)::date AS periodo,
+    COUNT(*) AS total_reservas,
+    COUNT(*) FILTER (WHERE r.status = 'confirmada') AS confirmadas,
+    COUNT(*) FILTER (WHERE r.status = 'cancelada') AS canceladas,
+    COUNT(*) FILTER (WHERE r.status = 'pendente') AS pendentes
+FROM reserva r
+GROUP BY 1
+ORDER BY 1
+"""
+
+SQL_OCUPACAO_RESUMO = """
+SELECT
+    date_trunc(%(agrupamento)s, TO_DATE(rm.mes_ano, 'YYYY-MM'))::date AS periodo,
+    SUM(rm.total_reservas) AS total_reservas,
+    SUM(rm.confirmadas) AS confirmadas,
+    SUM(rm.canceladas) AS canceladas,
+    SUM(rm.pendentes) AS pendentes
+FROM resumo_mes rm
+GROUP BY 1
+ORDER BY 1
+"""
+
+
+def escolher_agrupamento(inicio, fim, pontos=None):
+    """Agrupamento mais fino que cabe em `pontos` pontos entre `inicio` e `fim`"""
+    pontos = pontos or PONTOS_MAXIMOS
+    dias = (fim - inicio).days + 1
+    for unidade, dias_por_ponto in AGRUPAMENTOS:
+        if dias / dias_por_ponto <= pontos:
+            return unidade
+    return AGRUPAMENTOS[-1][0]
+
+
+def receita_por_imovel(barras=None):
+    """DataFrame (titulo, receita_total, imoveis) com as maiores receitas e o restante somado"""
+    barras = barras or BARRAS_MAXIMAS
+    return db_manager.fetch_dataframe(SQL_RECEITA_TOPO, {'topo': max(1, barras - 1)}).drop(columns=['grupo'])
+
+
+def ocupacao_por_periodo(pontos=None):
+    """(agrupamento, DataFrame com periodo e contagens por status), no máximo `pontos` linhas
+    
+    Se nem o agrupamento por ano couber, ficam os períodos mais recentes.
+    """
+    pontos = pontos or PONTOS_MAXIMOS
+    linhas, _ = db_manager.execute_query(SQL_INTERVALO)
+    inicio, fim = linhas[0]
+    if inicio is None:
+        inicio = fim = date.today()
+    agrupamento = escolher_agrupamento(inicio, fim, pontos)
+    if agrupamento == 'week':
+        df = db_manager.fetch_dataframe(SQL_OCUPACAO_SEMANA)
+    else:
+        df = db_manager.fetch_dataframe(SQL_OCUPACAO_RESUMO, {'agrupamento': agrupamento})
+    return agrupamento, df.tail(pontos).reset_index(drop=True)
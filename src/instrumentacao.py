@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Histórico de tempos e log de consultas lentas
+Sistema de Locação de Imóveis
+"""
+
+import json
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+from database import db_manager, ler_env, ler_flag
+
+logger = logging.getLogger(__name__)
+
+
+class QueryLog:
+    """Guarda as últimas medições por consulta e registra as lentas com o plano"""
+    
+    def __init__(self, por_consulta=20, limite_lenta_ms=500, explicar=True, arquivo=None):
+        self.por_consulta = por_consulta
+        self.limite_lenta_ms = limite_lenta_ms
+        self.explicar = explicar
+        self.arquivo = arquivo
+        self._medicoes = {}  # rótulo -> deque das últimas medições
+        self._lentas = deque(maxlen=50)
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _chave(medicao):
+        return medicao.rotulo or ' '.join(medicao.sql.split())[:80]
+    
+    def registrar(self, medicao):
+        """Hook do DatabaseManager: guarda a medição e trata as consultas lentas"""
+        registro = {
+            'quando': datetime.fromtimestamp(medicao.inicio).isoformat(timespec='seconds'),
+            'consulta': self._chave(medicao),
+            'total_ms': round(medicao.total_ms, 2),
+            **{f"{fase}_ms": round(ms, 2) for fase, ms in medicao.fases.items()},
+            'linhas': medicao.linhas,
+            'bytes': medicao.bytes,
+            'erro': medicao.erro
+        }
+        with self._lock:
+            historico = self._medicoes.setdefault(registro['consulta'], deque(maxlen=self.por_consulta))
+            historico.append(registro)
+        
+        if self.limite_lenta_ms is not None and medicao.total_ms >= self.limite_lenta_ms:
+            lenta = dict(registro, sql=medicao.sql)
+            if self.explicar and medicao.erro is None:
+                # O EXPLAIN roda em segundo plano para não atrasar ainda mais a página
+                threading.Thread(
+                    target=self._explicar, args=(lenta, medicao.sql, medicao.params), daemon=True
+                ).start()
+            else:
+                self._gravar(lenta)
+    
+    def ultimas(self, consulta):
+        """Medições mais recentes primeiro"""
+        with self._lock:
+            return list(reversed(self._medicoes.get(consulta, ())))
+    
+    def lentas(self):
+        with self._lock:
+            return list(reversed(self._lentas))
+    
+    def _explicar(self, lenta, sql, params):
+        try:
+            with db_manager.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("EXPLAIN (FORMAT JSON) " + sql.strip().rstrip(';'), params)
+                    plano = cursor.fetchone()[0]
+            lenta['plano'] = json.loads(plano) if isinstance(plano, str) else plano
+        except Exception as e:
+            lenta['plano'] = f"EXPLAIN falhou: {e}"
+        self._gravar(lenta)
+    
+    def _gravar(self, lenta):
+        with self._lock:
+            self._lentas.append(lenta)
+        if self.arquivo:
+            with self._lock, open(self.arquivo, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(json.dumps(lenta, ensure_ascii=False, default=str) + "\n")
+        else:
+            logger.warning("Consulta lenta (%.0fms): %s", lenta['total_ms'], lenta['consulta'])
+
+
+# Instância global, alimentada por todas as consultas do db_manager
+query_log = QueryLog(
+    por_consulta=int(ler_env('DB_TIMINGS_PER_QUERY', '20')),
+    limite_lenta_ms=float(ler_env('DB_SLOW_QUERY_MS', '500')),
+    explicar=ler_flag('DB_SLOW_QUERY_EXPLAIN', 'true'),
+    arquivo=ler_env('DB_SLOW_QUERY_LOG') or None
+)
+db_manager.on_query(query_log.registrar)
@@ -0,0 +1,118 @@
+"""
+Configuração comum dos testes
+Os testes cobrem a lógica que não depende de um PostgreSQL em execução;
+src/ e scripts/ entram no caminho de importação como nos scripts do projeto.
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+for pasta in ('src', 'scripts'):
+    caminho = os.path.join(RAIZ, pasta)
+    if caminho not in sys.path:
+        sys.path.insert(0, caminho)
+
+
+class CursorFalso:
+    """Cursor que registra os comandos e devolve as linhas definidas pelo teste"""
+
+    def __init__(self, banco, nome=None):
+        self.banco = banco
+        self.nome = nome
+        self.itersize = 2000
+        self.description = None
+        self._linhas = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        return False
+
+    def execute(self, sql, params=None):
+        self.banco.executados.append((sql, params))
+        colunas, linhas = self.banco.responder(sql, params)
+        self.description = [(nome, oid) for nome, oid in colunas] if colunas is not None else None
+        self._linhas = list(linhas)
+
+    def fetchall(self):
+        linhas, self._linhas = self._linhas, []
+        return linhas
+
+    def fetchmany(self, quantidade):
+        linhas, self._linhas = self._linhas[:quantidade], self._linhas[quantidade:]
+        return linhas
+
+    def fetchone(self):
+        return self._linhas.pop(0) if self._linhas else None
+
+    def mogrify(self, sql, params=None):
+        return (sql if params is None else sql % params).encode('utf-8')
+
+    def copy_expert(self, sql, arquivo, size=None):
+        self.banco.executados.append((sql, None))
+        if 'FROM STDIN' not in sql:
+            arquivo.write(self.banco.copiar(sql).encode('utf-8'))
+            return
+        # Lê em blocos do tamanho pedido, como o psycopg2
+        partes = []
+        while True:
+            bloco = arquivo.read(size or 8192)
+            if not bloco:
+                break
+            partes.append(bloco)
+        texto = ''.join(partes)
+        self.banco.recebidos.append((sql, texto))
+        self.rowcount = texto.count('\n')
+
+
+class ConexaoFalsa:
+    encoding = 'UTF8'
+    closed = 0
+
+    def __init__(self, banco):
+        self.banco = banco
+
+    def cursor(self, name=None):
+        return CursorFalso(self.banco, name)
+
+    def cancel(self):
+        self.banco.cancelamentos += 1
+
+
+class BancoFalso:
+    """Substitui db_manager.connection: `responder(sql, params)` -> (colunas, linhas)
+
+    Colunas são pares (nome, OID do tipo); `copiar(sql)` devolve o texto do COPY TO
+    e `recebidos` guarda (sql, texto) de cada COPY FROM STDIN.
+    """
+
+    def __init__(self):
+        self.executados = []
+        self.recebidos = []
+        self.cancelamentos = 0
+        self.conexoes = []
+        self.responder = lambda sql, params: ([], [])
+        self.copiar = lambda sql: ''
+
+    def sql(self):
+        return [sql for sql, _ in self.executados]
+
+
+@pytest.fixture
+def banco_falso(monkeypatch):
+    from database import db_manager
+    banco = BancoFalso()
+
+    @contextmanager
+    def connection(replica=False, profile=None):
+        banco.conexoes.append({'replica': replica, 'profile': profile})
+        yield ConexaoFalsa(banco)
+
+    monkeypatch.setattr(db_manager, 'connection', connection)
+    monkeypatch.setattr(db_manager, '_query_hooks', [])
+    return banco
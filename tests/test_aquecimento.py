@@ -0,0 +1,107 @@
+"""Testes do aquecimento do cache: ordem por acessos, validade, erros e gravação das contagens"""
+
+import json
+
+import pytest
+
+import aquecimento
+from aquecimento import CacheWarmer
+
+
+class CacheFalso:
+    """Só o que o aquecimento usa do ResultCache: validade e preencher"""
+
+    def __init__(self, validades=None):
+        self.validades = validades or {}
+        self.preenchidas = []
+
+    def validade(self, sql, params=None):
+        return self.validades.get(sql, 0.0)
+
+    def preencher(self, sql, executar, params=None, ttl=None):
+        valor = executar()
+        self.preenchidas.append(sql)
+        return valor
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    falso = CacheFalso()
+    monkeypatch.setattr(aquecimento, 'result_cache', falso)
+    return falso
+
+
+def leitura(nome, falhar=False):
+    def ler():
+        if falhar:
+            raise TimeoutError(nome)
+        return nome
+    return {'nome': nome, 'sql': f"SELECT '{nome}'", 'params': None, 'ttl': None, 'ler': ler}
+
+
+def test_mais_acessadas_primeiro_e_empate_na_ordem_do_registro(cache):
+    warmer = CacheWarmer(trabalhadores=1, ativo=False)
+    warmer.configurar([leitura('a'), leitura('b'), leitura('c'), leitura('d')])
+    for nome in ('c', 'c', 'd', 'b'):
+        warmer.registrar_acesso(nome)
+
+    assert warmer.aquecer() == 4
+    assert cache.preenchidas == ["SELECT 'c'", "SELECT 'b'", "SELECT 'd'", "SELECT 'a'"]
+
+
+def test_so_aquece_o_que_expira_antes_da_proxima_rodada(cache):
+    warmer = CacheWarmer(trabalhadores=1, intervalo=30, ativo=False)
+    warmer.configurar([leitura('nova'), leitura('valida'), leitura('expirando')])
+    cache.validades = {"SELECT 'valida'": 120.0, "SELECT 'expirando'": 10.0}
+
+    assert warmer.aquecer() == 2
+    assert cache.preenchidas == ["SELECT 'nova'", "SELECT 'expirando'"]
+
+
+def test_com_erro_espera_alteracao_dos_dados(cache):
+    warmer = CacheWarmer(trabalhadores=1, ativo=False)
+    warmer.configurar([leitura('lenta', falhar=True), leitura('ok')])
+
+    assert warmer.aquecer() == 1
+    assert warmer.estatisticas()['erros'] == 1
+    # Na rodada seguinte a consulta com erro fica de fora
+    cache.preenchidas.clear()
+    warmer.aquecer()
+    assert cache.preenchidas == ["SELECT 'ok'"]
+
+    # Uma alteração dos dados (agendar) libera a nova tentativa
+    warmer.agendar()
+    cache.preenchidas.clear()
+    warmer.aquecer()
+    assert cache.preenchidas == ["SELECT 'ok'"]
+    assert warmer.estatisticas()['erros'] == 2
+
+
+def test_acessos_gravados_em_lote(tmp_path):
+    arquivo = tmp_path / 'acessos.json'
+    warmer = CacheWarmer(arquivo=str(arquivo), ativo=False, gravar_a_cada=60)
+    for _ in range(5):
+        warmer.registrar_acesso('a')
+    # Contagem em memória na hora; o arquivo espera o intervalo de gravação
+    assert warmer.acessos() == {'a': 5}
+    assert not arquivo.exists()
+
+    warmer.gravar_acessos()
+    assert json.loads(arquivo.read_text(encoding='utf-8')) == {'a': 5}
+
+    # Contagens salvas valem no próximo processo
+    assert CacheWarmer(arquivo=str(arquivo), ativo=False).acessos() == {'a': 5}
+
+
+def test_acessos_gravados_quando_vence_o_intervalo(tmp_path):
+    arquivo = tmp_path / 'acessos.json'
+    warmer = CacheWarmer(arquivo=str(arquivo), ativo=False, gravar_a_cada=0)
+    warmer.registrar_acesso('a')
+    warmer.registrar_acesso('b')
+    assert json.loads(arquivo.read_text(encoding='utf-8')) == {'a': 1, 'b': 1}
+
+
+def test_contagens_fora_do_cache_descartavel():
+    # As contagens valem entre reinícios: não podem ficar onde se apaga sem aviso
+    assert '__pycache__' not in aquecimento.ARQUIVO_ACESSOS.parts
+    assert aquecimento.ARQUIVO_ACESSOS.parent.name == 'ldi'
@@ -0,0 +1,71 @@
+"""Testes do benchmark das consultas: percentis, medição por perfil e comparação de relatórios"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from benchmark_consultas import comparar, executar_benchmark, gravar_relatorio, medir_consulta, percentil
+
+
+@pytest.mark.parametrize("p, esperado", [(0, 1), (50, 2.5), (100, 4), (95, 3.85)])
+def test_percentil_interpolado(p, esperado):
+    assert percentil([4, 1, 3, 2], p) == pytest.approx(esperado)
+
+
+def test_percentil_de_um_valor():
+    assert percentil([7.5], 99) == 7.5
+
+
+def test_mede_so_depois_do_aquecimento(banco_falso):
+    plano = [{'Plan': {'Shared Hit Blocks': 3}, 'Execution Time': 1.2}]
+
+    def responder(sql, params):
+        if sql.startswith("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) "):
+            return [('QUERY PLAN', 114)], [(json.dumps(plano),)]
+        return [('id', 23)], [(1,), (2,)]
+
+    banco_falso.responder = responder
+    tempos, linhas, resultado = medir_consulta("SELECT id FROM t;", execucoes=3, aquecimento=2)
+    assert len(tempos) == 3
+    assert linhas == 2
+    assert resultado == plano[0]
+    assert banco_falso.sql().count("SELECT id FROM t;") == 5
+    assert banco_falso.sql()[-1] == "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT id FROM t"
+
+
+def test_mede_as_duas_versoes_no_perfil_da_consulta(banco_falso):
+    plano = [{'Plan': {}}]
+    banco_falso.responder = lambda sql, params: (
+        ([('QUERY PLAN', 114)], [(json.dumps(plano),)]) if sql.startswith("EXPLAIN")
+        else ([('id', 23)], [(1,)])
+    )
+    consultas = [
+        {'titulo': 'Receita', 'sql': "SELECT 1 FROM reserva", 'sql_resumo': "SELECT 1 FROM resumo_mes",
+         'perfil': 'analitico'},
+        {'titulo': 'Imóveis', 'sql': "SELECT 1 FROM imovel", 'sql_resumo': None, 'perfil': 'operacional'},
+    ]
+    resultados = executar_benchmark('atual', consultas, execucoes=1, aquecimento=0)
+    assert [(r['consulta'], r['versao']) for r in resultados] == [(1, 'base'), (1, 'resumo'), (2, 'base')]
+    assert "SELECT 1 FROM resumo_mes" in banco_falso.sql()
+    assert [c['profile'] for c in banco_falso.conexoes] == ['analitico', 'analitico', 'operacional']
+
+
+def _resultado(titulo, p95, versao='base'):
+    return {'escala': 'atual', 'consulta': 1, 'titulo': titulo, 'versao': versao, 'execucoes': 1, 'linhas': 1,
+            'p50_ms': p95, 'p95_ms': p95, 'p99_ms': p95, 'media_ms': p95, 'buffers_hit': 0,
+            'buffers_read': 0, 'planejamento_ms': None, 'execucao_ms': None}
+
+
+def test_compara_p95_com_relatorio_anterior(tmp_path):
+    anterior = gravar_relatorio([_resultado('a', 10.0), _resultado('b', 10.0)], tmp_path, {})
+    assert Path(anterior).with_suffix('.csv').exists()
+    atuais = [_resultado('a', 12.0), _resultado('b', 10.5), _resultado('nova', 99.0)]
+    # Só 'a' piorou mais que 10%; consulta sem histórico não conta
+    assert comparar(atuais, anterior, limiar=0.1) == 1
+
+
+def test_compara_cada_versao_com_a_mesma_versao(tmp_path):
+    anterior = gravar_relatorio([_resultado('a', 10.0, 'resumo'), _resultado('a', 100.0)], tmp_path, {})
+    # A versão original, mais lenta, não serve de base para a versão sobre os resumos
+    assert comparar([_resultado('a', 50.0, 'resumo')], anterior, limiar=0.1) == 1
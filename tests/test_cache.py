@@ -0,0 +1,109 @@
+"""Testes do cache de resultados: TTL, limite de memória e invalidação pela assinatura dos dados"""
+
+import time
+
+import pytest
+
+import cache
+from cache import ResultCache
+from database import db_manager
+
+
+@pytest.fixture
+def banco(banco_falso, monkeypatch):
+    """Assinatura dos dados controlada pelo teste; conta as consultas ao banco"""
+    estado = {'assinatura': (10, 3), 'consultas': 0, 'conexoes': banco_falso.conexoes}
+
+    def responder(sql, params):
+        estado['consultas'] += 1
+        return [('soma', 20), ('tabelas', 20)], [estado['assinatura']]
+
+    banco_falso.responder = responder
+    monkeypatch.setattr(db_manager, '_data_change_callbacks', [])
+    return estado
+
+
+def test_chave_ignora_espacos_e_distingue_parametros():
+    assert ResultCache.chave("SELECT  1\n FROM t") == ResultCache.chave("SELECT 1 FROM t")
+    assert ResultCache.chave("SELECT 1", ('a', 1)) != ResultCache.chave("SELECT 1", ('a', 2))
+
+
+def test_get_nao_consulta_o_banco(banco):
+    resultados = ResultCache(intervalo_verificacao=0)
+    resultados.set("SELECT 1", [1])
+    assert resultados.get("SELECT 1") == [1]
+    assert banco['consultas'] == 0
+
+
+def test_expira_pelo_ttl():
+    resultados = ResultCache()
+    resultados.set("SELECT 1", [1], ttl=0.01)
+    time.sleep(0.02)
+    assert resultados.get("SELECT 1") is None
+    assert resultados.estatisticas()['entradas'] == 0
+
+
+def test_remove_os_menos_usados_ao_passar_do_limite():
+    item = list(range(100))
+    tamanho = cache.estimar_tamanho(item)
+    resultados = ResultCache(max_bytes=tamanho * 2)
+    resultados.set("a", item)
+    resultados.set("b", item)
+    resultados.get("a")  # 'b' passa a ser o menos usado
+    resultados.set("c", item)
+    assert resultados.get("a") == item
+    assert resultados.get("b") is None
+    assert resultados.get("c") == item
+
+
+def test_resultado_maior_que_o_limite_nao_entra():
+    resultados = ResultCache(max_bytes=10)
+    resultados.set("a", list(range(100)))
+    assert resultados.estatisticas()['entradas'] == 0
+
+
+def test_resultado_anterior_a_invalidacao_e_descartado():
+    resultados = ResultCache()
+
+    def executar():
+        # Os dados mudam enquanto a consulta roda
+        resultados.invalidate()
+        return [1]
+
+    assert resultados.get_or_execute("SELECT 1", executar) == [1]
+    assert resultados.get("SELECT 1") is None
+
+
+def test_preencher_renova_e_validade_nao_conta_acesso():
+    resultados = ResultCache()
+    assert resultados.validade("SELECT 1") == 0
+    resultados.set("SELECT 1", [1], ttl=1)
+    resultados.preencher("SELECT 1", lambda: [2], ttl=100)
+    assert 99 < resultados.validade("SELECT 1") <= 100
+    assert resultados.estatisticas()['acertos'] == 0
+    assert resultados.get("SELECT 1") == [2]
+
+
+def test_assinatura_alterada_invalida_e_avisa(banco):
+    resultados = ResultCache(intervalo_verificacao=60)
+    db_manager.on_data_change(resultados.invalidate)
+    medicoes = []
+    db_manager.on_query(medicoes.append)
+    resultados.verificar_alteracoes(forcar=True)
+    resultados.set("SELECT 1", [1])
+
+    # Dentro do intervalo não há nova consulta ao banco
+    resultados.verificar_alteracoes()
+    assert banco['consultas'] == 1
+    # Lida no primário, numa conexão sem a instrumentação de execute_query
+    assert banco['conexoes'] == [{'replica': False, 'profile': None}]
+    assert medicoes == []
+
+    banco['assinatura'] = (11, 3)
+    resultados.verificar_alteracoes(forcar=True)
+    assert resultados.get("SELECT 1") is None
+
+    # A assinatura nova vira a referência: sem escrita, não invalida de novo
+    resultados.set("SELECT 1", [1])
+    resultados.verificar_alteracoes(forcar=True)
+    assert resultados.get("SELECT 1") == [1]
@@ -0,0 +1,74 @@
+"""Testes da carga em lote via COPY"""
+
+from database import _RowStream, db_manager
+
+LINHAS = [(1, 'a\tb', None), (2, 'linha\nnova', 'barra\\'), (3, 'ok', 1.5)]
+
+
+def test_formato_texto_do_copy():
+    assert _RowStream(LINHAS).read() == (
+        "1\ta\\tb\t\\N\n"
+        "2\tlinha\\nnova\tbarra\\\\\n"
+        "3\tok\t1.5\n"
+    )
+
+
+def test_leitura_em_blocos_e_sob_demanda():
+    lidas = []
+
+    def gerar():
+        for linha in LINHAS:
+            lidas.append(linha)
+            yield linha
+
+    fluxo = _RowStream(gerar())
+    primeiro = fluxo.read(4)
+    assert primeiro == "1\ta\\"
+    assert len(lidas) == 1
+    resto = ''
+    while bloco := fluxo.read(4):
+        resto += bloco
+    assert primeiro + resto == _RowStream(LINHAS).read()
+    assert fluxo.rows == len(LINHAS)
+
+
+def _responder(sql, params):
+    if 'FROM pg_index' in sql:
+        return [('nome', 25), ('definicao', 25)], [('idx_t_nome', 'CREATE INDEX idx_t_nome ON t (nome)')]
+    if 'FROM pg_constraint' in sql:
+        return [('nome', 25), ('definicao', 25)], [('fk_t_u', 'FOREIGN KEY (id_u) REFERENCES u(id_u)')]
+    return None, []
+
+
+def test_indices_e_chaves_recriados_depois_da_carga(banco_falso, monkeypatch):
+    avisos = []
+    monkeypatch.setattr(db_manager, '_data_change_callbacks', [lambda: avisos.append(1)])
+    banco_falso.responder = _responder
+
+    estatisticas = db_manager.bulk_load_many([('t', LINHAS, ['id', 'nome', 'extra'])], truncate=True)
+
+    comandos = banco_falso.sql()
+    copia = comandos.index("COPY t (id, nome, extra) FROM STDIN")
+    assert comandos[0] == "TRUNCATE t RESTART IDENTITY"
+    assert comandos.index("DROP INDEX idx_t_nome") < copia
+    assert comandos.index("ALTER TABLE t DROP CONSTRAINT fk_t_u") < copia
+    assert comandos[copia + 1:] == [
+        "CREATE INDEX idx_t_nome ON t (nome)",
+        "ALTER TABLE t ADD CONSTRAINT fk_t_u FOREIGN KEY (id_u) REFERENCES u(id_u) NOT VALID",
+        "ALTER TABLE t VALIDATE CONSTRAINT fk_t_u",
+    ]
+    assert banco_falso.recebidos[0][1] == _RowStream(LINHAS).read()
+    assert estatisticas[0]['tabela'] == 't' and estatisticas[0]['linhas'] == len(LINHAS)
+    assert estatisticas[-1]['tabela'] == '(índices e FKs)'
+    assert avisos == [1]
+
+
+def test_carga_de_csv_sem_adiar_indices(banco_falso, tmp_path):
+    arquivo = tmp_path / 't.csv'
+    arquivo.write_text("1,a\n2,b\n", encoding='utf-8')
+    banco_falso.responder = _responder
+
+    estatistica = db_manager.bulk_load('t', arquivo, defer_indexes=False, defer_constraints=False)
+
+    assert banco_falso.sql() == ["COPY t FROM STDIN WITH (FORMAT csv)"]
+    assert estatistica['linhas'] == 2
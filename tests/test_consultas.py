@@ -0,0 +1,98 @@
+"""Testes do registro de consultas: parser das anotações e cache compilado"""
+
+import os
+
+import pytest
+
+import consultas
+from consultas import interpretar
+
+TEXTO = """
+-- @categoria: 🏢 OPERACIONAIS
+-- Consulta 1: Usuários
+-- @nome: Usuários e Perfis
+-- @ttl: 60
+-- @chave: u.id_usuario ASC
+-- @perfil: analitico
+SELECT u.nome -- comentário no fim da linha fica
+FROM usuario u;
+
+-- Consulta 2: Imóveis
+-- @moeda: diaria, total
+SELECT titulo, diaria, total FROM imovel;
+-- ==============================
+-- texto solto depois da seção não entra em nenhuma consulta
+SELECT 'fora';
+"""
+
+
+def test_interpretar_anotacoes():
+    primeira, segunda = interpretar(TEXTO)
+    assert primeira['id'] == 1 and primeira['categoria'] == '🏢 OPERACIONAIS'
+    assert primeira['titulo'] == 'Usuários' and primeira['nome'] == 'Usuários e Perfis'
+    assert primeira['ttl'] == 60.0 and primeira['perfil'] == 'analitico'
+    assert primeira['chaves'] == [['u.id_usuario', 'ASC']]
+    assert primeira['sql'] == "SELECT u.nome -- comentário no fim da linha fica\nFROM usuario u;"
+    assert segunda['moeda'] == ['diaria', 'total'] and segunda['perfil'] == 'operacional'
+    assert segunda['sql'] == "SELECT titulo, diaria, total FROM imovel;"
+
+
+def test_chave_sem_direcao_e_erro():
+    with pytest.raises(ValueError, match="@chave sem ASC/DESC"):
+        interpretar("-- Consulta 1: X\n-- @chave: u.id\nSELECT 1;")
+
+
+def test_registro_completo():
+    registro = consultas.carregar_consultas()
+    assert [consulta['id'] for consulta in registro] == list(range(1, 22))
+    assert consultas.obter_consulta(6)['sql_resumo'] is not None
+    assert sum(len(itens) for itens in consultas.consultas_por_categoria().values()) == 21
+    with pytest.raises(KeyError):
+        consultas.obter_consulta(99)
+
+
+@pytest.fixture
+def registro_limpo(monkeypatch, tmp_path):
+    """Registro sem estado do processo, com o cache compilado num diretório temporário"""
+    monkeypatch.setattr(consultas, 'CACHE_COMPILADO', tmp_path / 'consultas.json')
+    monkeypatch.setattr(consultas, '_registro', None)
+    monkeypatch.setattr(consultas, '_assinatura', None)
+    monkeypatch.setattr(consultas, '_versao', None)
+    compilacoes = []
+    compilar = consultas._compilar
+    monkeypatch.setattr(consultas, '_compilar', lambda caminhos: compilacoes.append(1) or compilar(caminhos))
+    return compilacoes
+
+
+def test_cache_compilado_reaproveitado_entre_processos(registro_limpo, monkeypatch):
+    primeiro = consultas.carregar_consultas()
+    assert consultas.carregar_consultas() is primeiro
+    assert consultas.CACHE_COMPILADO.exists()
+
+    # Outro processo: lê o JSON em vez de interpretar o SQL de novo
+    monkeypatch.setattr(consultas, '_registro', None)
+    assert consultas.carregar_consultas() == primeiro
+    assert registro_limpo == [1]
+
+
+def test_so_mtime_alterado_nao_recompila(registro_limpo, monkeypatch):
+    versao = consultas.versao_registro()
+    caminho = consultas._localizar(consultas.ARQUIVO_CONSULTAS)
+    info = caminho.stat()
+    try:
+        os.utime(caminho, ns=(info.st_atime_ns, info.st_mtime_ns + 10**9))
+        monkeypatch.setattr(consultas, '_registro', None)
+        consultas.carregar_consultas()
+        # A versão do registro acompanha o conteúdo, não o mtime
+        assert consultas.versao_registro() == versao
+    finally:
+        os.utime(caminho, ns=(info.st_atime_ns, info.st_mtime_ns))
+    assert registro_limpo == [1]
+
+
+def test_versao_muda_com_o_conteudo():
+    arquivos = {consultas.ARQUIVO_CONSULTAS: [1, 10, 'a' * 64]}
+    mesmo_conteudo = {consultas.ARQUIVO_CONSULTAS: [2, 10, 'a' * 64]}
+    alterado = {consultas.ARQUIVO_CONSULTAS: [1, 10, 'b' * 64]}
+    assert consultas._resumo_conteudo(arquivos) == consultas._resumo_conteudo(mesmo_conteudo)
+    assert consultas._resumo_conteudo(arquivos) != consultas._resumo_conteudo(alterado)
@@ -0,0 +1,77 @@
+"""Testes dos DataFrames: leitura via COPY e os mesmos dtypes em todos os caminhos"""
+
+from datetime import date
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+from database import db_manager
+
+COLUNAS = [('id', 23), ('valor', 1700), ('inicio', 1082), ('pago_em', 1114),
+           ('ativo', 16), ('titulo', 25)]
+COPIA = (
+    '1,1234.10,2024-01-31,2024-01-31 10:00:00,t,Casa\n'
+    '2,0.30,infinity,\\N,f,"Apto, centro"\n'
+    '\\N,\\N,\\N,\\N,\\N,\\N\n'
+)
+
+
+@pytest.fixture
+def banco(banco_falso):
+    banco_falso.responder = lambda sql, params: (COLUNAS, [])
+    banco_falso.copiar = lambda sql: COPIA
+    return banco_falso
+
+
+def test_numeric_como_float_e_date_como_datetime(banco):
+    df = db_manager.fetch_dataframe("SELECT * FROM t")
+    assert df['valor'].dtype == 'float64'
+    assert list(df['valor'][:2]) == [1234.10, 0.30]
+    assert round(df['valor'].sum(), 2) == 1234.40
+    assert pd.api.types.is_datetime64_any_dtype(df['inicio'])
+    assert df['inicio'][0] == pd.Timestamp('2024-01-31')
+    # 'infinity' não cabe no datetime64
+    assert pd.isna(df['inicio'][1])
+    assert pd.isna(df['valor'][2]) and pd.isna(df['inicio'][2])
+    assert df.attrs['datas'] == ['inicio']
+
+
+LINHAS = [
+    (1, Decimal('1234.10'), date(2024, 1, 31), None, True, 'Casa'),
+    (None, None, None, None, None, None),
+]
+
+
+def test_mesmos_dtypes_com_parametros_e_na_paginacao(banco):
+    por_copia = db_manager.fetch_dataframe("SELECT * FROM t")
+    banco.responder = lambda sql, params: (COLUNAS + [('_chave_0', 23)], [linha + (9,) for linha in LINHAS])
+
+    preparado = db_manager.fetch_dataframe("SELECT * FROM t WHERE id = %(id)s", {'id': 1}, prepared=True)
+    pagina, colunas, _ = db_manager.fetch_page("SELECT * FROM t", [('id', 'ASC')], limit=5, dataframe=True)
+    assert colunas == [nome for nome, _ in COLUNAS]
+    for df in (preparado.drop(columns=['_chave_0']), pagina):
+        assert dict(df.dtypes) == dict(por_copia.dtypes)
+        assert df['valor'][0] == 1234.10 and df['inicio'][0] == pd.Timestamp('2024-01-31')
+        assert df.attrs['datas'] == ['inicio']
+
+
+def test_demais_tipos(banco):
+    df = db_manager.fetch_dataframe("SELECT * FROM t")
+    assert str(df['id'].dtype) == 'Int32' and pd.isna(df['id'][2])
+    assert str(df['ativo'].dtype) == 'boolean' and list(df['ativo'][:2]) == [True, False]
+    assert pd.api.types.is_datetime64_any_dtype(df['pago_em'])
+    assert df['pago_em'][0] == pd.Timestamp('2024-01-31 10:00:00')
+    assert df['titulo'][1] == "Apto, centro"
+
+
+def test_copy_com_parametros_escapados(banco):
+    db_manager.fetch_dataframe("SELECT * FROM t WHERE id = %(id)s;", {'id': 1})
+    assert "COPY (\nSELECT * FROM t WHERE id = 1\n) TO STDOUT WITH (FORMAT csv, NULL '\\N')" in banco.sql()
+
+
+def test_resultado_vazio_mantem_as_colunas(banco):
+    banco.copiar = lambda sql: ''
+    df = db_manager.fetch_dataframe("SELECT * FROM t")
+    assert list(df.columns) == [nome for nome, _ in COLUNAS]
+    assert df.empty
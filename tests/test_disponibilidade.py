@@ -0,0 +1,72 @@
+"""Testes da busca de disponibilidade e das reservas"""
+
+from datetime import date
+
+import psycopg2.errors
+import pytest
+
+import disponibilidade
+from database import db_manager
+from disponibilidade import PeriodoIndisponivel, imoveis_disponiveis, reservar
+
+ENTRADA, SAIDA = date(2025, 3, 1), date(2025, 3, 8)
+
+
+@pytest.fixture
+def consultas(monkeypatch):
+    """Registra as chamadas a execute_query; `consultas.resposta` é o que elas devolvem"""
+    class Registro(list):
+        resposta = ([], [])
+
+    registro = Registro()
+
+    def execute_query(sql, params=None, prepared=False, **opcoes):
+        registro.append((sql, params, prepared))
+        if isinstance(registro.resposta, Exception):
+            raise registro.resposta
+        return registro.resposta
+
+    monkeypatch.setattr(db_manager, 'execute_query', execute_query)
+    monkeypatch.setattr(db_manager, '_data_change_callbacks', [])
+    return registro
+
+
+def test_busca_limitada_por_padrao(consultas):
+    consultas.resposta = ([(1, 'Casa')], ['id_imovel', 'titulo'])
+    assert imoveis_disponiveis(ENTRADA, SAIDA, 2) == [{'id_imovel': 1, 'titulo': 'Casa'}]
+    sql, params, preparada = consultas[0]
+    assert params['limite'] == disponibilidade.LIMITE_BUSCA
+    assert params['cidade'] is None and preparada
+    assert "LIMIT %(limite)s" in sql
+
+
+def test_periodo_invertido_nao_consulta(consultas):
+    with pytest.raises(ValueError, match="período inválido"):
+        imoveis_disponiveis(SAIDA, ENTRADA)
+    assert consultas == []
+
+
+def test_reserva_criada_avisa_alteracao(consultas):
+    avisos = []
+    db_manager.on_data_change(lambda: avisos.append(1))
+    consultas.resposta = ([(42,)], ['id_reserva'])
+    assert reservar(3, 1, ENTRADA, SAIDA, 2) == 42
+    assert consultas[0][1]['status'] == 'pendente'
+    assert avisos == [1]
+
+
+def test_conflito_vira_periodo_indisponivel(consultas):
+    consultas.resposta = psycopg2.errors.ExclusionViolation()
+    with pytest.raises(PeriodoIndisponivel, match="já reservado"):
+        reservar(3, 1, ENTRADA, SAIDA, 2)
+
+
+def test_imovel_que_nao_comporta(consultas):
+    consultas.resposta = ([], ['id_reserva'])
+    with pytest.raises(PeriodoIndisponivel, match="não comporta 9 hóspedes"):
+        reservar(3, 1, ENTRADA, SAIDA, 9)
+
+
+def test_status_de_reserva_invalido(consultas):
+    with pytest.raises(ValueError, match="status inválido"):
+        reservar(3, 1, ENTRADA, SAIDA, 2, status='cancelada')
@@ -0,0 +1,106 @@
+"""Testes da exportação em lote e do prazo do stream"""
+
+import csv
+import gzip
+import json
+import os
+import time
+
+import pytest
+
+import exportacao
+from database import TempoLimiteExcedido, db_manager
+
+COLUNAS = [('id', 23), ('nome', 25)]
+LINHAS = [(i, f"imóvel {i}") for i in range(1, 6)]
+
+
+@pytest.fixture
+def banco(banco_falso, monkeypatch):
+    banco_falso.responder = lambda sql, params: (COLUNAS, [] if sql.endswith("LIMIT 0") else LINHAS)
+    monkeypatch.setitem(db_manager.config, 'STREAM_ITERSIZE', '2')
+    return banco_falso
+
+
+def test_nome_arquivo():
+    assert exportacao.nome_arquivo(8, "Receita por Imóvel", 'csv.gz') == "08_receita_por_imovel.csv.gz"
+
+
+def test_csv_sempre_disponivel():
+    assert {'csv', 'csv.gz'} <= set(exportacao.formatos_disponiveis())
+
+
+@pytest.mark.parametrize("formato, abrir", [('csv', open), ('csv.gz', gzip.open)])
+def test_exporta_em_lotes(banco, tmp_path, formato, abrir):
+    caminho = tmp_path / f"saida.{formato}"
+    assert exportacao.exportar_arquivo("SELECT id, nome FROM t", str(caminho), formato) == len(LINHAS)
+    with abrir(caminho, 'rt', encoding='utf-8', newline='') as arquivo:
+        assert list(csv.reader(arquivo)) == [['id', 'nome']] + [[str(i), nome] for i, nome in LINHAS]
+
+
+def test_prazo_vencido_nao_deixa_arquivo(banco, tmp_path):
+    entrada = exportacao.exportar_consulta(1, {'titulo': 'T', 'sql': "SELECT 1"}, str(tmp_path), 'csv',
+                                           prazo=time.monotonic() - 1)
+    assert "tempo limite" in entrada['erro']
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_manifesto_do_lote(banco, tmp_path):
+    consultas = [{'titulo': 'Primeira', 'sql': "SELECT 1"}, {'titulo': 'Segunda', 'sql': "SELECT 2"}]
+    manifesto = exportacao.exportar_consultas(consultas, str(tmp_path), 'csv', trabalhadores=2)
+    gravado = json.loads((tmp_path / 'manifest.json').read_text(encoding='utf-8'))
+    assert gravado['consultas'] == manifesto['consultas']
+    assert [entrada['arquivo'] for entrada in manifesto['consultas']] == ['01_primeira.csv', '02_segunda.csv']
+    assert all(entrada['linhas'] == len(LINHAS) and entrada['erro'] is None for entrada in manifesto['consultas'])
+
+
+def test_prazo_do_stream_vale_para_o_stream_inteiro(banco):
+    lotes = db_manager.stream_query("SELECT id, nome FROM t", timeout_ms=50)
+    next(lotes)
+    # O consumidor demora: o prazo vence entre um lote e outro
+    time.sleep(0.1)
+    with pytest.raises(TempoLimiteExcedido):
+        next(lotes)
+    assert banco.cancelamentos == 1
+    assert "SET LOCAL statement_timeout = %s" in banco.sql()
+
+
+def test_stream_dentro_do_prazo_nao_cancela(banco):
+    assert sum(len(lote) for _, lote in db_manager.stream_query("SELECT 1", timeout_ms=5000)) == len(LINHAS)
+    time.sleep(0.01)
+    assert banco.cancelamentos == 0
+
+
+def _arquivo(diretorio, nome, tamanho, idade):
+    caminho = diretorio / nome
+    caminho.write_bytes(b'x' * tamanho)
+    quando = time.time() - idade
+    os.utime(caminho, (quando, quando))
+    return caminho
+
+
+def test_limpeza_por_idade(tmp_path):
+    velho = _arquivo(tmp_path, 'velho.csv', 10, idade=7200)
+    novo = _arquivo(tmp_path, 'novo.csv', 10, idade=120)
+    assert exportacao.limpar_downloads(str(tmp_path), idade_maxima=3600, espaco_maximo=10**6) == 1
+    assert not velho.exists() and novo.exists()
+
+
+def test_limpeza_por_espaco_apaga_os_mais_antigos(tmp_path):
+    antigo = _arquivo(tmp_path, 'a.csv', 100, idade=300)
+    medio = _arquivo(tmp_path, 'b.csv', 100, idade=200)
+    recente = _arquivo(tmp_path, 'c.csv', 100, idade=100)
+    # Sendo gravado agora: fica, mas ocupa espaço
+    gravando = _arquivo(tmp_path, 'd.csv', 100, idade=0)
+    assert exportacao.limpar_downloads(str(tmp_path), idade_maxima=3600, espaco_maximo=250) == 2
+    assert gravando.exists() and recente.exists()
+    assert not medio.exists() and not antigo.exists()
+
+
+def test_limpeza_sem_diretorio(tmp_path):
+    assert exportacao.limpar_downloads(str(tmp_path / 'nao_existe')) == 0
+
+
+def test_exportacao_usa_o_perfil_da_consulta(banco, tmp_path):
+    exportacao.exportar_arquivo("SELECT 1", str(tmp_path / 'saida.csv'), 'csv', perfil='analitico')
+    assert {'replica': True, 'profile': 'analitico'} in banco.conexoes
@@ -0,0 +1,56 @@
+"""Testes do gerador de dados sintéticos"""
+
+import csv
+from datetime import date
+
+import pytest
+
+from gerar_dados import HOJE, TABELAS, Gerador, interpretar_escala
+
+
+def _ler(diretorio, tabela):
+    with open(diretorio / f"{tabela}.csv", encoding='utf-8', newline='') as arquivo:
+        return list(csv.reader(arquivo))
+
+
+@pytest.mark.parametrize("texto, total", [("1k", 1_000), ("250K", 250_000), ("1.5m", 1_500_000), ("5000", 5_000)])
+def test_interpretar_escala(texto, total):
+    assert interpretar_escala(texto) == total
+
+
+def test_mesma_semente_mesmos_arquivos(tmp_path):
+    Gerador(500, semente=7).gerar(tmp_path / 'a')
+    Gerador(500, semente=7).gerar(tmp_path / 'b')
+    for tabela, _ in TABELAS:
+        assert _ler(tmp_path / 'a', tabela) == _ler(tmp_path / 'b', tabela), tabela
+
+
+def test_data_de_referencia_nao_vem_do_relogio(tmp_path):
+    assert HOJE == date(2025, 1, 1)
+    Gerador(500, hoje=date(2000, 1, 1)).gerar(tmp_path)
+    # Antes de qualquer reserva: nenhuma pendente vira confirmada, nenhuma é avaliada
+    assert _ler(tmp_path, 'avaliacao') == []
+    assert 'pendente' in {linha[6] for linha in _ler(tmp_path, 'reserva')}
+
+
+def test_reservas_ativas_nao_se_sobrepoem(tmp_path):
+    linhas = Gerador(1000).gerar(tmp_path)
+    assert linhas['reserva'] == 1000
+    periodos = {}
+    for _, _, imovel, _, inicio, fim, status in _ler(tmp_path, 'reserva'):
+        if status != 'cancelada':
+            periodos.setdefault(imovel, []).append((inicio, fim))
+    for imovel, lista in periodos.items():
+        lista.sort()
+        for (_, fim), (inicio, _) in zip(lista, lista[1:]):
+            assert fim <= inicio, imovel
+
+
+def test_chaves_estrangeiras_consistentes(tmp_path):
+    Gerador(1000).gerar(tmp_path)
+    imoveis = {linha[0] for linha in _ler(tmp_path, 'imovel')}
+    reservas = {linha[0] for linha in _ler(tmp_path, 'reserva')}
+    pagamentos = {linha[0] for linha in _ler(tmp_path, 'pagamento')}
+    assert {linha[2] for linha in _ler(tmp_path, 'reserva')} <= imoveis
+    assert {linha[1] for linha in _ler(tmp_path, 'gera')} <= reservas
+    assert {linha[0] for linha in _ler(tmp_path, 'parcela')} <= pagamentos
@@ -0,0 +1,48 @@
+"""Testes da agregação dos gráficos no servidor"""
+
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+import graficos
+from database import db_manager
+
+
+@pytest.mark.parametrize("dias, esperado", [(30, 'week'), (420, 'week'), (421, 'month'), (1826, 'month'),
+                                            (1827, 'quarter'), (5478, 'quarter'), (5479, 'year')])
+def test_agrupamento_mais_fino_que_cabe(dias, esperado):
+    inicio = date(2020, 1, 1)
+    assert graficos.escolher_agrupamento(inicio, inicio + timedelta(days=dias - 1), pontos=60) == esperado
+
+
+def test_nem_por_ano_cabe():
+    assert graficos.escolher_agrupamento(date(1900, 1, 1), date(2024, 1, 1), pontos=10) == 'year'
+
+
+def test_ocupacao_mantem_os_periodos_mais_recentes(monkeypatch):
+    consultas = []
+    monkeypatch.setattr(db_manager, 'execute_query',
+                        lambda sql, params=None, **opcoes: ([(date(1990, 1, 1), date(2024, 1, 1))], ['inicio', 'fim']))
+
+    def fetch_dataframe(sql, params=None, **opcoes):
+        consultas.append(params)
+        return pd.DataFrame({'periodo': range(40), 'confirmadas': range(40)})
+
+    monkeypatch.setattr(db_manager, 'fetch_dataframe', fetch_dataframe)
+    agrupamento, df = graficos.ocupacao_por_periodo(pontos=10)
+    assert agrupamento == 'year' and consultas == [{'agrupamento': 'year'}]
+    assert list(df['periodo']) == list(range(30, 40))
+
+
+def test_receita_reserva_uma_barra_para_outros(monkeypatch):
+    pedidos = []
+
+    def fetch_dataframe(sql, params=None, **opcoes):
+        pedidos.append(params)
+        return pd.DataFrame({'titulo': ['A'], 'receita_total': [1], 'imoveis': [1], 'grupo': [0]})
+
+    monkeypatch.setattr(db_manager, 'fetch_dataframe', fetch_dataframe)
+    df = graficos.receita_por_imovel(barras=5)
+    assert pedidos == [{'topo': 4}]
+    assert list(df.columns) == ['titulo', 'receita_total', 'imoveis']
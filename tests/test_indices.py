@@ -0,0 +1,41 @@
+"""Testes do conjunto de índices do schema"""
+
+import re
+from pathlib import Path
+
+SCHEMA = Path(__file__).resolve().parent.parent / 'SQL' / 'v2-ldi.sql'
+
+TABELA = re.compile(r"CREATE TABLE (\w+) \((.*?)\n\);", re.S)
+CHAVE_PRIMARIA = re.compile(r"^\s*(\w+) \w+ PRIMARY KEY|PRIMARY KEY \((\w+)", re.M)
+CHAVE_ESTRANGEIRA = re.compile(r"FOREIGN KEY \((\w+)\)")
+INDICE = re.compile(r"(CREATE|DROP) INDEX (?:IF EXISTS )?(\w+)(?:\s+ON (\w+) \(\(?(?:COALESCE\()?(\w+))?")
+
+
+def _indices():
+    """Índices que existem ao fim do script: nome -> (tabela, primeira coluna)"""
+    indices = {}
+    for comando, nome, tabela, coluna in INDICE.findall(SCHEMA.read_text(encoding='utf-8')):
+        if comando == 'DROP':
+            indices.pop(nome, None)
+        else:
+            assert nome not in indices, f"índice {nome} criado duas vezes"
+            indices[nome] = (tabela, coluna)
+    return indices
+
+
+def test_toda_chave_estrangeira_tem_indice():
+    iniciais = set(_indices().values())
+    for tabela, corpo in TABELA.findall(SCHEMA.read_text(encoding='utf-8')):
+        for simples, composta in CHAVE_PRIMARIA.findall(corpo):
+            iniciais.add((tabela, simples or composta))
+        for coluna in CHAVE_ESTRANGEIRA.findall(corpo):
+            assert (tabela, coluna) in iniciais, f"{tabela}.{coluna} sem índice"
+
+
+def test_indices_de_paginacao_levam_o_desempate():
+    indices = _indices()
+    assert indices['idx_reserva_inicio_id'] == ('reserva', 'data_inicio')
+    assert indices['idx_parcela_vencimento_id'] == ('parcela', 'data_vencimento')
+    assert indices['idx_pagamento_data_id'] == ('pagamento', 'data_pagamento')
+    assert indices['idx_cancelamento_data_id'] == ('cancelamento', 'data_cancelamento')
+    assert not {'idx_reserva_inicio', 'idx_parcela_vencimento', 'idx_pagamento_data', 'idx_cancelamento_data'} & set(indices)
@@ -0,0 +1,89 @@
+"""Testes da partida leve do app: importações adiadas e leitura única do .env"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import benchmark_inicializacao as benchmark
+import database
+import exportacao
+
+SAIDA_IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      1500 |       4000 | streamlit
+import time:       800 |      25000 | pandas
+import time:       300 |       9000 |     numpy
+import time:       200 |        200 | database
+"""
+
+
+def test_ler_importtime_converte_para_ms():
+    tempos = benchmark.ler_importtime(SAIDA_IMPORTTIME + "Outra linha no stderr\n")
+    assert tempos['pandas'] == (0.8, 25.0)
+    assert tempos['numpy'] == (0.3, 9.0)
+    # O cabeçalho e as linhas que não são do importtime ficam de fora
+    assert set(tempos) == {'_io', 'streamlit', 'pandas', 'numpy', 'database'}
+
+
+def test_mais_lentas_desconta_o_streamlit_e_ordena_pelo_acumulado():
+    tempos = benchmark.ler_importtime(SAIDA_IMPORTTIME)
+    base = {'_io', 'streamlit'}
+    lentas = benchmark.mais_lentas(tempos, base, quantidade=2)
+    assert [item['modulo'] for item in lentas] == ['pandas', 'numpy']
+    assert lentas[0] == {'modulo': 'pandas', 'proprio_ms': 0.8, 'acumulado_ms': 25.0}
+
+
+def test_modulos_do_app_nao_importam_dependencias_pesadas():
+    codigo = (
+        "import sys, database, exportacao, cache, consultas, graficos, instrumentacao\n"
+        "print('carregados:', ','.join(m for m in ('pandas', 'plotly', 'pyarrow', 'openpyxl') if m in sys.modules))"
+    )
+    processo = subprocess.run([sys.executable, '-c', codigo], cwd=benchmark.SRC,
+                              capture_output=True, text=True, check=True)
+    assert processo.stdout.splitlines()[-1] == 'carregados: '
+
+
+@pytest.fixture
+def ambiente(tmp_path, monkeypatch):
+    """.env temporário no lugar dos arquivos do projeto"""
+    arquivo = tmp_path / '.env'
+    monkeypatch.setattr(database, 'ARQUIVOS_ENV', (tmp_path / 'ausente.env', arquivo))
+    monkeypatch.delenv('DB_TESTE_INICIALIZACAO', raising=False)
+    database.carregar_ambiente.cache_clear()
+    yield arquivo
+    database.carregar_ambiente.cache_clear()
+    os.environ.pop('DB_TESTE_INICIALIZACAO', None)
+
+
+def test_ler_env_carrega_o_arquivo_uma_vez(ambiente):
+    ambiente.write_text("# comentário\nDB_TESTE_INICIALIZACAO = valor\n", encoding='utf-8')
+    assert database.ler_env('DB_TESTE_INICIALIZACAO') == 'valor'
+    assert database.carregar_ambiente() == str(ambiente)
+
+    # Lido uma vez por processo: mudar o arquivo depois não tem efeito
+    ambiente.write_text("DB_TESTE_INICIALIZACAO=outro\n", encoding='utf-8')
+    assert database.ler_env('DB_TESTE_INICIALIZACAO') == 'valor'
+
+
+def test_ler_env_sem_arquivo_usa_o_padrao(ambiente, capsys):
+    assert database.ler_env('DB_TESTE_INICIALIZACAO', '42') == '42'
+    assert database.carregar_ambiente() is None
+    assert ".env não encontrado" in capsys.readouterr().out
+
+
+def test_formatos_disponiveis_dependem_das_bibliotecas_instaladas(monkeypatch):
+    instaladas = {'pyarrow'}
+    monkeypatch.setattr(exportacao, '_instalado', lambda modulo: modulo in instaladas)
+    assert exportacao.formatos_disponiveis() == ['parquet', 'csv', 'csv.gz']
+    instaladas.clear()
+    assert exportacao.formatos_disponiveis() == ['csv', 'csv.gz']
+
+
+def test_instalado_nao_importa_o_modulo():
+    exportacao._instalado.cache_clear()
+    assert exportacao._instalado('json')
+    assert not exportacao._instalado('modulo_que_nao_existe_xyz')
+    assert 'modulo_que_nao_existe_xyz' not in sys.modules
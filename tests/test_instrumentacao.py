@@ -0,0 +1,41 @@
+"""Testes do histórico de tempos e do log de consultas lentas"""
+
+import json
+import logging
+import time
+
+from database import QueryTiming
+from instrumentacao import QueryLog
+
+
+def _medicao(ms, rotulo='Consulta 1'):
+    medicao = QueryTiming("SELECT 1", rotulo)
+    medicao.inicio = time.time()
+    medicao.total_ms = ms
+    return medicao
+
+
+def test_guarda_as_ultimas_por_consulta():
+    log = QueryLog(por_consulta=2, limite_lenta_ms=None)
+    for ms in (1, 2, 3):
+        log.registrar(_medicao(ms))
+    assert [registro['total_ms'] for registro in log.ultimas('Consulta 1')] == [3, 2]
+    assert log.lentas() == []
+
+
+def test_lenta_vai_para_o_logger_sem_stdout(caplog, capsys):
+    log = QueryLog(limite_lenta_ms=100, explicar=False)
+    with caplog.at_level(logging.WARNING, logger='instrumentacao'):
+        log.registrar(_medicao(50))
+        log.registrar(_medicao(150))
+    assert [registro.getMessage() for registro in caplog.records] == ["Consulta lenta (150ms): Consulta 1"]
+    assert capsys.readouterr().out == ''
+    assert log.lentas()[0]['sql'] == "SELECT 1"
+
+
+def test_lenta_gravada_no_arquivo(tmp_path):
+    arquivo = tmp_path / 'lentas.jsonl'
+    log = QueryLog(limite_lenta_ms=100, explicar=False, arquivo=str(arquivo))
+    log.registrar(_medicao(200))
+    registro = json.loads(arquivo.read_text(encoding='utf-8'))
+    assert registro['consulta'] == 'Consulta 1' and registro['total_ms'] == 200
@@ -0,0 +1,22 @@
+"""Testes da consulta de KPIs"""
+
+import re
+from collections import Counter
+
+from consultas import obter_consulta
+
+
+def test_cada_tabela_lida_uma_vez():
+    sql = obter_consulta(21)['sql']
+    tabelas = Counter(re.findall(r'\b(?:FROM|JOIN)\s+(\w+)', sql))
+    base = {nome: vezes for nome, vezes in tabelas.items() if nome not in ('reservas', 'LATERAL')}
+    assert base == {'reserva': 1, 'usuario': 1, 'anfitriao': 1, 'hospede': 1,
+                    'imovel': 1, 'pagamento': 1, 'avaliacao': 1}
+
+
+def test_metricas_tipadas_na_ordem():
+    sql = obter_consulta(21)['sql']
+    metricas = re.findall(r"\((\d+), '([^']+)', [^,]+, '(\w+)'\)", sql)
+    assert [int(ordem) for ordem, _, _ in metricas] == list(range(1, 11))
+    assert {formato for _, _, formato in metricas} == {'numero', 'moeda', 'nota'}
+    assert "CONCAT" not in sql
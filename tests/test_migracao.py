@@ -0,0 +1,149 @@
+"""Testes das migrações versionadas e da adoção de bancos criados sem elas"""
+
+import pytest
+
+from database import SCRIPTS_MIGRACAO, DatabaseManager, MigracaoInvalida, db_manager
+
+SCRIPT = """-- cabeçalho fora dos passos
+-- @migracao: reset
+DROP TABLE IF EXISTS t;
+-- @migracao: 001_tabela
+-- Tabela de exemplo
+CREATE TABLE t (id INT);
+-- @migracao: 002_dados
+INSERT INTO t VALUES (1);
+-- @migracao: consultas
+SELECT * FROM t;
+"""
+
+
+def test_passos_do_script():
+    passos = DatabaseManager._passos_migracao(SCRIPT)
+    assert [nome for nome, _ in passos] == ['reset', '001_tabela', '002_dados']
+    assert passos[1][1] == "-- Tabela de exemplo\nCREATE TABLE t (id INT);"
+
+
+def test_checksum_ignora_comentarios_e_linhas_em_branco():
+    base = DatabaseManager._checksum("CREATE TABLE t (id INT);")
+    assert DatabaseManager._checksum("-- novo comentário\n\nCREATE TABLE t (id INT);   \n") == base
+    assert DatabaseManager._checksum("CREATE TABLE t (id BIGINT);") != base
+
+
+def test_scripts_do_projeto_tem_passos_unicos():
+    nomes = [nome for script in SCRIPTS_MIGRACAO
+             for nome, _ in DatabaseManager._passos_migracao(DatabaseManager._ler_script(script))
+             if nome != 'reset']
+    assert len(nomes) == len(set(nomes))
+    assert nomes[:2] == ['001_schema', '002_dados']
+
+
+@pytest.fixture
+def script(tmp_path):
+    caminho = tmp_path / 'schema.sql'
+    caminho.write_text(SCRIPT, encoding='utf-8')
+    return str(caminho)
+
+
+def _banco(banco_falso, registrados=(), tabelas_existem=False, schema=()):
+    def responder(sql, params):
+        if sql.startswith("SELECT versao, checksum"):
+            return [('versao', 25), ('checksum', 25)], list(registrados)
+        if "to_regclass" in sql:
+            return [('existe', 16)], [(tabelas_existem,)]
+        if "information_schema.columns" in sql:
+            return [('tipo', 25), ('nome', 25)], list(schema)
+        return None, []
+    banco_falso.responder = responder
+    return banco_falso
+
+
+def _inseridos(banco):
+    return [params[0] for sql, params in banco.executados if sql.startswith("INSERT INTO schema_migracao")]
+
+
+def test_banco_novo_aplica_todos_os_passos(banco_falso, script, monkeypatch):
+    monkeypatch.setattr(db_manager, '_data_change_callbacks', [])
+    banco = _banco(banco_falso)
+    assert db_manager.migrate(scripts=(script,)) == ['001_tabela', '002_dados']
+    assert _inseridos(banco) == ['001_tabela', '002_dados']
+    assert "DROP TABLE IF EXISTS t;" not in banco.sql()
+    assert banco.sql()[0] == "SELECT pg_advisory_xact_lock(hashtext('ldi_migracao'))"
+
+
+def test_passos_aplicados_sao_pulados(banco_falso, script):
+    passos = dict(DatabaseManager._passos_migracao(SCRIPT))
+    banco = _banco(banco_falso, [('001_tabela', DatabaseManager._checksum(passos['001_tabela']))])
+    assert db_manager.migrate(scripts=(script,)) == ['002_dados']
+    assert "-- Tabela de exemplo\nCREATE TABLE t (id INT);" not in banco.sql()
+
+
+def test_passo_alterado_depois_de_aplicado(banco_falso, script):
+    _banco(banco_falso, [('001_tabela', '0' * 64)])
+    with pytest.raises(MigracaoInvalida, match="001_tabela .* mudou"):
+        db_manager.migrate(scripts=(script,))
+
+
+def test_banco_sem_controle_de_versao(banco_falso, script):
+    _banco(banco_falso, tabelas_existem=True)
+    with pytest.raises(MigracaoInvalida, match="sem controle de versão"):
+        db_manager.migrate(scripts=(script,))
+
+
+def test_reset_limpa_antes(banco_falso, script, monkeypatch):
+    monkeypatch.setattr(db_manager, '_data_change_callbacks', [])
+    banco = _banco(banco_falso)
+    db_manager.migrate(scripts=(script,), reset=True)
+    comandos = banco.sql()
+    assert comandos.index("DROP TABLE IF EXISTS t;") < comandos.index("DROP TABLE IF EXISTS schema_migracao")
+
+
+SCRIPT_ANTIGO = SCRIPT.replace("-- @migracao: consultas", """-- @migracao: 003_resumo
+CREATE TABLE resumo (id INT, total NUMERIC(10,2) CHECK (total >= 0), CONSTRAINT pk PRIMARY KEY (id));
+-- @migracao: consultas""")
+
+
+def test_objetos_do_passo():
+    assert DatabaseManager._objetos_passo(
+        "CREATE TYPE e AS ENUM ('a', 'b');\n"
+        "CREATE TABLE r (\n  id INT, -- comentário, com vírgula\n  p DATERANGE GENERATED ALWAYS AS (daterange(a, b, '[)')) STORED,\n"
+        "  CONSTRAINT ex EXCLUDE USING gist (id WITH =, p WITH &&)\n);\nCREATE INDEX i ON r (id);"
+    ) == [('tipo', 'e'), ('tabela', 'r'), ('coluna', 'r.id'), ('coluna', 'r.p')]
+    # Índices contam só num passo sem tabelas nem tipos; passo de dados não tem objetos
+    assert DatabaseManager._objetos_passo("DROP INDEX IF EXISTS a;\nCREATE INDEX b ON r (id);") == [('índice', 'b')]
+    assert DatabaseManager._objetos_passo("INSERT INTO r VALUES (1);") == []
+
+
+def test_schema_do_projeto_confere_colunas():
+    passos = dict(DatabaseManager._passos_migracao(DatabaseManager._ler_script(SCRIPTS_MIGRACAO[0])))
+    objetos = DatabaseManager._objetos_passo(passos['001_schema'])
+    assert ('coluna', 'reserva.periodo') in objetos and ('tipo', 'enum_forma_pagamento') in objetos
+    assert not any(nome.endswith('.constraint') for _, nome in objetos)
+
+
+@pytest.fixture
+def script_antigo(tmp_path):
+    caminho = tmp_path / 'schema.sql'
+    caminho.write_text(SCRIPT_ANTIGO, encoding='utf-8')
+    return str(caminho)
+
+
+def test_adotar_registra_o_schema_existente_sem_executar(banco_falso, script_antigo, monkeypatch):
+    monkeypatch.setattr(db_manager, '_data_change_callbacks', [])
+    banco = _banco(banco_falso, tabelas_existem=True, schema=[('tabela', 't'), ('coluna', 't.id')])
+    assert db_manager.migrate(scripts=(script_antigo,), adopt=True) == [
+        '001_tabela (adotado)', '002_dados (adotado)', '003_resumo'
+    ]
+    assert _inseridos(banco) == ['001_tabela', '002_dados', '003_resumo']
+    comandos = banco.sql()
+    # Nada do schema nem dos dados antigos é executado de novo
+    assert not any("CREATE TABLE t" in sql or "INSERT INTO t" in sql for sql in comandos)
+    assert any("CREATE TABLE resumo" in sql for sql in comandos)
+
+
+def test_adotar_recusa_schema_incompleto(banco_falso, script_antigo):
+    passos = dict(DatabaseManager._passos_migracao(SCRIPT_ANTIGO))
+    _banco(banco_falso, tabelas_existem=True, schema=[('tabela', 't'), ('coluna', 't.id'), ('tabela', 'resumo'),
+                                                      ('coluna', 'resumo.id')])
+    assert DatabaseManager._objetos_passo(passos['003_resumo'])[-1] == ('coluna', 'resumo.total')
+    with pytest.raises(MigracaoInvalida, match="003_resumo .* só em parte .*coluna resumo.total"):
+        db_manager.migrate(scripts=(script_antigo,), adopt=True)
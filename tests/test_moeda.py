@@ -0,0 +1,30 @@
+"""Testes dos valores em reais tipados"""
+
+import re
+
+import pytest
+
+from consultas import carregar_consultas, interpretar
+
+
+def test_nenhuma_consulta_formata_reais_no_sql():
+    for consulta in carregar_consultas():
+        for sql in (consulta['sql'], consulta['sql_resumo'] or ''):
+            assert "R$" not in sql, consulta['id']
+
+
+def test_colunas_de_moeda_existem_na_consulta():
+    for consulta in carregar_consultas():
+        for sql in filter(None, (consulta['sql'], consulta['sql_resumo'])):
+            for coluna in consulta['moeda']:
+                assert re.search(rf'\b{coluna}\b', sql), (consulta['id'], coluna)
+
+
+@pytest.mark.parametrize("linhas, esperado", [
+    (["-- @moeda: valor"], ['valor']),
+    (["-- @moeda: valor, total", "-- @moeda: multa"], ['valor', 'total', 'multa']),
+    (["-- @moeda: valor,"], ['valor']),
+])
+def test_anotacao_moeda_acumula(linhas, esperado):
+    consulta, = interpretar("\n".join(["-- Consulta 1: X", *linhas, "SELECT 1 AS valor;"]))
+    assert consulta['moeda'] == esperado
@@ -0,0 +1,113 @@
+"""Testes da paginação por keyset"""
+
+import pytest
+
+from consultas import consultas_por_categoria
+from database import DatabaseManager, db_manager
+
+CHAVES = [('r.data_inicio', 'DESC'), ('r.id_reserva', 'DESC')]
+
+
+def test_clausulas_so_do_nivel_externo():
+    sql = """
+    SELECT a, (SELECT MAX(x) FROM u WHERE u.id = t.id) AS m, 'texto FROM' AS s, "ORDER BY" AS q
+    FROM t -- WHERE comentado
+    /* GROUP BY comentado */
+    WHERE a > 1
+    ORDER BY a
+    """
+    nomes = [nome for nome, _, _ in DatabaseManager._clausulas(sql)]
+    assert nomes == ['SELECT', 'FROM', 'WHERE', 'ORDER BY']
+
+
+def test_clausulas_nao_confundem_identificadores():
+    nomes = [nome for nome, _, _ in DatabaseManager._clausulas("SELECT from_x, t.limit FROM t")]
+    assert nomes == ['SELECT', 'FROM']
+
+
+@pytest.mark.parametrize("sql, esperado", [
+    ("SELECT a FROM t ORDER BY a;", "SELECT a FROM t"),
+    ("SELECT a FROM t ORDER BY a LIMIT 5", "SELECT a FROM t ORDER BY a LIMIT 5"),
+    ("SELECT a FROM (SELECT a FROM t ORDER BY a) s", "SELECT a FROM (SELECT a FROM t ORDER BY a) s"),
+    # Comentários de bloco e de linha não abrem parênteses nem escondem cláusulas
+    ("SELECT a FROM t /* ORDER BY ( */ ORDER BY a", "SELECT a FROM t /* ORDER BY ( */"),
+    ("SELECT a FROM t ORDER BY a /* LIMIT 1 */", "SELECT a FROM t"),
+    ("SELECT a FROM t ORDER BY a -- LIMIT 1", "SELECT a FROM t"),
+    ('SELECT "ORDER BY" FROM t', 'SELECT "ORDER BY" FROM t'),
+    ("SELECT 'it''s' AS x FROM t ORDER BY x", "SELECT 'it''s' AS x FROM t"),
+])
+def test_strip_order_by(sql, esperado):
+    assert DatabaseManager._strip_order_by(sql) == esperado
+
+
+def test_filtro_mesma_direcao_usa_comparacao_de_linha():
+    filtro, valores = DatabaseManager._keyset_filter(CHAVES, ('2024-01-01', 7))
+    assert filtro == "(r.data_inicio, r.id_reserva) < (%(_apos_0)s, %(_apos_1)s)"
+    assert valores == {'_apos_0': '2024-01-01', '_apos_1': 7}
+
+
+def test_filtro_direcoes_mistas():
+    filtro, _ = DatabaseManager._keyset_filter([('a', 'ASC'), ('b', 'DESC')], (1, 2))
+    assert filtro == "((a > %(_apos_0)s) OR (a = %(_apos_0)s AND b < %(_apos_1)s))"
+
+
+def test_pagina_leva_filtro_e_ordem_para_a_consulta():
+    sql = "SELECT r.status FROM reserva r WHERE r.status = 'a' OR r.status = 'b' ORDER BY r.data_inicio DESC"
+    consulta = DatabaseManager._consulta_pagina(sql, CHAVES, "FILTRO")
+    # Sem subconsulta: o índice sobre as chaves atende o filtro e a ordem
+    assert "AS pagina" not in consulta
+    assert ", r.data_inicio AS _chave_0, r.id_reserva AS _chave_1\nFROM reserva r" in consulta
+    # O WHERE original fica entre parênteses: o OR não escapa do filtro
+    assert "WHERE FILTRO\n  AND (\nr.status = 'a' OR r.status = 'b'\n)" in consulta
+    assert consulta.endswith("ORDER BY r.data_inicio DESC, r.id_reserva DESC")
+    assert consulta.count("ORDER BY") == 1
+
+
+def test_pagina_sem_where_filtra_antes_do_group_by():
+    sql = "SELECT p.id, COUNT(*) FROM pagamento p GROUP BY p.id"
+    consulta = DatabaseManager._consulta_pagina(sql, [('p.id', 'ASC')], "FILTRO")
+    assert consulta.index("WHERE FILTRO") < consulta.index("GROUP BY")
+
+
+def test_pagina_de_union_vira_subconsulta():
+    sql = "SELECT id FROM a UNION ALL SELECT id FROM b ORDER BY id"
+    consulta = DatabaseManager._consulta_pagina(sql, [('id', 'ASC')], "FILTRO")
+    assert consulta.startswith("SELECT pagina.*, id AS _chave_0 FROM (\nSELECT id FROM a UNION ALL SELECT id FROM b\n)")
+    assert consulta.endswith("WHERE FILTRO\nORDER BY _chave_0 ASC")
+
+
+def test_consultas_paginadas_tem_chaves_na_propria_consulta():
+    for itens in consultas_por_categoria().values():
+        for consulta in itens.values():
+            if not consulta['chaves']:
+                continue
+            pagina = DatabaseManager._consulta_pagina(consulta['sql'], consulta['chaves'], "FILTRO")
+            uniao = 'UNION' in [nome for nome, _, _ in DatabaseManager._clausulas(consulta['sql'])]
+            assert ("AS pagina" in pagina) == uniao, consulta['id']
+
+
+def test_fetch_page_devolve_pagina_e_proxima_chave(banco_falso):
+    linhas = [(f"status {i}", f"2024-01-{10 - i:02d}", 100 - i) for i in range(4)]
+    banco_falso.responder = lambda sql, params: ([('status', 25), ('_chave_0', 1082), ('_chave_1', 23)], linhas)
+
+    resultado, colunas, proxima = db_manager.fetch_page(
+        "SELECT r.status FROM reserva r", CHAVES, limit=3
+    )
+    assert resultado == [("status 0",), ("status 1",), ("status 2",)]
+    assert colunas == ['status']
+    assert proxima == ("2024-01-08", 98)
+    sql, valores = banco_falso.executados[-1]
+    assert valores == {'_limite': 4}
+
+    db_manager.fetch_page("SELECT r.status FROM reserva r", CHAVES, after=proxima, limit=3)
+    sql, valores = banco_falso.executados[-1]
+    assert "WHERE (r.data_inicio, r.id_reserva) < (%(_apos_0)s, %(_apos_1)s)" in sql
+    assert valores['_apos_0'] == "2024-01-08" and valores['_apos_1'] == 98
+
+
+def test_fetch_page_ultima_pagina(banco_falso):
+    banco_falso.responder = lambda sql, params: ([('status', 25), ('_chave_0', 1082), ('_chave_1', 23)],
+                                                 [("a", "2024-01-01", 1)])
+    resultado, _, proxima = db_manager.fetch_page("SELECT r.status FROM reserva r", CHAVES, limit=3)
+    assert resultado == [("a",)]
+    assert proxima is None
@@ -0,0 +1,94 @@
+"""Testes das consultas parametrizadas e dos comandos preparados"""
+
+import re
+
+import pytest
+
+from conftest import BancoFalso, ConexaoFalsa
+from consultas import argumentos, obter_consulta, parametrizar
+from database import DatabaseManager
+
+
+def _parametros(*pares):
+    return [{'nome': nome, 'tipo': tipo, 'padrao': None} for nome, tipo in pares]
+
+
+def test_marcador_vira_coalesce_com_o_padrao():
+    parametros = _parametros(('status', 'text'), ('inicio', 'date'), ('limite', 'int'))
+    sql, usados = parametrizar(
+        "SELECT * FROM r WHERE r.status = /*:status*/'it''s' AND r.inicio >= /*:inicio*/DATE '2024-01-01'"
+        " AND r.n < /*:limite*/(10 + 1) AND r.nome LIKE 'a%'",
+        parametros,
+    )
+    assert sql == (
+        "SELECT * FROM r WHERE r.status = COALESCE(%(status)s::text, 'it''s')"
+        " AND r.inicio >= COALESCE(%(inicio)s::date, DATE '2024-01-01')"
+        " AND r.n < COALESCE(%(limite)s::int, (10 + 1)) AND r.nome LIKE 'a%%'"
+    )
+    assert usados == {'status', 'inicio', 'limite'}
+    assert [parametro['padrao'] for parametro in parametros] == ["'it''s'", "DATE '2024-01-01'", "(10 + 1)"]
+
+
+def test_marcador_repetido_e_padrao_palavra():
+    sql, _ = parametrizar("SELECT /*:n*/NULL, /*:n*/NULL", _parametros(('n', 'int')))
+    assert sql == "SELECT COALESCE(%(n)s::int, NULL), COALESCE(%(n)s::int, NULL)"
+
+
+@pytest.mark.parametrize("sql, erro", [
+    ("SELECT /*:x*/1", "sem @parametro"),
+    ("SELECT /*:n*/'aberta", "sem fechamento"),
+    ("SELECT /*:n*/(1", "parênteses sem fechamento"),
+    ("SELECT /*:n*/", "sem valor padrão"),
+])
+def test_marcadores_invalidos(sql, erro):
+    with pytest.raises(ValueError, match=erro):
+        parametrizar(sql, _parametros(('n', 'int')))
+
+
+def test_argumentos_preenche_os_ausentes_com_none():
+    consulta = {'parametros': _parametros(('inicio', 'date'), ('fim', 'date'))}
+    assert argumentos(consulta, {'fim': '2024-02-01', 'outro': 1}) == {'inicio': None, 'fim': '2024-02-01'}
+
+
+def test_registro_guarda_versao_parametrizada():
+    consulta = obter_consulta(3)
+    assert [parametro['nome'] for parametro in consulta['parametros']] == ['status']
+    assert "COALESCE(%(status)s::text, " in consulta['sql_parametrizado']
+    assert "/*:" not in consulta['sql_parametrizado']
+
+
+def test_prepare_uma_vez_por_conexao():
+    gerenciador = DatabaseManager()
+    banco = BancoFalso()
+    conn = ConexaoFalsa(banco)
+    sql = "SELECT * FROM r WHERE a = %(a)s AND b = %(b)s AND c = %(a)s AND d LIKE 'x%%'"
+
+    with conn.cursor() as cursor:
+        primeiro = gerenciador._preparar(conn, cursor, sql, {'a': 1, 'b': 2})
+        segundo = gerenciador._preparar(conn, cursor, sql, {'a': 3, 'b': 4})
+
+    prepares = [comando for comando, _ in banco.executados]
+    assert len(prepares) == 1
+    assert re.fullmatch(r"PREPARE ldi_\d+ AS\nSELECT \* FROM r WHERE a = \$1 AND b = \$2 AND c = \$1 "
+                        r"AND d LIKE 'x%'\n", prepares[0])
+    nome = prepares[0].split()[1]
+    assert primeiro == (f"EXECUTE {nome} (%s, %s)", [1, 2])
+    assert segundo == (f"EXECUTE {nome} (%s, %s)", [3, 4])
+
+    # Outra conexão prepara de novo
+    outra = ConexaoFalsa(banco)
+    with outra.cursor() as cursor:
+        gerenciador._preparar(outra, cursor, sql, {'a': 1, 'b': 2})
+    assert len(banco.executados) == 2
+
+
+def test_erro_na_transacao_refaz_os_prepares():
+    gerenciador = DatabaseManager()
+    banco = BancoFalso()
+    conn = ConexaoFalsa(banco)
+    with conn.cursor() as cursor:
+        gerenciador._preparar(conn, cursor, "SELECT 1", {})
+        gerenciador._invalidar_preparados(conn)
+        assert gerenciador._preparar(conn, cursor, "SELECT 1", {})[1] is None
+    comandos = [comando.split()[0] for comando, _ in banco.executados]
+    assert comandos == ['PREPARE', 'DEALLOCATE', 'PREPARE']
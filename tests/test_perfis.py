@@ -0,0 +1,140 @@
+"""Testes dos perfis de execução, do cancelamento e dos tempos limite"""
+
+import threading
+
+import psycopg2.errors
+import pytest
+
+from aquecimento import PERFIL_AQUECIMENTO
+from conftest import BancoFalso, ConexaoFalsa, CursorFalso
+from database import (DatabaseManager, PERFIS_EXECUCAO, ConsultaCancelada,
+                      TempoLimiteExcedido, db_manager)
+
+
+class ConexaoPerfil(ConexaoFalsa):
+    def __init__(self, banco):
+        super().__init__(banco)
+        self.confirmada = False
+        self.desfeita = False
+
+    def commit(self):
+        self.confirmada = True
+
+    def rollback(self):
+        self.desfeita = True
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def gerenciador(monkeypatch):
+    manager = DatabaseManager()
+    manager._config = manager._load_config()
+    banco = BancoFalso()
+    monkeypatch.setattr(manager, '_abrir', lambda replica=None: (ConexaoPerfil(banco), None))
+    monkeypatch.setattr(manager, '_ESPERA_VAGA', 0.01)
+    return manager, banco
+
+
+def test_perfil_aplicado_so_a_transacao(gerenciador):
+    manager, banco = gerenciador
+    with manager.connection(profile='analitico') as conn:
+        pass
+    sql, valores = banco.executados[0]
+    assert sql.count("set_config(%s, %s, true)") == len(PERFIS_EXECUCAO['analitico']['parametros'])
+    assert valores[:2] == ['statement_timeout', '60s']
+    assert conn.confirmada
+
+
+def test_perfil_desconhecido(gerenciador):
+    manager, _ = gerenciador
+    with pytest.raises(ValueError):
+        with manager.connection(profile='inexistente'):
+            pass
+
+
+def test_analiticas_esgotadas_nao_bloqueiam_o_aquecimento(gerenciador):
+    manager, _ = gerenciador
+    vagas = manager._vagas_perfil('analitico')
+    for _ in range(PERFIS_EXECUCAO['analitico']['simultaneas']):
+        assert vagas.acquire(blocking=False)
+    try:
+        with pytest.raises(ConnectionError, match="perfil 'analitico'"):
+            with manager.connection(profile='analitico'):
+                pass
+        # Vagas próprias: o aquecimento não depende das analíticas nem as ocupa
+        with manager.connection(profile=PERFIL_AQUECIMENTO):
+            pass
+        assert manager._vagas_perfil(PERFIL_AQUECIMENTO) is not vagas
+    finally:
+        for _ in range(PERFIS_EXECUCAO['analitico']['simultaneas']):
+            vagas.release()
+
+
+def test_perfil_do_aquecimento_nao_usa_paralelismo():
+    parametros = PERFIS_EXECUCAO[PERFIL_AQUECIMENTO]['parametros']
+    assert parametros['max_parallel_workers_per_gather'] == '0'
+    assert parametros['jit'] == 'off'
+    assert PERFIS_EXECUCAO[PERFIL_AQUECIMENTO]['simultaneas']
+
+
+def test_cancelar_interrompe_a_conexao_em_uso(gerenciador):
+    manager, banco = gerenciador
+    with manager.cancellable('token'):
+        with pytest.raises(ConsultaCancelada):
+            with manager.connection():
+                assert manager.cancel('token') == 1
+                raise psycopg2.errors.QueryCanceled()
+        # Depois do cancelamento, novas conexões do mesmo bloco falham na hora
+        with pytest.raises(ConsultaCancelada):
+            with manager.connection():
+                pass
+    assert banco.cancelamentos == 1
+    assert manager._em_execucao == {}
+
+
+def test_tempo_limite_do_perfil(gerenciador):
+    manager, _ = gerenciador
+    with pytest.raises(TempoLimiteExcedido, match="60s do perfil 'analitico'"):
+        with manager.connection(profile='analitico'):
+            raise psycopg2.errors.QueryCanceled()
+
+
+def test_previa_usa_o_perfil_pedido(banco_falso):
+    banco_falso.responder = lambda sql, params: ([('id', 23)], [(1,)])
+    db_manager.preview_query("SELECT id FROM t", limit=5, profile='analitico')
+    assert banco_falso.conexoes == [{'replica': True, 'profile': 'analitico'}]
+
+
+class ConexaoLenta(ConexaoPerfil):
+    """FETCH que só termina quando a conexão é cancelada"""
+
+    def __init__(self, banco):
+        super().__init__(banco)
+        self.cancelada = threading.Event()
+
+    def cancel(self):
+        super().cancel()
+        self.cancelada.set()
+
+    def cursor(self, name=None):
+        conexao = self
+
+        class CursorLento(CursorFalso):
+            def fetchmany(self, quantidade):
+                assert conexao.cancelada.wait(5)
+                raise psycopg2.errors.QueryCanceled()
+
+        return CursorLento(self.banco, name)
+
+
+def test_prazo_do_stream_no_erro_do_cancelamento(gerenciador, monkeypatch):
+    manager, banco = gerenciador
+    banco.responder = lambda sql, params: ([('id', 23)], [(1,)])
+    monkeypatch.setattr(manager, '_abrir', lambda replica=None: (ConexaoLenta(banco), None))
+    lotes = manager.stream_query("SELECT id FROM t", timeout_ms=50, profile='analitico')
+    # O FETCH cancelado pelo relógio do stream não é atribuído ao limite de 60s do perfil
+    with pytest.raises(TempoLimiteExcedido, match="stream passou do tempo limite de 50ms"):
+        next(lotes)
+    assert banco.cancelamentos == 1
@@ -0,0 +1,120 @@
+"""Testes do pool de conexões do DatabaseManager"""
+
+import time
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+from database import ConnectionPool
+
+
+class ConexaoFalsa:
+    """Imita o necessário de uma conexão psycopg2 para o pool"""
+
+    def __init__(self, quebrada=False):
+        self.closed = 0
+        self.quebrada = quebrada
+        self.autocommit = False
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        conexao = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *erro):
+                return False
+
+            def execute(self, sql, params=None):
+                if conexao.quebrada:
+                    raise psycopg2.OperationalError("conexão perdida")
+
+        return Cursor()
+
+    def close(self):
+        self.closed = 1
+
+
+def criar_pool(**opcoes):
+    abertas = []
+
+    def conectar():
+        conn = ConexaoFalsa()
+        abertas.append(conn)
+        return conn
+
+    return ConnectionPool(conectar, **opcoes), abertas
+
+
+def test_abre_o_minimo_na_criacao():
+    pool, abertas = criar_pool(minimo=2, maximo=4)
+    assert len(abertas) == 2
+    assert pool.estatisticas() == {'livres': 2, 'em_uso': 0, 'maximo': 4}
+
+
+def test_reaproveita_conexao_devolvida():
+    pool, abertas = criar_pool(minimo=0, maximo=2)
+    conn = pool.obter()
+    pool.devolver(conn)
+    assert pool.obter() is conn
+    assert len(abertas) == 1
+
+
+def test_esgotado_falha_depois_do_timeout():
+    pool, _ = criar_pool(minimo=0, maximo=1, timeout=0.05)
+    pool.obter()
+    inicio = time.monotonic()
+    with pytest.raises(ConnectionError, match="esgotado"):
+        pool.obter()
+    assert time.monotonic() - inicio >= 0.05
+
+
+def test_transacao_aberta_e_desfeita_na_devolucao():
+    pool, _ = criar_pool(minimo=0, maximo=1)
+    conn = pool.obter()
+    conn.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+    pool.devolver(conn)
+    assert conn.rollbacks == 1
+    assert pool.estatisticas()['livres'] == 1
+
+
+def test_conexao_quebrada_e_substituida():
+    pool, abertas = criar_pool(minimo=0, maximo=1)
+    conn = pool.obter()
+    pool.devolver(conn)
+    conn.quebrada = True
+    nova = pool.obter()
+    assert nova is not conn
+    assert conn.closed
+    assert len(abertas) == 2
+
+
+def test_descarta_ociosas_alem_do_minimo():
+    pool, _ = criar_pool(minimo=1, maximo=3, tempo_ocioso=0.01)
+    conexoes = [pool.obter(), pool.obter()]
+    for conn in conexoes:
+        pool.devolver(conn)
+    time.sleep(0.02)
+    pool.obter()
+    # Uma foi emprestada e a outra, ociosa além do mínimo, foi fechada
+    assert pool.estatisticas()['livres'] == 0
+    assert sum(conn.closed for conn in conexoes) == 1
+
+
+def test_fechado_recusa_emprestimos():
+    pool, abertas = criar_pool(minimo=1, maximo=1)
+    pool.fechar()
+    assert abertas[0].closed
+    with pytest.raises(ConnectionError, match="fechado"):
+        pool.obter()
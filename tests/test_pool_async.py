@@ -0,0 +1,107 @@
+"""Testes do pool de conexões assíncronas"""
+
+import asyncio
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+from database_async import AsyncConnectionPool
+
+
+class ConexaoAssincronaFalsa:
+    """Conexão assíncrona cujas operações terminam no primeiro poll()"""
+
+    def __init__(self):
+        self.closed = 0
+        self.executando = False
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        self.comandos = []
+
+    def poll(self):
+        return psycopg2.extensions.POLL_OK
+
+    def isexecuting(self):
+        return self.executando
+
+    def get_transaction_status(self):
+        return self.status
+
+    def cursor(self):
+        conexao = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *erro):
+                return False
+
+            def execute(self, sql, params=None):
+                conexao.comandos.append(sql)
+                if sql == "ROLLBACK":
+                    conexao.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+        return Cursor()
+
+    def close(self):
+        self.closed = 1
+
+
+def criar_pool(**opcoes):
+    abertas = []
+
+    async def conectar():
+        abertas.append(ConexaoAssincronaFalsa())
+        return abertas[-1]
+
+    return AsyncConnectionPool(conectar, **opcoes), abertas
+
+
+def test_reaproveita_conexao_devolvida():
+    async def cenario():
+        pool, abertas = criar_pool(maximo=2)
+        conn = await pool.obter()
+        await pool.devolver(conn)
+        assert await pool.obter() is conn
+        assert len(abertas) == 1
+        assert conn.comandos == ["SELECT 1"]
+
+    asyncio.run(cenario())
+
+
+def test_esgotado_espera_e_falha():
+    async def cenario():
+        pool, _ = criar_pool(maximo=1, timeout=0.01)
+        await pool.obter()
+        with pytest.raises(ConnectionError):
+            await pool.obter()
+
+    asyncio.run(cenario())
+
+
+def test_desfaz_transacao_e_descarta_consulta_interrompida():
+    async def cenario():
+        pool, _ = criar_pool(maximo=2)
+        em_transacao, interrompida = await pool.obter(), await pool.obter()
+        em_transacao.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        interrompida.executando = True
+        await pool.devolver(em_transacao)
+        await pool.devolver(interrompida)
+        assert em_transacao.comandos == ["ROLLBACK"] and not em_transacao.closed
+        assert interrompida.closed
+        assert pool.estatisticas() == {'livres': 1, 'em_uso': 0, 'maximo': 2}
+
+    asyncio.run(cenario())
+
+
+def test_descarta_ociosa_alem_do_tempo():
+    async def cenario():
+        pool, abertas = criar_pool(tempo_ocioso=0)
+        conn = await pool.obter()
+        await pool.devolver(conn)
+        await asyncio.sleep(0.01)
+        assert await pool.obter() is not conn
+        assert conn.closed and len(abertas) == 2
+
+    asyncio.run(cenario())
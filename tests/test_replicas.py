@@ -0,0 +1,145 @@
+"""Testes do roteamento de leituras para as réplicas"""
+
+import asyncio
+import threading
+
+import pytest
+
+from database import DatabaseManager
+from database_async import AsyncDatabaseManager
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT COUNT(*), COALESCE(SUM(valor), 0) FROM pagamento",
+    "-- comentário\nWITH t AS (SELECT 1) SELECT * FROM t",
+    "SELECT TO_CHAR(DATE_TRUNC('month', data), 'YYYY-MM') FROM reserva",
+    # Lista de colunas de alias não é chamada de função
+    "SELECT u.total FROM (SELECT COUNT(*) FROM usuario) AS u(total)",
+    # Texto entre aspas e comentários não contam
+    "SELECT 'atualizar_resumos()' AS nome /* marcar_resumo_meses( */ FROM t",
+    "SELECT 'copiar INTO' AS texto FROM t -- INTO",
+])
+def test_leituras_vao_para_a_replica(sql):
+    assert DatabaseManager.is_read_only(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT atualizar_resumos()",
+    "SELECT reconstruir_resumos ( )",
+    "SELECT public.minha_funcao(1) FROM t",
+    "SELECT nextval('reserva_id_reserva_seq')",
+    "SELECT * FROM reserva FOR UPDATE",
+    "WITH novo AS (INSERT INTO t VALUES (1) RETURNING id) SELECT id FROM novo",
+    "UPDATE reserva SET status = 'x'",
+    # SELECT ... INTO cria uma tabela
+    "SELECT * INTO novo FROM reserva",
+    "WITH r AS (SELECT 1 AS id) SELECT id\ninto TEMP copia FROM r",
+])
+def test_escritas_e_funcoes_desconhecidas_ficam_no_primario(sql):
+    assert not DatabaseManager.is_read_only(sql)
+
+
+class ConexaoAtraso:
+    def __init__(self, atraso, liberar):
+        self.atraso = atraso
+        self.liberar = liberar
+
+    def cursor(self):
+        conexao = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *erro):
+                return False
+
+            def execute(self, sql, params=None):
+                conexao.liberar.wait(5)
+
+            def fetchone(self):
+                return (conexao.atraso,)
+
+        return Cursor()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def gerenciador():
+    manager = DatabaseManager()
+    manager._config = dict(manager._load_config(), REPLICAS='r1:5433,r2', REPLICA_MAX_LAG='5',
+                           REPLICA_CHECK_INTERVAL='60', REPLICA_ROUTING='round_robin')
+    return manager
+
+
+def aguardar_verificacoes():
+    for thread in threading.enumerate():
+        if thread.name.startswith('replica-'):
+            thread.join(5)
+
+
+def test_verificacao_do_atraso_nao_bloqueia_a_leitura(gerenciador, monkeypatch):
+    liberar = threading.Event()
+    atrasos = {'r1': 1.0, 'r2': 30.0}
+    monkeypatch.setattr(gerenciador, 'get_connection',
+                        lambda replica=None: ConexaoAtraso(atrasos[replica['host']], liberar))
+
+    # A medição está parada no banco: a escolha não espera e vai para o primário
+    assert gerenciador.choose_replica() is None
+    liberar.set()
+    aguardar_verificacoes()
+
+    # Medida a réplica em dia; a atrasada fica de fora, e nada é medido de novo antes do intervalo
+    assert [gerenciador.choose_replica()['nome'] for _ in range(3)] == ['r1:5433'] * 3
+    assert not any(thread.name.startswith('replica-') for thread in threading.enumerate())
+    assert [replica['atraso'] for replica in gerenciador.replicas_status()] == [1.0, 30.0]
+
+
+def test_replica_fora_do_ar_fica_de_fora(gerenciador, monkeypatch):
+    def recusar(replica=None):
+        raise ConnectionError("fora do ar")
+
+    monkeypatch.setattr(gerenciador, 'get_connection', recusar)
+    gerenciador.choose_replica()
+    aguardar_verificacoes()
+    assert gerenciador.choose_replica() is None
+    assert all(replica['atraso'] is None for replica in gerenciador.replicas_status())
+
+
+class PoolFalso:
+    def __init__(self, nome, falhar=False):
+        self.nome = nome
+        self.falhar = falhar
+        self.devolvidas = []
+
+    async def obter(self):
+        if self.falhar:
+            raise ConnectionError("fora do ar")
+        return self.nome
+
+    async def devolver(self, conn, descartar=False):
+        self.devolvidas.append(conn)
+
+
+def test_async_usa_a_replica_escolhida_e_volta_ao_primario(gerenciador, monkeypatch):
+    replica = gerenciador._lista_replicas()[0]
+    monkeypatch.setattr(gerenciador, 'choose_replica', lambda: replica)
+    assincrono = AsyncDatabaseManager(gerenciador)
+    pools = {None: PoolFalso('primario'), 'r1:5433': PoolFalso('replica')}
+    monkeypatch.setattr(assincrono, 'get_pool', lambda destino=None: pools[destino and destino['nome']])
+
+    async def usar(replica_):
+        async with assincrono.connection(replica_) as conn:
+            return conn, replica['em_uso']
+
+    assert asyncio.run(usar(True)) == ('replica', 1)
+    assert asyncio.run(usar(False)) == ('primario', 0)
+    assert replica['em_uso'] == 0 and replica['consultas'] == 1
+
+    # Réplica fora do ar: a leitura vai ao primário e a réplica fica de lado
+    pools['r1:5433'].falhar = True
+    replica['atraso'] = 0.0
+    assert asyncio.run(usar(True)) == ('primario', 0)
+    assert replica['atraso'] is None
@@ -0,0 +1,44 @@
+"""Testes da camada analítica (tabelas de resumo)"""
+
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import graficos
+from database import db_manager
+
+
+@pytest.fixture
+def avisos(monkeypatch):
+    chamadas = []
+    monkeypatch.setattr(db_manager, '_data_change_callbacks', [lambda: chamadas.append(1)])
+    return chamadas
+
+
+@pytest.mark.parametrize("atualizadas, avisou", [(0, False), (3, True)])
+def test_refresh_so_avisa_quando_recalcula(banco_falso, avisos, atualizadas, avisou):
+    banco_falso.responder = lambda sql, params: ([('atualizar_resumos', 23)], [(atualizadas,)])
+    assert db_manager.refresh_analytics() == atualizadas
+    assert banco_falso.sql() == ["SELECT atualizar_resumos()"]
+    assert bool(avisos) == avisou
+
+
+def test_refresh_completo_reconstroi(banco_falso, avisos):
+    banco_falso.responder = lambda sql, params: ([('reconstruir_resumos', 23)], [(0,)])
+    db_manager.refresh_analytics(full=True)
+    assert banco_falso.sql() == ["SELECT reconstruir_resumos()"]
+
+
+def test_graficos_so_leem(monkeypatch):
+    def proibido(*args, **kwargs):
+        raise AssertionError("leitura não deve atualizar os resumos")
+
+    monkeypatch.setattr(db_manager, 'refresh_analytics', proibido)
+    monkeypatch.setattr(db_manager, 'execute_query',
+                        lambda sql, params=None, **opcoes: ([(date(2023, 1, 1), date(2024, 12, 31))], ['inicio', 'fim']))
+    monkeypatch.setattr(db_manager, 'fetch_dataframe',
+                        lambda sql, params=None, **opcoes: pd.DataFrame({'grupo': [1], 'periodo': [1], 'receita_total': [1]}))
+    graficos.receita_por_imovel()
+    agrupamento, _ = graficos.ocupacao_por_periodo()
+    assert agrupamento == 'month'
@@ -0,0 +1,51 @@
+"""Testes do modo streaming e da prévia com total"""
+
+from database import DatabaseManager, db_manager
+
+COLUNAS = [('id', 23), ('nome', 25)]
+LINHAS = [(i, f"linha {i}") for i in range(1, 8)]
+
+
+def responder_linhas(sql, params):
+    if sql.startswith("SELECT COUNT(*)"):
+        return [('count', 20)], [(len(LINHAS),)]
+    return COLUNAS, LINHAS
+
+
+def test_as_subquery_protege_comentario_final():
+    subconsulta = DatabaseManager.as_subquery("SELECT 1 -- fim\n;")
+    # O parêntese de fechamento não pode cair dentro do comentário
+    assert subconsulta == "(\nSELECT 1 -- fim\n)"
+
+
+def test_stream_em_lotes_do_tamanho_pedido(banco_falso):
+    banco_falso.responder = responder_linhas
+    lotes = list(db_manager.stream_query("SELECT id, nome FROM t", itersize=3))
+    assert [len(lote) for _, lote in lotes] == [3, 3, 1]
+    assert lotes[0][0] == ['id', 'nome']
+    assert [linha for _, lote in lotes for linha in lote] == LINHAS
+
+
+def test_stream_repassa_medicao_aos_hooks(banco_falso, monkeypatch):
+    banco_falso.responder = responder_linhas
+    medicoes = []
+    monkeypatch.setattr(db_manager, '_query_hooks', [medicoes.append])
+    list(db_manager.stream_query("SELECT id, nome FROM t", itersize=5))
+    assert len(medicoes) == 1
+    assert medicoes[0].linhas == len(LINHAS)
+
+
+def test_previa_conta_o_total_no_servidor(banco_falso):
+    banco_falso.responder = responder_linhas
+    linhas, colunas, total = db_manager.preview_query("SELECT id, nome FROM t", limit=2)
+    assert linhas == LINHAS[:2]
+    assert colunas == ['id', 'nome']
+    assert total == len(LINHAS)
+    assert banco_falso.sql()[-1].startswith("SELECT COUNT(*) FROM (\nSELECT id, nome FROM t\n)")
+
+
+def test_previa_curta_nao_conta_de_novo(banco_falso):
+    banco_falso.responder = responder_linhas
+    _, _, total = db_manager.preview_query("SELECT id, nome FROM t", limit=10)
+    assert total == len(LINHAS)
+    assert not any(sql.startswith("SELECT COUNT(*)") for sql in banco_falso.sql())